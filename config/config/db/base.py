@@ -0,0 +1,57 @@
+from django.db.backends.postgresql import base
+
+from config.db.pool import ConnectionPool, get_pool
+
+
+def check_connection(connection):
+    """
+    Проверка соединения из пула перед выдачей (при CONN_HEALTH_CHECKS).
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+    if not connection.autocommit:
+        connection.rollback()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL с пулом соединений внутри процесса (ENGINE = "config.db").
+
+    Вместо открытия соединения Django берет его из пула, а вместо закрытия (в конце запроса
+    при CONN_MAX_AGE = 0) возвращает обратно. Параметры пула задаются ключом POOL настроек базы:
+    max_size, timeout, max_lifetime. Пул общий для всех потоков процесса.
+    """
+
+    @property
+    def pool(self):
+        def create():
+            return ConnectionPool(
+                connect=lambda: base.DatabaseWrapper.get_new_connection(self, self.get_connection_params()),
+                check=check_connection if self.settings_dict["CONN_HEALTH_CHECKS"] else None,
+                **(self.settings_dict.get("POOL") or {}),
+            )
+
+        return get_pool(self.alias, create)
+
+    def get_new_connection(self, conn_params):
+        options = self.settings_dict["OPTIONS"]
+        if "isolation_level" in options:
+            self.isolation_level = base.IsolationLevel(options["isolation_level"])
+        else:
+            self.isolation_level = base.IsolationLevel.READ_COMMITTED
+        return self.pool.get()
+
+    def _close(self):
+        if self.connection is None:
+            return
+        connection, discard = self.connection, self.errors_occurred
+        with self.wrap_database_errors:
+            try:
+                # Незавершенная транзакция не должна достаться следующему владельцу соединения
+                if not connection.closed and not connection.autocommit:
+                    connection.rollback()
+            except Exception:
+                discard = True
+                raise
+            finally:
+                self.pool.put(connection, discard=discard)
@@ -0,0 +1,159 @@
+import threading
+from collections import deque
+from time import monotonic
+
+# Пулы соединений процесса по псевдониму базы; соединение Django живет в своем потоке, пул общий для всех потоков
+POOLS = {}
+POOLS_LOCK = threading.Lock()
+
+
+class PoolTimeout(Exception):
+    """
+    Свободное соединение не появилось за timeout секунд.
+    """
+
+
+class ConnectionPool:
+    """
+    Пул соединений с базой внутри процесса.
+
+    connect - функция, открывающая новое соединение; check - функция проверки соединения перед выдачей
+    (None - без проверки). Пул держит не больше max_size соединений, свободные соединения остаются
+    открытыми. Соединения старше max_lifetime секунд закрываются при возврате.
+    Если все соединения заняты, get ждет освобождения не дольше timeout секунд; время ожидания
+    учитывается в статистике.
+    """
+
+    def __init__(self, connect, max_size=10, timeout=10, max_lifetime=3600, check=None):
+        self.connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.check = check
+        self._idle = deque()  # (соединение, время открытия)
+        self._opened_at = {}
+        self._in_use = 0
+        self._condition = threading.Condition()
+        self._waiting = 0
+        self._requests = 0
+        self._wait_count = 0
+        self._wait_time = 0.0
+        self._wait_time_max = 0.0
+        self._timeouts = 0
+        self._opened = 0
+        self._closed = 0
+
+    def get(self):
+        """
+        Выдает соединение: свободное из пула, новое (если пул не заполнен) или освободившееся в течение timeout.
+        """
+        started = monotonic()
+        with self._condition:
+            self._requests += 1
+            while not self._idle and self._in_use >= self.max_size:
+                remaining = self.timeout - (monotonic() - started)
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(f"Нет свободного соединения за {self.timeout} с (занято {self._in_use})")
+                self._waiting += 1
+                try:
+                    self._condition.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            waited = monotonic() - started
+            if waited > 0.001:
+                self._wait_count += 1
+                self._wait_time += waited
+                self._wait_time_max = max(self._wait_time_max, waited)
+            self._in_use += 1
+            connection = self._idle.pop() if self._idle else None
+        try:
+            if connection is not None and not self._usable(connection):
+                self._discard(connection)
+                connection = None
+            if connection is None:
+                connection = self.connect()
+                self._opened_at[id(connection)] = monotonic()
+                self._opened += 1
+        except BaseException:
+            self._release()
+            raise
+        return connection
+
+    def put(self, connection, discard=False):
+        """
+        Возвращает соединение в пул. Сломанные, старые и лишние соединения закрываются.
+        """
+        expired = monotonic() - self._opened_at.get(id(connection), 0) > self.max_lifetime
+        if discard or expired or getattr(connection, "closed", False):
+            self._discard(connection)
+        else:
+            with self._condition:
+                self._idle.append(connection)
+        self._release()
+
+    def close(self):
+        """
+        Закрывает все свободные соединения; занятые остаются у своих владельцев.
+        """
+        with self._condition:
+            idle, self._idle = list(self._idle), deque()
+        for connection in idle:
+            self._discard(connection)
+
+    def stats(self):
+        with self._condition:
+            return {
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "max_size": self.max_size,
+                "requests": self._requests,
+                "opened": self._opened,
+                "closed": self._closed,
+                "timeouts": self._timeouts,
+                "wait_count": self._wait_count,
+                "wait_time_total_ms": round(self._wait_time * 1000, 3),
+                "wait_time_max_ms": round(self._wait_time_max * 1000, 3),
+            }
+
+    def _usable(self, connection):
+        if getattr(connection, "closed", False):
+            return False
+        if self.check is None:
+            return True
+        try:
+            self.check(connection)
+        except Exception:
+            return False
+        return True
+
+    def _discard(self, connection):
+        self._opened_at.pop(id(connection), None)
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self._condition:
+            self._closed += 1
+
+    def _release(self):
+        with self._condition:
+            self._in_use -= 1
+            self._condition.notify()
+
+
+def get_pool(alias, factory):
+    """
+    Возвращает пул базы alias, создавая его функцией factory при первом обращении.
+    """
+    with POOLS_LOCK:
+        if alias not in POOLS:
+            POOLS[alias] = factory()
+        return POOLS[alias]
+
+
+def pool_stats():
+    with POOLS_LOCK:
+        pools = dict(POOLS)
+    return {alias: pool.stats() for alias, pool in pools.items()}
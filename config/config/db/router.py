@@ -0,0 +1,51 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# Реплика, с которой читает текущий запрос; None - все запросы идут в основную базу
+read_replica = ContextVar("read_replica", default=None)
+
+
+@contextmanager
+def reads_from_replica():
+    """
+    Чтения внутри блока направляются в одну случайную реплику из DATABASE_REPLICAS (если они настроены).
+    """
+    token = read_replica.set(random.choice(settings.DATABASE_REPLICAS) if settings.DATABASE_REPLICAS else None)
+    try:
+        yield
+    finally:
+        read_replica.reset(token)
+
+
+def is_reading_from_replica():
+    """
+    Чтения текущего запроса идут в реплику. Данные реплики могут отставать, поэтому в общий кеш они
+    не записываются: иначе устаревший ответ хранился бы до следующего сброса.
+    """
+    return read_replica.get() is not None
+
+
+class PrimaryReplicaRouter:
+    """
+    Запись всегда в основную базу; чтение - в реплику только внутри reads_from_replica
+    (безопасные HTTP-запросы без недавней записи клиента). Фоновые задачи, команды и
+    запросы на изменение читают из основной базы.
+    """
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        return read_replica.get() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная база
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        return obj1._state.db in databases and obj2._state.db in databases
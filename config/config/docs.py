@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from django.views import View
+from drf_yasg.views import get_schema_view
+from rest_framework import permissions
+
+from config.schema import SCHEMA_FORMATS, SCHEMA_INFO, get_schema
+
+schema_view = get_schema_view(
+    SCHEMA_INFO,
+    public=True,
+    permission_classes=(permissions.AllowAny,),  # Кому доступна работа в Приложении
+)
+
+
+class SchemaView(View):
+    """
+    Схема OpenAPI (swagger.json, swagger.yaml) из памяти процесса: генерируется один раз на версию
+    кода (config.schema.get_schema). ETag - версия кода, поэтому клиенты и прокси кешируют схему на
+    SCHEMA_CACHE_SECONDS, а после развертывания новой версии получают новую.
+    """
+
+    def get(self, request, format):
+        fmt = format.lstrip(".")
+        content_type = SCHEMA_FORMATS[fmt][0]
+        content, version = get_schema(fmt)
+        etag = quote_etag(f"{version}-{fmt}")
+        response = get_conditional_response(request, etag=etag, response=HttpResponse())
+        if response.status_code != HttpResponseNotModified.status_code:
+            response = HttpResponse(content, content_type=content_type)
+        response["ETag"] = etag
+        patch_cache_control(response, public=True, max_age=settings.SCHEMA_CACHE_SECONDS)
+        return response
+
+
+schema_json = SchemaView.as_view()
+swagger_ui = schema_view.with_ui("swagger", cache_timeout=0)
+redoc_ui = schema_view.with_ui("redoc", cache_timeout=0)
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.contrib.admin import autodiscover
+from django.utils.functional import cached_property
+from django.utils.module_loading import import_string
+
+
+def lazy_view(path):
+    """
+    Представление по пути path ("модуль.атрибут"). В режиме LAZY_LOADING модуль импортируется при первом
+    запросе к представлению, иначе - сразу.
+    """
+    if not settings.LAZY_LOADING:
+        return import_string(path)
+
+    def view(request, *args, **kwargs):
+        return import_string(path)(request, *args, **kwargs)
+
+    return view
+
+
+class LazyAdminURLConf:
+    """
+    Адреса сайта админки, которые строятся при первом обращении к ним (разрешение адреса admin/ или
+    первый reverse): тогда же загружаются модули admin.py приложений (autodiscover).
+    """
+
+    def __init__(self, site):
+        self.site = site
+
+    @cached_property
+    def urlpatterns(self):
+        autodiscover()
+        return self.site.get_urls()
+
+
+def admin_urls(site):
+    """
+    Аргумент path() для адресов админки: site.urls или, в режиме LAZY_LOADING (приложение админки
+    подключено как SimpleAdminConfig без autodiscover при запуске), LazyAdminURLConf.
+    """
+    if not settings.LAZY_LOADING:
+        return site.urls
+    # Как и site.urls - кортеж (urlconf, app_name, namespace): include() сразу прочитал бы urlpatterns
+    return LazyAdminURLConf(site), "admin", site.name
@@ -0,0 +1,112 @@
+import random
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+
+from config.db.router import reads_from_replica
+from config.profiling import (
+    PROFILE_HEADER,
+    TRACERS,
+    RequestProfile,
+    install_serializer_timer,
+    is_staff_request,
+    log_profile,
+)
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Безопасные запросы (GET, HEAD, OPTIONS) читают из реплики. После успешного запроса на изменение
+    клиент REPLICA_STICKY_SECONDS секунд читает из основной базы, чтобы сразу видеть свои изменения
+    несмотря на отставание реплик. Отметка о записи - подписанная cookie в ответе на запрос
+    на изменение, поэтому она действует в любом процессе, который обработает следующий запрос клиента.
+    Работает и в синхронной, и в асинхронной цепочке, чтобы под ASGI не переводить асинхронные
+    представления в поток.
+    """
+
+    sync_capable = True
+    async_capable = True
+    sticky_cookie = "db_primary"
+    sticky_salt = "config.middleware.ReplicaRoutingMiddleware"
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+        if self.reads_replica(request):
+            with reads_from_replica():
+                return self.get_response(request)
+        return self.mark_write(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return await self.get_response(request)
+        if self.reads_replica(request):
+            with reads_from_replica():
+                return await self.get_response(request)
+        return self.mark_write(request, await self.get_response(request))
+
+    def reads_replica(self, request):
+        if request.method not in SAFE_METHODS:
+            return False
+        marker = request.get_signed_cookie(
+            self.sticky_cookie, default=None, salt=self.sticky_salt, max_age=settings.REPLICA_STICKY_SECONDS
+        )
+        return marker is None
+
+    def mark_write(self, request, response):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            response.set_signed_cookie(
+                self.sticky_cookie,
+                "1",
+                salt=self.sticky_salt,
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                secure=request.is_secure(),
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+
+class RequestProfilingMiddleware:
+    """
+    Профилирование запросов (REQUEST_PROFILING=1): число и время SQL-запросов, повторяющиеся запросы
+    (признак N+1), время сериализаторов DRF, общее и процессорное время. Запросы дольше
+    REQUEST_PROFILING_SLOW_MS пишутся в журнал config.profiling одной строкой JSON. Доля
+    REQUEST_PROFILING_SAMPLE_RATE запросов дополнительно трассируется (REQUEST_PROFILING_TRACER).
+    Активный сотрудник включает профиль отдельного запроса заголовком X-Profile: 1 - метрики в
+    заголовках ответа (Server-Timing, X-Profile-*) и запись в журнал, cprofile или pyinstrument - еще
+    и трассировка вызовов. У остальных пользователей заголовок игнорируется.
+    Стоит после AuthenticationMiddleware: запросы сессии и пользователя в профиль не попадают.
+    Только синхронная: под ASGI Django выполняет ее в потоке, для диагностического режима это допустимо.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install_serializer_timer()
+
+    def __call__(self, request):
+        requested = request.headers.get(PROFILE_HEADER)
+        if requested and not is_staff_request(request):
+            requested = None
+        tracer = requested if requested in TRACERS else None
+        if tracer is None and random.random() < settings.REQUEST_PROFILING_SAMPLE_RATE:
+            tracer = settings.REQUEST_PROFILING_TRACER
+        with RequestProfile(tracer) as profile:
+            response = self.get_response(request)
+        slow = profile.duration * 1000 >= settings.REQUEST_PROFILING_SLOW_MS
+        if slow or requested or tracer:
+            log_profile(profile.as_dict(request, response), slow)
+        if requested:
+            response["Server-Timing"] = profile.server_timing()
+            response["X-Profile-Id"] = profile.id
+            response["X-Profile-Queries"] = len(profile.queries)
+            response["X-Profile-Duplicates"] = len(profile.duplicates())
+        return response
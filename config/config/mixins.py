@@ -0,0 +1,61 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from config.versions import model_versions
+
+
+class ConditionalGetMixin:
+    """
+    ETag и Last-Modified для list и retrieve без сериализации ответа.
+
+    Валидаторы строятся одним запросом по версиям моделей conditional_models (config.versions):
+    сохранение, удаление, изменение связей и массовые update()/bulk_create() меняют версию модели.
+    В ETag также входят путь с параметрами запроса и пользователь, поэтому у каждой выборки и
+    страницы он свой; Last-Modified - время последнего изменения моделей.
+    Если клиент прислал совпадающий If-None-Match или If-Modified-Since, возвращается 304,
+    а queryset и сериализатор не выполняются.
+    """
+
+    # Модели, изменения которых меняют ответ; по умолчанию - модель queryset
+    conditional_models = ()
+
+    def get_conditional_models(self):
+        return self.conditional_models or (self.queryset.model,)
+
+    def get_validators(self, request):
+        """
+        Возвращает ETag и время последнего изменения (timestamp или None) для текущего запроса.
+        """
+        state = [request.get_full_path(), str(request.user.pk)]
+        last_modified = None
+        for model, (timestamp, version) in model_versions(self.get_conditional_models()).items():
+            state.append(f"{model._meta.label}:{version}")
+            last_modified = timestamp if last_modified is None else max(last_modified, timestamp)
+        return quote_etag(hashlib.md5("|".join(state).encode()).hexdigest()), last_modified
+
+    def conditional(self, request, handler, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+        last_modified = int(last_modified) if last_modified is not None else None
+        # get_conditional_response ожидает объект ответа только для проверки успешности
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=last_modified, response=Response(status=status.HTTP_200_OK)
+        )
+        if not_modified.status_code == status.HTTP_304_NOT_MODIFIED:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response["ETag"] = etag
+            if last_modified is not None:
+                response["Last-Modified"] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(request, super().retrieve, *args, **kwargs)
@@ -0,0 +1,206 @@
+import cProfile
+import io
+import json
+import logging
+import pstats
+import uuid
+from collections import defaultdict
+from contextlib import ExitStack
+from contextvars import ContextVar
+from time import perf_counter, thread_time
+
+from django.db import connections
+from rest_framework.serializers import BaseSerializer
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from users.authentication import CachedJWTAuthentication
+
+try:
+    from pyinstrument import Profiler as PyinstrumentProfiler
+except ImportError:
+    # pyinstrument - необязательная зависимость; без нее трассировка выполняется cProfile
+    PyinstrumentProfiler = None
+
+logger = logging.getLogger("config.profiling")
+
+# Заголовок, которым сотрудник включает профиль запроса: 1 - метрики, cprofile или pyinstrument - еще и трассировка
+PROFILE_HEADER = "X-Profile"
+TRACERS = ("cprofile", "pyinstrument")
+# Повторяющимся считается запрос, текст которого (без параметров) выполнен не меньше стольких раз
+DUPLICATE_QUERY_MIN = 2
+SLOWEST_QUERIES = 5
+TRACE_LINES = 30
+
+_current = ContextVar("request_profile", default=None)
+
+
+def is_staff_request(request):
+    """
+    Запрос активного сотрудника: пользователь сессии или, если его нет, пользователь JWT-токена
+    (флаги из кеша, как при проверке доступа к API).
+    """
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        try:
+            result = CachedJWTAuthentication().authenticate(request)
+        except (AuthenticationFailed, InvalidToken):
+            return False
+        user = result[0] if result else None
+    return user is not None and user.is_active and user.is_staff
+
+
+def install_serializer_timer():
+    """
+    Подменяет BaseSerializer.data так, чтобы время сериализации записывалось в профиль текущего запроса.
+    Вложенные вызовы .data учитываются один раз, во внешнем сериализаторе. Без профиля свойство
+    работает как исходное.
+    """
+    original = BaseSerializer.data.fget
+    if getattr(original, "profiled", False):
+        return
+
+    def data(self):
+        profile = _current.get()
+        if profile is None or profile.serializer_depth:
+            return original(self)
+        profile.serializer_depth += 1
+        start = perf_counter()
+        try:
+            return original(self)
+        finally:
+            profile.serializer_depth -= 1
+            profile.serializer_time += perf_counter() - start
+
+    data.profiled = True
+    BaseSerializer.data = property(data)
+
+
+class Trace:
+    """
+    Трассировка вызовов запроса: pyinstrument, если он установлен и запрошен, иначе cProfile.
+    """
+
+    def __init__(self, tracer):
+        self.tracer = "pyinstrument" if tracer == "pyinstrument" and PyinstrumentProfiler else "cprofile"
+        self.profiler = PyinstrumentProfiler() if self.tracer == "pyinstrument" else cProfile.Profile()
+
+    def start(self):
+        if self.tracer == "pyinstrument":
+            self.profiler.start()
+        else:
+            self.profiler.enable()
+
+    def stop(self):
+        if self.tracer == "pyinstrument":
+            self.profiler.stop()
+        else:
+            self.profiler.disable()
+
+    def report(self):
+        if self.tracer == "pyinstrument":
+            return self.profiler.output_text()
+        stream = io.StringIO()
+        pstats.Stats(self.profiler, stream=stream).sort_stats("cumulative").print_stats(TRACE_LINES)
+        return stream.getvalue()
+
+
+class RequestProfile:
+    """
+    Метрики одного запроса: SQL-запросы всех подключений (через execute_wrapper), время сериализаторов,
+    общее и процессорное время потока и, если задан tracer, трассировка вызовов.
+    """
+
+    def __init__(self, tracer=None):
+        self.id = uuid.uuid4().hex
+        self.queries = []
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+        self.trace = Trace(tracer) if tracer else None
+        self._stack = ExitStack()
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self.record_query))
+        self.started, self.cpu_started = perf_counter(), thread_time()
+        if self.trace:
+            self.trace.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.trace:
+            self.trace.stop()
+        self.duration, self.cpu_time = perf_counter() - self.started, thread_time() - self.cpu_started
+        self._stack.close()
+        _current.reset(self._token)
+
+    def record_query(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((context["connection"].alias, sql, perf_counter() - start))
+
+    @property
+    def sql_time(self):
+        return sum(duration for _, _, duration in self.queries)
+
+    def duplicates(self):
+        """
+        Запросы с одинаковым текстом (параметры не учитываются), выполненные несколько раз: обычно это
+        обращение к связанным объектам в цикле (N+1). По убыванию числа выполнений.
+        """
+        groups = defaultdict(lambda: [0, 0.0])
+        for alias, sql, duration in self.queries:
+            group = groups[alias, sql]
+            group[0] += 1
+            group[1] += duration
+        return [
+            {"database": alias, "sql": sql, "count": count, "ms": round(total * 1000, 3)}
+            for (alias, sql), (count, total) in sorted(groups.items(), key=lambda item: item[1][0], reverse=True)
+            if count >= DUPLICATE_QUERY_MIN
+        ]
+
+    def as_dict(self, request, response):
+        """
+        Запись для журнала: запрос, ответ, метрики, повторяющиеся и самые долгие SQL-запросы, трассировка.
+        """
+        user = getattr(request, "user", None)
+        slowest = sorted(self.queries, key=lambda query: query[2], reverse=True)[:SLOWEST_QUERIES]
+        return {
+            "id": self.id,
+            "method": request.method,
+            "path": request.get_full_path(),
+            "status": response.status_code,
+            "user": user.pk if user is not None and user.is_authenticated else None,
+            "duration_ms": round(self.duration * 1000, 3),
+            "cpu_ms": round(self.cpu_time * 1000, 3),
+            "queries": len(self.queries),
+            "sql_ms": round(self.sql_time * 1000, 3),
+            "serializer_ms": round(self.serializer_time * 1000, 3),
+            "duplicates": self.duplicates(),
+            "slowest_queries": [
+                {"database": alias, "sql": sql, "ms": round(duration * 1000, 3)} for alias, sql, duration in slowest
+            ],
+            "tracer": self.trace.tracer if self.trace else None,
+            "trace": self.trace.report() if self.trace else None,
+        }
+
+    def server_timing(self):
+        """
+        Значение заголовка Server-Timing: метрики видны в инструментах разработчика браузера.
+        """
+        return (
+            f"total;dur={self.duration * 1000:.1f}, cpu;dur={self.cpu_time * 1000:.1f}, "
+            f'sql;dur={self.sql_time * 1000:.1f};desc="{len(self.queries)} queries", '
+            f"serializer;dur={self.serializer_time * 1000:.1f}"
+        )
+
+
+def log_profile(record, slow):
+    """
+    Пишет запись одной строкой JSON в журнал config.profiling: медленные запросы с уровнем WARNING,
+    запрошенные сотрудником и выборочные - INFO. Сама запись доступна обработчикам как record.profile.
+    """
+    level = logging.WARNING if slow else logging.INFO
+    logger.log(level, json.dumps(record, ensure_ascii=False, default=str), extra={"profile": record})
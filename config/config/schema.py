@@ -0,0 +1,151 @@
+import hashlib
+import threading
+from functools import lru_cache
+from importlib.metadata import version as package_version
+from pathlib import Path
+
+from django.conf import settings
+from django.test import RequestFactory
+from drf_yasg import openapi
+from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+from drf_yasg.generators import OpenAPISchemaGenerator
+from rest_framework.request import Request
+
+SCHEMA_INFO = openapi.Info(
+    title="Snippets API",
+    default_version="v1",
+    description="Test description",
+    terms_of_service="https://www.google.com/policies/terms/",
+    contact=openapi.Contact(email="contact@snippets.local"),
+    license=openapi.License(name="BSD License"),
+)
+# Форматы схемы: тип содержимого и кодек drf_yasg
+SCHEMA_FORMATS = {
+    "json": ("application/json; charset=utf-8", OpenAPICodecJson),
+    "yaml": ("application/yaml; charset=utf-8", OpenAPICodecYaml),
+}
+# Пакеты, от версии которых зависит сгенерированная схема
+SCHEMA_PACKAGES = ("django", "djangorestframework", "drf-yasg", "django-filter", "djangorestframework-simplejwt")
+# Модули, которые не влияют на схему и не входят в хеш исходного кода: тесты и миграции. Остальные
+# входят, включая settings.py (REST_FRAMEWORK, SWAGGER_SETTINGS) и модули, импортируемые представлениями
+SCHEMA_IGNORED = ("tests.py", "migrations")
+# Настройки, от значений которых зависит схема
+SCHEMA_SETTINGS = ("REST_FRAMEWORK", "SWAGGER_SETTINGS", "SIMPLE_JWT")
+# Сколько версий схемы хранится в SCHEMA_DIR: текущая и предыдущая для процессов, еще работающих
+# со старым кодом во время постепенного развертывания
+SCHEMA_KEPT_VERSIONS = 2
+
+_schemas = {}
+_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def source_version():
+    """
+    Хеш исходного кода проекта (.py файлы BASE_DIR, кроме SCHEMA_IGNORED), версий пакетов и значений
+    настроек SCHEMA_SETTINGS, от которых зависит схема. Считается один раз на процесс.
+    """
+    digest = hashlib.sha256()
+    base_dir = Path(settings.BASE_DIR)
+    for path in sorted(base_dir.rglob("*.py")):
+        relative = path.relative_to(base_dir)
+        if any(part in SCHEMA_IGNORED for part in relative.parts):
+            continue
+        digest.update(str(relative).encode())
+        digest.update(path.read_bytes())
+    for package in SCHEMA_PACKAGES:
+        digest.update(f"{package}=={package_version(package)}".encode())
+    # Значения настроек могут приходить из переменных окружения, а не из текста settings.py
+    for name in SCHEMA_SETTINGS:
+        digest.update(f"{name}={getattr(settings, name, None)!r}".encode())
+    return digest.hexdigest()[:16]
+
+
+def code_version():
+    """
+    Версия кода, для которой действительна собранная схема: CODE_VERSION из настроек (например, хеш
+    коммита, заданный при развертывании) или хеш исходного кода.
+    """
+    return settings.CODE_VERSION or source_version()
+
+
+def schema_path(fmt, version=None):
+    return Path(settings.SCHEMA_DIR) / f"openapi-{version or code_version()}.{fmt}"
+
+
+def generate_schema():
+    """
+    Публичная схема всех эндпоинтов, как у get_schema_view(public=True). Представления получают
+    служебный GET-запрос без параметров. host и schemes из схемы удаляются: клиенты используют адрес,
+    с которого получили схему.
+    """
+    request = Request(RequestFactory().get("/"))
+    schema = OpenAPISchemaGenerator(SCHEMA_INFO, url="http://localhost").get_schema(request=request, public=True)
+    schema.pop("host", None)
+    schema.pop("schemes", None)
+    return schema
+
+
+def render_schema():
+    """
+    Генерирует схему во всех форматах SCHEMA_FORMATS: {формат: содержимое}.
+    """
+    schema = generate_schema()
+    return {fmt: codec(validators=[]).encode(schema) for fmt, (_, codec) in SCHEMA_FORMATS.items()}
+
+
+def write_schema(contents):
+    """
+    Записывает файлы openapi-<версия>.<формат> в SCHEMA_DIR. Из файлов других версий остаются
+    самые новые (SCHEMA_KEPT_VERSIONS - 1), остальные удаляются.
+    """
+    directory = Path(settings.SCHEMA_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    for fmt, content in contents.items():
+        path = schema_path(fmt)
+        others = sorted(
+            (other for other in directory.glob(f"openapi-*.{fmt}") if other != path),
+            key=lambda other: other.stat().st_mtime_ns,
+            reverse=True,
+        )
+        for stale in others[SCHEMA_KEPT_VERSIONS - 1 :]:
+            stale.unlink()
+        temporary = path.with_suffix(f".{fmt}.tmp")
+        temporary.write_bytes(content)
+        temporary.replace(path)
+
+
+def build_schema():
+    contents = render_schema()
+    write_schema(contents)
+    return contents
+
+
+def get_schema(fmt):
+    """
+    Схема в формате fmt из памяти процесса. При первом обращении читается файл текущей версии кода,
+    а если его нет (схема не собрана командой build_schema или код изменился) - схема генерируется и
+    записывается. Возвращает (содержимое, версия).
+    """
+    version = code_version()
+    key = (fmt, version)
+    if key not in _schemas:
+        with _lock:
+            if key not in _schemas:
+                path = schema_path(fmt, version)
+                if path.exists():
+                    _schemas[key] = path.read_bytes()
+                else:
+                    contents = render_schema()
+                    try:
+                        write_schema(contents)
+                    except OSError:
+                        # Каталог только для чтения: схема остается только в памяти процесса
+                        pass
+                    _schemas.update({(name, version): content for name, content in contents.items()})
+    return _schemas[key], version
+
+
+def clear_schema_cache():
+    with _lock:
+        _schemas.clear()
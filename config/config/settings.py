@@ -1,7 +1,10 @@
 import os
+import sys
 from datetime import timedelta
+from importlib.util import find_spec
 from pathlib import Path
 
+from celery.schedules import crontab
 from dotenv import load_dotenv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -20,10 +23,15 @@ DEBUG = True
 ALLOWED_HOSTS = []
 
 
+# Ленивая загрузка (LAZY_LOADING=1): модули admin.py приложений загружаются при первом обращении
+# к admin/, документация API (drf_yasg) - при первом запросе к ней. Сокращает холодный старт процесса;
+# проверки ModelAdmin (manage.py check) в этом режиме не выполняются
+LAZY_LOADING = os.getenv("LAZY_LOADING") == "1"
+
 # Application definition
 
 INSTALLED_APPS = [
-    "django.contrib.admin",
+    "django.contrib.admin.apps.SimpleAdminConfig" if LAZY_LOADING else "django.contrib.admin",
     "django.contrib.auth",
     "django.contrib.contenttypes",
     "django.contrib.sessions",
@@ -36,6 +44,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "config.middleware.ReplicaRoutingMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -43,6 +52,34 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
+# Профилирование запросов (REQUEST_PROFILING=1): метрики SQL и сериализаторов, журнал медленных запросов
+# (REQUEST_PROFILING_SLOW_MS), выборочная трассировка доли запросов REQUEST_PROFILING_SAMPLE_RATE через
+# cprofile или pyinstrument (REQUEST_PROFILING_TRACER). Журнал - в REQUEST_PROFILING_LOG или в stderr
+REQUEST_PROFILING = os.getenv("REQUEST_PROFILING") == "1"
+REQUEST_PROFILING_SLOW_MS = int(os.getenv("REQUEST_PROFILING_SLOW_MS") or 500)
+REQUEST_PROFILING_SAMPLE_RATE = float(os.getenv("REQUEST_PROFILING_SAMPLE_RATE") or 0)
+REQUEST_PROFILING_TRACER = os.getenv("REQUEST_PROFILING_TRACER") or "cprofile"
+REQUEST_PROFILING_LOG = os.getenv("REQUEST_PROFILING_LOG", "")
+if REQUEST_PROFILING:
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index("django.contrib.auth.middleware.AuthenticationMiddleware") + 1,
+        "config.middleware.RequestProfilingMiddleware",
+    )
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "profiling": (
+            {"class": "logging.FileHandler", "filename": REQUEST_PROFILING_LOG, "delay": True}
+            if REQUEST_PROFILING_LOG
+            else {"class": "logging.StreamHandler"}
+        ),
+    },
+    "loggers": {
+        "config.profiling": {"handlers": ["profiling"], "level": "INFO", "propagate": False},
+    },
+}
 
 ROOT_URLCONF = "config.urls"
 
@@ -76,8 +113,37 @@ DATABASES = {
         "PASSWORD": os.getenv("POSTGRES_PASSWORD"),
         "HOST": os.getenv("POSTGRES_HOST"),
         "PORT": os.getenv("POSTGRES_PORT"),
+        # Постоянные соединения: одно соединение на поток живет DB_CONN_MAX_AGE секунд и перед повторным
+        # использованием проверяется (CONN_HEALTH_CHECKS), поэтому запрос не тратит время на подключение
+        "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE") or 60),
+        "CONN_HEALTH_CHECKS": os.getenv("DB_CONN_HEALTH_CHECKS", "1") == "1",
     }
 }
+# Пул соединений внутри процесса (DB_POOL=1): соединение берется из пула на время запроса и возвращается
+# в конце, поэтому постоянные соединения потоков отключаются. Статистика - /internal/db-pool/
+if os.getenv("DB_POOL") == "1":
+    DATABASES["default"].update(
+        ENGINE="config.db",
+        CONN_MAX_AGE=0,
+        POOL={
+            "max_size": int(os.getenv("DB_POOL_MAX_SIZE") or 10),
+            "timeout": float(os.getenv("DB_POOL_TIMEOUT") or 10),
+            "max_lifetime": float(os.getenv("DB_POOL_MAX_LIFETIME") or 3600),
+        },
+    )
+# Реплики для чтения (DB_REPLICA_HOSTS=host1,host2:5433): те же параметры, что у основной базы, кроме адреса.
+# Безопасные HTTP-запросы читают из реплик, запись и чтение после недавней записи клиента - из основной базы
+for index, address in enumerate(filter(None, os.getenv("DB_REPLICA_HOSTS", "").split(",")), start=1):
+    host, _, port = address.strip().partition(":")
+    DATABASES[f"replica{index}"] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "PORT": port or DATABASES["default"]["PORT"],
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+DATABASE_ROUTERS = ["config.db.router.PrimaryReplicaRouter"]
+REPLICA_STICKY_SECONDS = int(os.getenv("DB_REPLICA_STICKY_SECONDS") or 5)
 
 
 # Password validation
@@ -116,6 +182,15 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 
+# Документация API использует шаблоны и статику drf_yasg. В режиме LAZY_LOADING пакет не регистрируется
+# как приложение (его импорт занимает заметную часть старта), а его каталоги подключаются по пути
+if LAZY_LOADING:
+    DRF_YASG_DIR = Path(find_spec("drf_yasg").origin).parent
+    TEMPLATES[0]["DIRS"].append(DRF_YASG_DIR / "templates")
+    STATICFILES_DIRS = [DRF_YASG_DIR / "static"]
+else:
+    INSTALLED_APPS.append("drf_yasg")
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -125,14 +200,65 @@ AUTH_USER_MODEL = "users.User"
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=5),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
+    # Флаги доступа в claims, чтобы проверка прав не загружала пользователя из базы
+    "TOKEN_OBTAIN_SERIALIZER": "users.serializers.UserTokenObtainPairSerializer",
+    # Новый access-токен получает текущие флаги из базы, а не скопированные при входе
+    "TOKEN_REFRESH_SERIALIZER": "users.serializers.UserTokenRefreshSerializer",
+}
+
+# Кеш ответов API. По умолчанию локальная память процесса; для нескольких процессов задайте
+# CACHE_BACKEND (например, django.core.cache.backends.redis.RedisCache) и CACHE_LOCATION.
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND") or "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": os.getenv("CACHE_LOCATION") or "electronics",
+        "TIMEOUT": int(os.getenv("CACHE_TIMEOUT") or 300),
+    }
+}
+ELECTRONICS_CACHE_ALIAS = "default"
+# Общий для всех процессов кеш флагов доступа пользователей (CachedJWTAuthentication): алиас из CACHES
+# с Redis, Memcached или базой. Кеш в памяти процесса (LocMemCache) не допускается - отзыв прав дошел бы
+# только до одного процесса. Без алиаса флаги проверяются по базе с кешем процесса на несколько секунд
+USER_FLAGS_CACHE_ALIAS = os.getenv("USER_FLAGS_CACHE_ALIAS", "")
+
+# Очередь фоновых задач: укажите Redis или RabbitMQ и запустите worker: celery -A config worker -l info.
+# Брокер в памяти (memory://) никто не читает: без CELERY_BROKER_URL проверка electronics.E001 не дает
+# запустить приложение с DEBUG=False. Выполнение задач сразу в процессе, который их поставил (eager), -
+# только для тестов (manage.py test) или явно через CELERY_TASK_ALWAYS_EAGER=1
+TESTING = sys.argv[1:2] == ["test"]
+CELERY_TASK_ALWAYS_EAGER = os.getenv("CELERY_TASK_ALWAYS_EAGER") == "1" or TESTING
+CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL") or "memory://"
+CELERY_TASK_ACKS_LATE = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+CELERY_TASK_IGNORE_RESULT = True
+# Расписание периодических задач для celery -A config beat: начисление долга по правилам раз в сутки
+CELERY_BEAT_SCHEDULE = {
+    "accrue-debts-daily": {
+        "task": "electronics.tasks.accrue_debts",
+        "schedule": crontab(hour=int(os.getenv("DEBT_ACCRUAL_HOUR") or 1), minute=0),
+    },
 }
+# Каталог для файлов, которые создают фоновые задачи (выгрузки)
+JOB_FILES_DIR = Path(os.getenv("JOB_FILES_DIR") or BASE_DIR / "job_files")
+# Собранная схема OpenAPI (команда build_schema): каталог файлов, версия кода (по умолчанию - хеш исходников)
+# и время кеширования ответа клиентами и прокси
+SCHEMA_DIR = Path(os.getenv("SCHEMA_DIR") or BASE_DIR / "schema")
+CODE_VERSION = os.getenv("CODE_VERSION", "")
+SCHEMA_CACHE_SECONDS = int(os.getenv("SCHEMA_CACHE_SECONDS") or 3600)
+# Swagger UI и ReDoc загружают схему из кешированного эндпоинта, а не генерируют ее на каждый запрос
+SWAGGER_SETTINGS = {"SPEC_URL": ("schema-json", {"format": ".json"})}
+REDOC_SETTINGS = {"SPEC_URL": ("schema-json", {"format": ".json"})}
+# Режим списка объектов сети в админке для больших таблиц: фильтры-поля вместо перечня значений,
+# оценка количества строк вместо COUNT(*), продукты одной колонкой из SQL, без редактирования в списке
+ADMIN_SCALABLE_CHANGELIST = os.getenv("ADMIN_SCALABLE_CHANGELIST") == "1"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_FILTER_BACKENDS": ["django_filters.rest_framework.DjangoFilterBackend"],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    "PAGE_SIZE": 50,
 }
\ No newline at end of file
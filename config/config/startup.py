@@ -0,0 +1,110 @@
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+
+# Точки входа процессов приложения
+STARTUP_TARGETS = {"wsgi": "config.wsgi", "asgi": "config.asgi"}
+
+# Холодный старт в отдельном процессе: импорт точки входа (вместе с django.setup()) и первый запрос
+# напрямую к WSGI/ASGI-приложению, без сервера. Печатает JSON с временем этапов в миллисекундах
+FIRST_REQUEST_SCRIPT = """
+import json, sys, time
+
+start = time.perf_counter()
+target, path, host = sys.argv[1:4]
+application = __import__(target, fromlist=["application"]).application
+imported = time.perf_counter()
+if target.endswith("asgi"):
+    import asyncio
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"host", host.encode())], "client": ("127.0.0.1", 0), "server": (host, 80),
+    }
+    asyncio.run(application(scope, receive, send))
+    status = messages[0]["status"]
+else:
+    import io
+
+    statuses = []
+    environ = {
+        "REQUEST_METHOD": "GET", "PATH_INFO": path, "QUERY_STRING": "", "SCRIPT_NAME": "", "SERVER_NAME": host,
+        "SERVER_PORT": "80", "SERVER_PROTOCOL": "HTTP/1.1", "HTTP_HOST": host, "wsgi.url_scheme": "http",
+        "wsgi.input": io.BytesIO(), "wsgi.errors": sys.stderr,
+    }
+    b"".join(application(environ, lambda status, headers, exc_info=None: statuses.append(status)))
+    status = int(statuses[0].split()[0])
+finished = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "request_ms": (finished - imported) * 1000,
+    "total_ms": (finished - start) * 1000,
+    "status": status,
+    "modules": len(sys.modules),
+}))
+"""
+
+
+def child_env(lazy=None):
+    """
+    Окружение дочернего процесса: текущие настройки Django и, если задан lazy, режим LAZY_LOADING.
+    """
+    env = os.environ.copy()
+    env["DJANGO_SETTINGS_MODULE"] = settings.SETTINGS_MODULE
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(settings.BASE_DIR), env.get("PYTHONPATH")]))
+    if lazy is not None:
+        env["LAZY_LOADING"] = "1" if lazy else "0"
+    return env
+
+
+def run_child(args, lazy=None):
+    return subprocess.run(
+        [sys.executable, *args], env=child_env(lazy), cwd=settings.BASE_DIR, capture_output=True, text=True, check=True
+    )
+
+
+def import_times(target, lazy=None):
+    """
+    Время импорта модулей при загрузке target (python -X importtime): список словарей с именем модуля,
+    собственным и накопленным временем в миллисекундах.
+    """
+    stderr = run_child(["-X", "importtime", "-c", f"import {target}"], lazy).stderr
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        modules.append(
+            {"name": name.strip(), "self_ms": int(self_us) / 1000, "cumulative_ms": int(cumulative_us) / 1000}
+        )
+    return modules
+
+
+def package_times(modules):
+    """
+    Собственное время импорта, просуммированное по пакетам верхнего уровня, по убыванию.
+    """
+    totals = defaultdict(float)
+    for module in modules:
+        totals[module["name"].split(".")[0]] += module["self_ms"]
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+def first_request(target, path, host, lazy=None):
+    """
+    Холодный старт target в новом процессе: время импорта, первого запроса к path и их сумма.
+    """
+    return json.loads(run_child(["-c", FIRST_REQUEST_SCRIPT, target, path, host], lazy).stdout.splitlines()[-1])
@@ -1,34 +1,16 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
-
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Snippets API",
-        default_version="v1",
-        description="Test description",
-        terms_of_service="https://www.google.com/policies/terms/",
-        contact=openapi.Contact(email="contact@snippets.local"),
-        license=openapi.License(name="BSD License"),
-    ),
-    public=True,
-    permission_classes=(permissions.AllowAny,),  # Кому доступна работа в Приложении
-)
+from config.lazy import admin_urls, lazy_view
+from config.views import DatabasePoolView
 
 urlpatterns = [
-    path("admin/", admin.site.urls),
+    path("admin/", admin_urls(admin.site)),
     path("users/", include(("users.urls", "users"), namespace="users")),
     path("electronics/", include(("electronics.urls", "electronics"), namespace="network")),
-    path(
-        "swagger<format>/", schema_view.without_ui(cache_timeout=0), name="schema-json"
-    ),
-    path(
-        "swagger/",
-        schema_view.with_ui("swagger", cache_timeout=0),
-        name="schema-swagger-ui",
-    ),
-    path("redoc/", schema_view.with_ui("redoc", cache_timeout=0), name="schema-redoc"),
-]
\ No newline at end of file
+    # Схема отдается из памяти (собирается командой build_schema или при первом запросе)
+    re_path(r"^swagger(?P<format>\.json|\.yaml)/$", lazy_view("config.docs.schema_json"), name="schema-json"),
+    path("swagger/", lazy_view("config.docs.swagger_ui"), name="schema-swagger-ui"),
+    path("redoc/", lazy_view("config.docs.redoc_ui"), name="schema-redoc"),
+    path("internal/db-pool/", DatabasePoolView.as_view(), name="db-pool"),
+]
@@ -0,0 +1,53 @@
+import time
+import uuid
+
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Floor, Greatest
+
+
+def model_label(model):
+    return model._meta.label_lower
+
+
+def model_versions(models):
+    """
+    Версии данных моделей одним запросом: {модель: (время изменения, метка)}. Модели без записи
+    (еще не менялись) получают запись с текущим временем.
+    """
+    # Модель версий лежит в electronics, а electronics.models импортирует этот модуль
+    from electronics.models import ModelVersion
+
+    labels = {model_label(model): model for model in models}
+    rows = {row.label: row for row in ModelVersion.objects.filter(label__in=labels)}
+    now = time.time()
+    missing = [
+        ModelVersion(label=label, timestamp=now, version=uuid.uuid4().hex) for label in labels if label not in rows
+    ]
+    if missing:
+        ModelVersion.objects.bulk_create(missing, ignore_conflicts=True)
+        rows.update((row.label, row) for row in missing)
+    return {model: (rows[label].timestamp, rows[label].version) for label, model in labels.items()}
+
+
+def _bump(label):
+    from electronics.models import ModelVersion
+
+    now, version = time.time(), uuid.uuid4().hex
+    # Last-Modified передается с точностью до секунды: новая версия всегда переходит хотя бы на следующую
+    # секунду, иначе клиент, получивший ответ в ту же секунду, на If-Modified-Since получил бы 304
+    updated = ModelVersion.objects.filter(label=label).update(
+        timestamp=Greatest(Value(now), Floor(F("timestamp")) + 1), version=version
+    )
+    if not updated:
+        row = ModelVersion(label=label, timestamp=now, version=version)
+        ModelVersion.objects.bulk_create([row], ignore_conflicts=True)
+
+
+def bump_model_version(model):
+    """
+    Новая версия после фиксации транзакции: до фиксации другие процессы не видят ни данных, ни версии,
+    а строка версии не остается заблокированной до конца транзакции изменения.
+    """
+    label = model_label(model)
+    transaction.on_commit(lambda: _bump(label))
@@ -0,0 +1,30 @@
+from django.db import connections
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from config.db.pool import pool_stats
+
+
+class DatabasePoolView(APIView):
+    """
+    Служебная статистика соединений с базами: настройки постоянных соединений и, для баз с пулом,
+    занятые, свободные и ожидающие соединения, время ожидания и число отказов по timeout.
+    """
+
+    permission_classes = [IsAdminUser]
+    swagger_schema = None
+
+    def get(self, request):
+        pools = pool_stats()
+        databases = {}
+        for alias in connections:
+            settings_dict = connections[alias].settings_dict
+            databases[alias] = {
+                "engine": settings_dict["ENGINE"],
+                "conn_max_age": settings_dict["CONN_MAX_AGE"],
+                "conn_health_checks": settings_dict["CONN_HEALTH_CHECKS"],
+                "pool": pools.get(alias),
+            }
+        return Response(databases)
+
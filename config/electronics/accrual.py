@@ -0,0 +1,71 @@
+from time import perf_counter
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from electronics.cache import invalidate_network_objects
+from electronics.filters import filter_network_objects
+from electronics.models import DebtAccrualRule, DebtAccrualRun, NetworkObject
+
+ACCRUAL_CHUNK_SIZE = 1000
+
+
+def run_accruals(run_date=None, rules=None, chunk_size=ACCRUAL_CHUNK_SIZE):
+    """
+    Применяет активные правила начисления (или правила rules) за дату run_date (по умолчанию сегодня).
+    Уже завершенные за эту дату правила пропускаются, прерванные продолжаются с сохраненного cursor.
+    Возвращает запуски, которые обработал этот процесс.
+    """
+    run_date = run_date or timezone.localdate()
+    if rules is None:
+        rules = DebtAccrualRule.objects.filter(is_active=True)
+    runs = []
+    for rule in rules.select_related("provider").order_by("pk"):
+        run, _ = DebtAccrualRun.objects.get_or_create(rule=rule, run_date=run_date)
+        if run.status != DebtAccrualRun.DONE and process_run(run, chunk_size):
+            run.refresh_from_db()
+            runs.append(run)
+    return runs
+
+
+def process_run(run, chunk_size=ACCRUAL_CHUNK_SIZE):
+    """
+    Обрабатывает запуск порциями по chunk_size объектов в порядке id. Каждая порция - отдельная короткая
+    транзакция: строка запуска блокируется через select_for_update(skip_locked=True), затем один UPDATE
+    долга, запись в журнал и сдвиг cursor. Если строку держит другой процесс, этот процесс уступает и
+    возвращает False. Строки объектов и сводных сумм поставщиков блокируются в порядке id, поэтому
+    параллельные запуски с общими поставщиками ждут друг друга, а не взаимоблокируются.
+    """
+    rule = run.rule
+    queryset = filter_network_objects(rule.params)
+    while True:
+        started = perf_counter()
+        with transaction.atomic():
+            locked = (
+                DebtAccrualRun.objects.select_for_update(skip_locked=True)
+                .filter(pk=run.pk, status=DebtAccrualRun.RUNNING)
+                .first()
+            )
+            if locked is None:
+                return False
+            chunk = list(
+                queryset.filter(pk__gt=locked.cursor or 0).order_by("pk").values_list("pk", flat=True)[:chunk_size]
+            )
+            if not chunk:
+                DebtAccrualRun.objects.filter(pk=run.pk).update(
+                    status=DebtAccrualRun.DONE,
+                    finished_at=timezone.now(),
+                    duration=F("duration") + perf_counter() - started,
+                )
+                return True
+            operation = NetworkObject.objects.filter(pk__in=chunk).change_debt(
+                rule.operation, amount=rule.amount, params={"accrual_rule": rule.pk, "accrual_run": run.pk}
+            )
+            invalidate_network_objects(chunk)
+            DebtAccrualRun.objects.filter(pk=run.pk).update(
+                cursor=chunk[-1],
+                processed=F("processed") + len(chunk),
+                debt_delta=F("debt_delta") + operation.debt_delta,
+                duration=F("duration") + perf_counter() - started,
+            )
@@ -1,12 +1,113 @@
+from django import forms
+from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin.exceptions import DisallowedModelAdminLookup
+from django.contrib.admin.views.main import ERROR_FLAG, IGNORED_PARAMS, PAGE_VAR, SEARCH_VAR
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.db import connection
 from django.utils.html import format_html
-from electronics.models import NetworkObject, Product
+from electronics.models import DebtAccrualRule, DebtAccrualRun, DebtOperation, Job, NetworkObject, Product
+from electronics.paginators import EstimatedCountPaginator
+from electronics.tasks import enqueue_job
 
 
-# Создаем пользовательское действие для очистки долга перед поставщиком
+class WidgetFilter(admin.FieldListFilter):
+    """
+    Фильтр списка в виде поля формы вместо перечня всех значений поля: на больших таблицах перечень
+    строится запросом DISTINCT по всей таблице и не помещается на странице.
+    Значение передается в параметре <поле>__<lookup>, остальные параметры списка сохраняются.
+    По умолчанию - текстовое поле и точное совпадение; подклассы меняют lookup и get_widget.
+    """
+
+    template = "admin/electronics/widget_filter.html"
+    lookup = "exact"
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.lookup_kwarg = f"{field_path}__{self.lookup}"
+        self.lookup_val = params.get(self.lookup_kwarg)
+        self.model_admin = model_admin
+        super().__init__(field, request, params, model, model_admin, field_path)
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+
+    def get_widget(self):
+        return forms.TextInput()
+
+    def choices(self, changelist):
+        yield {
+            "selected": self.lookup_val is not None,
+            "widget": self.get_widget().render(self.lookup_kwarg, self.lookup_val),
+            "params": [(name, value) for name, value in changelist.params.items() if name != self.lookup_kwarg],
+            "reset_query_string": changelist.get_query_string(remove=[self.lookup_kwarg]),
+        }
+
+
+class InputFilter(WidgetFilter):
+    """
+    Поиск подстроки в поле (icontains); на PostgreSQL использует триграммные индексы поиска.
+    """
+
+    lookup = "icontains"
+
+    def get_widget(self):
+        return forms.TextInput(attrs={"type": "search", "style": "width: 100%"})
+
+
+class NumberFilter(WidgetFilter):
+    """
+    Точное значение числового поля.
+    """
+
+    def get_widget(self):
+        return forms.NumberInput(attrs={"style": "width: 100%"})
+
+
+class AutocompleteFilter(WidgetFilter):
+    """
+    Выбор связанного объекта через автодополнение админки (поиск по search_fields его ModelAdmin).
+    """
+
+    def get_widget(self):
+        widget = AutocompleteSelect(
+            self.field, self.model_admin.admin_site, attrs={"onchange": "this.form.submit()", "style": "width: 100%"}
+        )
+        widget.choices = forms.ModelChoiceField(self.field.remote_field.model._default_manager.all()).choices
+        return widget
+
+
+def changelist_selection(modeladmin, request, queryset):
+    """
+    Параметры фоновой задачи, по которым она сама выберет строки действия. При выборе всех объектов
+    списка - условия фильтров (lookups, как в строке запроса списка) и поиск (filters.search), а не id
+    всех строк; иначе - id отмеченных строк, которых не больше одной страницы списка.
+    """
+    if request.POST.get("select_across") != "1":
+        return {"filters": {}, "ids": list(queryset.order_by().values_list("pk", flat=True))}
+    lookups = {}
+    for key, value in request.GET.items():
+        if key in (*IGNORED_PARAMS, PAGE_VAR, ERROR_FLAG):
+            continue
+        if not modeladmin.lookup_allowed(key, value):
+            raise DisallowedModelAdminLookup(f"Фильтрация по {key} запрещена")
+        lookups[key] = value
+    search = request.GET.get(SEARCH_VAR, "").strip()
+    return {"filters": {"search": [search]} if search else {}, "lookups": lookups}
+
+
+# Создаем пользовательское действие для очистки долга перед поставщиком.
+# Обнуление выполняется фоновой задачей порциями, поэтому страница админки отвечает сразу
 @admin.action(description="Очистить долг перед поставщиком")
 def clear_debt_to_provider(modeladmin, request, queryset):
-    queryset.update(debt_to_provider=0.00)
+    params = {"operation": DebtOperation.CLEAR, "amount": None, **changelist_selection(modeladmin, request, queryset)}
+    job = enqueue_job(Job.DEBT, params, request.user)
+    modeladmin.message_user(request, f"Очистка долга поставлена в очередь: задача #{job.pk}")
+
+
+@admin.action(description="Пересчитать иерархию и сводные суммы долга")
+def rebuild_hierarchy(modeladmin, request, queryset):
+    job = enqueue_job(Job.REBUILD_HIERARCHY, {}, request.user)
+    modeladmin.message_user(request, f"Пересчет поставлен в очередь: задача #{job.pk}")
 
 
 # Регистрируем и настраиваем модель Product в административном интерфейсе
@@ -45,35 +146,85 @@ class NetworkObjectAdmin(admin.ModelAdmin):
         "house",
         "phone_number",
         "provider",
+        "level",
         "debt_to_provider",
         "time_of_creation",
         "display_full_address",
         "debt_status",
         "display_products",
     )
+    # Поставщик подгружается в запросе списка: автоматический select_related() пропускает FK с null=True
+    list_select_related = ("provider",)
     # Поля, по которым можно фильтровать в административном интерфейсе
-    list_filter = ("name", "town", "provider")
+    list_filter = ("name", "town", "provider", "level")
     # Поля, по которым можно осуществлять поиск в административном интерфейсе
     search_fields = (
         "name__icontains", "country__icontains", "town__icontains", "street__icontains", "phone_number__icontains")
-    # Поля, которые можно редактировать в режиме списка
-    list_editable = ("email", "phone_number")
     # Поля, которые можно редактировать в режиме редактирования
-    readonly_fields = ("id", "time_of_creation")
+    readonly_fields = (
+        "id",
+        "time_of_creation",
+        "level",
+        "path",
+        "display_descendants_count",
+        "subtree_debt",
+        "subtree_over_limit",
+    )
     # Группируем поля в разделах в режиме редактирования
     fieldsets = (
         ("Основная информация", {"fields": ("name", "email", "phone_number")}),
         ("Адрес", {"fields": ("country", "town", "street", "house")}),
         ("Долг перед поставщиком", {"fields": ("provider", "debt_to_provider")}),
+        (
+            "Иерархия",
+            {"fields": ("level", "path", "display_descendants_count", "subtree_debt", "subtree_over_limit")},
+        ),
     )
     # Добавляем возможность упрощенного выбора связанных продуктов в режиме редактирования
     filter_horizontal = ("products",)
     # Добавляем пользовательское действие для модели NetworkObject
-    actions = [clear_debt_to_provider]
+    actions = [clear_debt_to_provider, rebuild_hierarchy]
+
+    # В режиме для больших таблиц (ADMIN_SCALABLE_CHANGELIST) редактирование в списке отключено
+    @property
+    def list_editable(self):
+        return () if settings.ADMIN_SCALABLE_CHANGELIST else ("email", "phone_number")
+
+    # В режиме для больших таблиц не выполняется второй COUNT(*) по всей таблице
+    @property
+    def show_full_result_count(self):
+        return not settings.ADMIN_SCALABLE_CHANGELIST
+
+    @property
+    def media(self):
+        media = super().media
+        if settings.ADMIN_SCALABLE_CHANGELIST:
+            media += AutocompleteSelect(NetworkObject._meta.get_field("provider"), self.admin_site).media
+        return media
+
+    # В режиме для больших таблиц фильтры не перечисляют значения: название и город ищутся по подстроке,
+    # поставщик выбирается через автодополнение, уровень вводится числом
+    def get_list_filter(self, request):
+        if settings.ADMIN_SCALABLE_CHANGELIST:
+            return (
+                ("name", InputFilter),
+                ("town", InputFilter),
+                ("provider", AutocompleteFilter),
+                ("level", NumberFilter),
+            )
+        return super().get_list_filter(request)
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        if settings.ADMIN_SCALABLE_CHANGELIST:
+            return EstimatedCountPaginator(queryset, per_page, orphans, allow_empty_first_page)
+        return super().get_paginator(request, queryset, per_page, orphans, allow_empty_first_page)
 
-    # Переопределяем метод get_queryset для предзагрузки связанных продуктов и улучшения производительности
+    # Переопределяем метод get_queryset для предзагрузки связанных продуктов и улучшения производительности.
+    # В режиме для больших таблиц на PostgreSQL названия продуктов собираются в SQL (with_product_names)
     def get_queryset(self, request):
-        qs = super().get_queryset(request)
+        qs = super().get_queryset(request).with_debt_status()
+        if settings.ADMIN_SCALABLE_CHANGELIST and connection.vendor == "postgresql":
+            return qs.with_product_names()
         return qs.prefetch_related("products")
 
     # Пользовательский метод для отображения полного адреса объекта сети в административном интерфейсе
@@ -83,6 +234,7 @@ class NetworkObjectAdmin(admin.ModelAdmin):
     display_full_address.short_description = "Полный адрес"
 
     # Пользовательский метод для отображения статуса долга объекта сети в административном интерфейсе
+    # Признак берется из аннотации with_debt_status(), поэтому колонка сортируется в SQL
     def debt_status(self, obj):
         if obj.check_debt():
             return format_html('<span style="color: red;">Долг</span>')
@@ -91,9 +243,93 @@ class NetworkObjectAdmin(admin.ModelAdmin):
 
     debt_status.short_description = "Статус долга"
     debt_status.allow_tags = True
+    debt_status.admin_order_field = "debt_over_limit"
 
     # Пользовательский метод для отображения связанных продуктов объекта сети в административном интерфейсе
     def display_products(self, obj):
+        if hasattr(obj, "product_names"):
+            return obj.product_names or ""
         return ", ".join([p.name for p in obj.products.all()])
 
     display_products.short_description = "Продукты"
+
+    # Пользовательский метод для отображения размера поддерева объекта сети (один запрос по индексу пути)
+    def display_descendants_count(self, obj):
+        if obj.pk is None:
+            return 0
+        return obj.get_descendants().count()
+
+    display_descendants_count.short_description = "Объектов ниже в цепочке"
+
+
+# Журнал массовых операций с долгом доступен только для чтения
+@admin.register(DebtOperation)
+class DebtOperationAdmin(admin.ModelAdmin):
+    list_display = ("id", "operation", "amount", "affected", "debt_delta", "user", "created_at")
+    list_filter = ("operation",)
+    readonly_fields = ("operation", "amount", "user", "params", "affected", "debt_delta", "created_at")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+# Фоновые задачи: статус и прогресс, только для чтения
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "kind", "status", "processed", "total", "attempts", "user", "created_at", "finished_at")
+    list_filter = ("kind", "status")
+    readonly_fields = (
+        "kind",
+        "status",
+        "params",
+        "total",
+        "processed",
+        "cursor",
+        "result",
+        "error",
+        "attempts",
+        "user",
+        "created_at",
+        "started_at",
+        "finished_at",
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+# Правила ежедневного начисления долга; запуски по ним - только для чтения
+@admin.register(DebtAccrualRule)
+class DebtAccrualRuleAdmin(admin.ModelAdmin):
+    list_display = ("id", "name", "operation", "amount", "provider", "is_active")
+    list_filter = ("operation", "is_active")
+    raw_id_fields = ("provider",)
+
+
+@admin.register(DebtAccrualRun)
+class DebtAccrualRunAdmin(admin.ModelAdmin):
+    list_display = ("id", "rule", "run_date", "status", "processed", "debt_delta", "duration", "rows_per_second")
+    list_filter = ("status", "run_date")
+    readonly_fields = (
+        "rule",
+        "run_date",
+        "status",
+        "cursor",
+        "processed",
+        "debt_delta",
+        "duration",
+        "started_at",
+        "finished_at",
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
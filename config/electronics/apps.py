@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ElectronicsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "electronics"
+
+    def ready(self):
+        import electronics.checks  # noqa: F401
+        import electronics.signals  # noqa: F401
@@ -0,0 +1,137 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count
+from django.http import JsonResponse
+from rest_framework.exceptions import MethodNotAllowed, NotAuthenticated, NotFound
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.utils.urls import replace_query_param
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from config.db.router import is_reading_from_replica
+from electronics.cache import detail_cache_key, get_cache
+from electronics.models import NetworkObject, Product
+from electronics.paginators import KeysetPagination
+from electronics.serializers import NetworkObjectDetailSerializer, NetworkObjectSerializer, ProductSerializer
+from users.authentication import CachedJWTAuthentication, store_flags, user_flags
+from users.models import User
+from users.permissions import IsActiveAndIsStaff
+
+ASYNC_PAGE_SIZE = 50
+
+
+async def authenticate(request):
+    """
+    Пользователь из JWT (как CachedJWTAuthentication, но при промахе кеша запрос пользователя идет
+    через асинхронный ORM) или, без заголовка Authorization, из сессии.
+    """
+    jwt = CachedJWTAuthentication()
+    header = jwt.get_header(request)
+    if header is None:
+        return await sync_to_async(get_user)(request)
+    raw_token = jwt.get_raw_token(header)
+    if raw_token is None:
+        return None
+    token = jwt.get_validated_token(raw_token)
+    user = jwt.get_cached_user(token)
+    if user is None:
+        user = await User.objects.filter(**{api_settings.USER_ID_FIELD: token[api_settings.USER_ID_CLAIM]}).afirst()
+        if user is not None:
+            store_flags(user.pk, user_flags(user))
+    return user
+
+
+def error(detail, status):
+    return JsonResponse({"detail": str(detail)}, status=status, json_dumps_params={"ensure_ascii": False})
+
+
+def staff_only(view):
+    """
+    Только чтение и доступ как у синхронных представлений: только активные сотрудники.
+    """
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            return error(MethodNotAllowed.default_detail.format(method=request.method), 405)
+        try:
+            user = await authenticate(request)
+        except InvalidToken:
+            return error(InvalidToken.default_detail, 401)
+        except AuthenticationFailed as exc:
+            # Исключения simplejwt хранят сообщение и код в словаре
+            return error(exc.detail["detail"], 401)
+        if user is None or not user.is_authenticated:
+            return error(NotAuthenticated.default_detail, 401)
+        if not (user.is_active and user.is_staff):
+            return error(IsActiveAndIsStaff.message, 403)
+        return await view(request, *args, **kwargs)
+
+    return wrapper
+
+
+async def paginated_list(request, queryset, serializer_class):
+    """
+    Страница списка в порядке id: курсор ?after=<id последней записи>, размер - ?page_size= (до
+    KeysetPagination.max_page_size). Формат ответа совпадает с курсорной пагинацией синхронных списков.
+    """
+    try:
+        after = int(request.GET.get("after", 0))
+        page_size = min(int(request.GET.get("page_size", ASYNC_PAGE_SIZE)), KeysetPagination.max_page_size)
+    except ValueError:
+        return error(KeysetPagination.invalid_cursor_message, 404)
+    if page_size < 1:
+        page_size = ASYNC_PAGE_SIZE
+    objects = [item async for item in queryset.filter(pk__gt=after).order_by("pk")[: page_size + 1]]
+    page = objects[:page_size]
+    next_url = None
+    if len(objects) > page_size:
+        next_url = replace_query_param(request.build_absolute_uri(), "after", page[-1].pk)
+    data = {"next": next_url, "previous": None, "results": serializer_class(page, many=True).data}
+    return JsonResponse(data, encoder=DjangoJSONEncoder, json_dumps_params={"ensure_ascii": False})
+
+
+async def cached_detail(queryset, serializer_class, pk):
+    """
+    Карточка объекта через тот же кеш, что и retrieve синхронных представлений (CachedRetrieveMixin).
+    """
+    cache = get_cache()
+    key = detail_cache_key(queryset.model, pk)
+    entry = await cache.aget(key) or {}
+    if "" not in entry:
+        try:
+            instance = await queryset.aget(pk=pk)
+        except queryset.model.DoesNotExist:
+            return error(NotFound.default_detail, 404)
+        entry[""] = dict(serializer_class(instance).data)
+        if not is_reading_from_replica():
+            await cache.aset(key, entry)
+    return JsonResponse(entry[""], encoder=DjangoJSONEncoder, json_dumps_params={"ensure_ascii": False})
+
+
+@staff_only
+async def product_list(request):
+    return await paginated_list(request, Product.objects.all(), ProductSerializer)
+
+
+@staff_only
+async def product_detail(request, pk):
+    return await cached_detail(Product.objects.all(), ProductSerializer, pk)
+
+
+@staff_only
+async def networkobject_list(request):
+    return await paginated_list(request, NetworkObject.objects.with_debt_status(), NetworkObjectSerializer)
+
+
+@staff_only
+async def networkobject_detail(request, pk):
+    queryset = (
+        NetworkObject.objects.with_debt_status()
+        .prefetch_related("products")
+        .annotate(products_count=Count("products"))
+    )
+    return await cached_detail(queryset, NetworkObjectDetailSerializer, pk)
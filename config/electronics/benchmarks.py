@@ -0,0 +1,363 @@
+import asyncio
+import random
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from time import perf_counter
+
+from django.db import connection
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.tokens import AccessToken
+
+from electronics.cache import detail_cache_key, get_cache
+from electronics.fast import ORJSONRenderer, get_row_encoder
+from electronics.filters import search_condition
+from electronics.models import NetworkObject, Product
+from electronics.serializers import NetworkObjectSerializer, ProductSerializer
+from users.models import User
+
+BENCH_PREFIX = "bench"
+SEED_BATCH_SIZE = 5000
+TOWNS = ("Москва", "Санкт-Петербург", "Казань", "Новосибирск", "Екатеринбург", "Самара", "Омск", "Пермь")
+COUNTRIES = ("Россия", "Казахстан", "Беларусь")
+STREETS = ("Ленина", "Мира", "Садовая", "Центральная", "Победы")
+# Нагрузка набора asgi: одновременных запросов и запросов в одном замере
+ASGI_CONCURRENCY = 20
+ASGI_REQUESTS = 200
+# Порция строк набора serializers: сериализуется и рендерится целиком, как одна большая страница
+SERIALIZE_CHUNK_SIZE = 10000
+
+SUITES = {}
+
+
+def suite(name):
+    """
+    Регистрирует функцию как набор замеров для команды benchmark.
+    """
+
+    def decorator(func):
+        SUITES[name] = func
+        return func
+
+    return decorator
+
+
+def measure(func, repeat):
+    """
+    Выполняет func repeat раз и возвращает медиану и минимум времени в миллисекундах.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        func()
+        timings.append((perf_counter() - start) * 1000)
+    return statistics.median(timings), min(timings)
+
+
+def count_queries(func):
+    """
+    Количество SQL-запросов, которые выполняет func (через execute_wrapper: запросы страниц Django
+    сбрасывают журнал connection.queries в начале каждого запроса).
+    """
+    queries = []
+
+    def wrapper(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(wrapper):
+        func()
+    return len(queries)
+
+
+def report(stdout, suite_name, case, rows, median_ms, min_ms, extra=""):
+    stdout.write(f"{suite_name:<12} {case:<40} rows={rows:<9} median={median_ms:9.2f} ms  min={min_ms:9.2f} ms {extra}")
+
+
+def seed_network(rows, seed=0):
+    """
+    Дозаполняет таблицу объектов сети до rows строк: 1% заводов и розничные объекты под ними.
+    Строки вставляются через bulk_create, индекс иерархии и сводные суммы долга пересчитываются один раз в конце.
+    Возвращает количество добавленных строк.
+    """
+    missing = rows - NetworkObject.objects.count()
+    if missing <= 0:
+        return 0
+    rng = random.Random(seed)
+    factories_count = max(1, missing // 100)
+
+    def build(index, provider_id=None):
+        return NetworkObject(
+            name=f"{BENCH_PREFIX} {'Завод' if provider_id is None else 'Магазин'} {index}",
+            email=f"{BENCH_PREFIX}{index}@example.com",
+            country=rng.choice(COUNTRIES),
+            town=rng.choice(TOWNS),
+            street=rng.choice(STREETS),
+            house=rng.randint(1, 200),
+            phone_number=f"+7{rng.randint(9000000000, 9999999999)}",
+            provider_id=provider_id,
+            debt_to_provider=round(rng.uniform(0, 20000), 2),
+        )
+
+    factories = [build(index) for index in range(factories_count)]
+    NetworkObject.objects.bulk_create(factories, batch_size=SEED_BATCH_SIZE)
+    factory_ids = [factory.pk for factory in factories]
+    for start in range(factories_count, missing, SEED_BATCH_SIZE):
+        batch = [
+            build(index, provider_id=factory_ids[index % factories_count])
+            for index in range(start, min(start + SEED_BATCH_SIZE, missing))
+        ]
+        NetworkObject.objects.bulk_create(batch)
+    NetworkObject.objects.rebuild_hierarchy()
+    NetworkObject.objects.rebuild_debt_rollups()
+    return missing
+
+
+def seed_products(rows, seed=0):
+    """
+    Дозаполняет таблицу продуктов до rows строк.
+    """
+    missing = rows - Product.objects.count()
+    if missing <= 0:
+        return 0
+    rng = random.Random(seed)
+    words = ("Телевизор", "Смартфон", "Ноутбук", "Планшет", "Наушники", "Монитор")
+    for start in range(0, missing, SEED_BATCH_SIZE):
+        Product.objects.bulk_create(
+            Product(
+                name=f"{BENCH_PREFIX} {rng.choice(words)} {index}",
+                model=f"X{rng.randint(100, 999)}",
+                description=" ".join(rng.choice(words) for _ in range(20)),
+            )
+            for index in range(start, min(start + SEED_BATCH_SIZE, missing))
+        )
+    return missing
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def cleanup():
+    """
+    Удаляет строки, созданные функциями seed_*.
+    """
+    NetworkObject.objects.filter(name__startswith=BENCH_PREFIX).delete()
+    Product.objects.filter(name__startswith=BENCH_PREFIX).delete()
+    User.objects.filter(email__startswith=BENCH_PREFIX).delete()
+
+
+@suite("search")
+def search_suite(rows, repeat, stdout):
+    """
+    Задержка поиска icontains по search_fields списков (первая страница из 50 строк).
+    На PostgreSQL печатает также первую строку плана, чтобы было видно использование триграммных индексов.
+    """
+    from electronics.views import NetworkObjectViewSet, ProductViewSet
+
+    seed_network(rows)
+    seed_products(rows)
+    cases = [
+        (NetworkObject, NetworkObjectViewSet.search_fields, "Магазин 4242"),
+        (NetworkObject, NetworkObjectViewSet.search_fields, "Казань"),
+        (NetworkObject, NetworkObjectViewSet.search_fields, "+7955"),
+        (Product, ProductViewSet.search_fields, "Ноутбук 777"),
+    ]
+    for model, fields, term in cases:
+        queryset = model.objects.filter(search_condition(fields, term))[:50]
+        median_ms, min_ms = measure(lambda: list(queryset.all()), repeat)
+        plan = ""
+        if connection.vendor == "postgresql":
+            plan = queryset.explain().splitlines()[0]
+        report(stdout, "search", f"{model.__name__} «{term}»", model.objects.count(), median_ms, min_ms, plan)
+    if connection.vendor == "postgresql":
+        queryset = Product.objects.search("Ноутбук 777")[:50]
+        median_ms, min_ms = measure(lambda: list(queryset.all()), repeat)
+        plan = queryset.explain().splitlines()[0]
+        report(stdout, "search", "Product полнотекстовый «Ноутбук 777»", Product.objects.count(), median_ms, min_ms, plan)
+
+
+@suite("analytics")
+def analytics_suite(rows, repeat, stdout):
+    """
+    Аналитика долга: GROUP BY по стране, городу и поставщику, рейтинг заводов по сводному долгу поддерева
+    и стоимость инкрементального обновления сводных сумм при изменении долга одного объекта.
+    """
+    seed_network(rows)
+    total = NetworkObject.objects.count()
+    for group in ("country", "town", "provider"):
+        median_ms, min_ms = measure(lambda: list(NetworkObject.objects.debt_summary(group)), repeat)
+        report(stdout, "analytics", f"group={group}", total, median_ms, min_ms)
+    top = NetworkObject.objects.filter(level=0).order_by("-subtree_debt", "id").values("id", "subtree_debt")[:50]
+    median_ms, min_ms = measure(lambda: list(top.all()), repeat)
+    report(stdout, "analytics", "group=subtree (сводные поля)", total, median_ms, min_ms)
+    shop = NetworkObject.objects.filter(level__gt=0).order_by("pk").first()
+
+    def change_debt():
+        shop.debt_to_provider = (shop.debt_to_provider or 0) + 1
+        shop.save(update_fields=["debt_to_provider"])
+
+    median_ms, min_ms = measure(change_debt, repeat)
+    report(stdout, "analytics", "save() со сдвигом сводных сумм", total, median_ms, min_ms)
+
+
+def bench_staff_headers():
+    """
+    Заголовок авторизации сотрудника для замеров через HTTP-клиент.
+    """
+    user = User.objects.filter(email=f"{BENCH_PREFIX}-staff@example.com").first()
+    if user is None:
+        user = User(email=f"{BENCH_PREFIX}-staff@example.com", first_name="Bench", last_name="Staff", is_staff=True)
+        user.set_unusable_password()
+        user.save()
+    return {"Authorization": f"Bearer {AccessToken.for_user(user)}"}
+
+
+def run_wsgi(urls, headers):
+    """
+    Запросы через WSGI-обработчик в ASGI_CONCURRENCY потоках, как у многопоточного WSGI-сервера.
+    """
+
+    def get(url):
+        return Client().get(url, headers=headers).status_code
+
+    with ThreadPoolExecutor(max_workers=ASGI_CONCURRENCY) as executor:
+        return list(executor.map(get, urls))
+
+
+def run_asgi(urls, headers):
+    """
+    Запросы через ASGI-обработчик в одном цикле событий, не больше ASGI_CONCURRENCY одновременно.
+    """
+
+    async def main():
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(ASGI_CONCURRENCY)
+
+        async def get(url):
+            async with semaphore:
+                return (await client.get(url, headers=headers)).status_code
+
+        return await asyncio.gather(*(get(url) for url in urls))
+
+    return asyncio.run(main())
+
+
+@suite("asgi")
+def asgi_suite(rows, repeat, stdout):
+    """
+    Пропускная способность чтения при ASGI_CONCURRENCY одновременных запросах: WSGI в потоках, ASGI с
+    синхронными представлениями DRF (выполняются в одном потоке через sync_to_async) и асинхронные
+    эндпоинты async/. Запросы идут через обработчики Django внутри процесса, без сетевого сервера.
+    Кеш карточек сбрасывается перед каждым замером.
+    """
+    seed_network(rows)
+    headers = bench_staff_headers()
+    rng = random.Random(0)
+    ids = list(NetworkObject.objects.order_by("?").values_list("pk", flat=True)[:ASGI_REQUESTS])
+    total = NetworkObject.objects.count()
+    cases = [
+        ("карточка", "networkobject-detail", [(rng.choice(ids),) for _ in range(ASGI_REQUESTS)]),
+        ("список", "networkobject-list", [()] * ASGI_REQUESTS),
+    ]
+    modes = [("WSGI", run_wsgi, ""), ("ASGI sync", run_asgi, ""), ("ASGI async", run_asgi, "async-")]
+    with override_settings(ALLOWED_HOSTS=["testserver"]):
+        for case, name, args in cases:
+            for mode, runner, prefix in modes:
+                urls = [reverse(f"network:{prefix}{name}", args=item) for item in args]
+
+                def run():
+                    get_cache().delete_many([detail_cache_key(NetworkObject, pk) for pk in ids])
+                    statuses = runner(urls, headers)
+                    assert set(statuses) == {200}, f"{mode}: {set(statuses)}"
+
+                median_ms, min_ms = measure(run, repeat)
+                rps = ASGI_REQUESTS / median_ms * 1000
+                report(stdout, "asgi", f"{mode} {case}", total, median_ms, min_ms, f"{rps:.0f} req/s")
+
+
+@suite("serializers")
+def serializers_suite(rows, repeat, stdout):
+    """
+    Скорость выдачи списков в строках в секунду: ModelSerializer с JSONRenderer против быстрого режима
+    (?fast=1: .values(), FastRowEncoder и ORJSONRenderer). Таблица читается итератором порциями по
+    SERIALIZE_CHUNK_SIZE строк, поэтому память не зависит от rows; время включает запрос к базе.
+    """
+    seed_network(rows)
+    seed_products(rows)
+    cases = [
+        (NetworkObjectSerializer, NetworkObject.objects.with_debt_status()),
+        (ProductSerializer, Product.objects.all()),
+    ]
+    for serializer_class, queryset in cases:
+        queryset = queryset.order_by("pk")[:rows]
+        encoder = get_row_encoder(serializer_class)
+        total = queryset.count()
+
+        def current():
+            renderer = JSONRenderer()
+            for batch in batches(queryset.iterator(chunk_size=SERIALIZE_CHUNK_SIZE), SERIALIZE_CHUNK_SIZE):
+                renderer.render(serializer_class(batch, many=True).data)
+
+        def fast():
+            renderer = ORJSONRenderer()
+            rows_iterator = encoder.values(queryset).iterator(chunk_size=SERIALIZE_CHUNK_SIZE)
+            for batch in batches(rows_iterator, SERIALIZE_CHUNK_SIZE):
+                renderer.render(encoder.encode(batch))
+
+        model_name = queryset.model.__name__
+        for case, func in (("ModelSerializer", current), ("fast: values + orjson", fast)):
+            median_ms, min_ms = measure(func, repeat)
+            rate = total / median_ms * 1000 if median_ms else 0
+            report(stdout, "serializers", f"{model_name} {case}", total, median_ms, min_ms, f"{rate:,.0f} rows/s")
+
+
+def bench_admin_client():
+    """
+    Клиент с сессией суперпользователя для замеров страниц админки.
+    """
+    user = User.objects.filter(email=f"{BENCH_PREFIX}-admin@example.com").first()
+    if user is None:
+        user = User(email=f"{BENCH_PREFIX}-admin@example.com", first_name="Bench", last_name="Admin", is_staff=True)
+        user.is_superuser = True
+        user.set_unusable_password()
+        user.save()
+    client = Client()
+    client.force_login(user)
+    return client
+
+
+@suite("admin")
+def admin_suite(rows, repeat, stdout):
+    """
+    Время ответа списка объектов сети в админке в обычном режиме и в режиме ADMIN_SCALABLE_CHANGELIST:
+    без фильтров, с фильтром по поставщику и с поиском. В конце строки - количество SQL-запросов страницы.
+    """
+    seed_network(rows)
+    client = bench_admin_client()
+    url = reverse("admin:electronics_networkobject_changelist")
+    provider = NetworkObject.objects.filter(level=0).order_by("pk").values_list("pk", flat=True).first()
+    total = NetworkObject.objects.count()
+    # Параметры фильтра по поставщику в обычном режиме и в режиме для больших таблиц
+    cases = [
+        ("без фильтров", {}, {}),
+        ("поставщик", {"provider__id__exact": provider}, {"provider__exact": provider}),
+        ("поиск «Магазин 4242»", {"q": "Магазин 4242"}, {"q": "Магазин 4242"}),
+    ]
+    with override_settings(ALLOWED_HOSTS=["testserver"]):
+        for case, default_params, scalable_params in cases:
+            for mode, scalable, params in (("обычный", False, default_params), ("scalable", True, scalable_params)):
+                with override_settings(ADMIN_SCALABLE_CHANGELIST=scalable):
+
+                    def run():
+                        response = client.get(url, params)
+                        assert response.status_code == 200, f"{mode} {case}: {response.status_code}"
+
+                    queries = count_queries(run)
+                    median_ms, min_ms = measure(run, repeat)
+                report(stdout, "admin", f"{mode} {case}", total, median_ms, min_ms, f"{queries} запросов")
+
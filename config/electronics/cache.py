@@ -0,0 +1,84 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+from config.db.router import is_reading_from_replica
+from electronics.models import NetworkObject
+
+CACHE_KEY_PREFIX = "electronics"
+INVALIDATION_CHUNK_SIZE = 1000
+
+
+def get_cache():
+    return caches[settings.ELECTRONICS_CACHE_ALIAS]
+
+
+def detail_cache_key(model, pk):
+    return f"{CACHE_KEY_PREFIX}:{model._meta.model_name}:{pk}"
+
+
+def invalidate(model, pks):
+    """
+    Удаляет закешированные ответы для объектов model с идентификаторами pks после фиксации транзакции,
+    чтобы параллельный запрос не успел закешировать данные, которые еще не записаны.
+    """
+    keys = [detail_cache_key(model, pk) for pk in pks]
+    if keys:
+        transaction.on_commit(lambda: get_cache().delete_many(keys))
+
+
+def invalidate_network_objects(pks):
+    invalidate(NetworkObject, pks)
+
+
+def invalidate_network_queryset(queryset):
+    """
+    Сбрасывает кеш всех объектов queryset, читая их id порциями.
+    """
+    chunk = []
+    for pk in queryset.order_by().values_list("pk", flat=True).iterator(chunk_size=INVALIDATION_CHUNK_SIZE):
+        chunk.append(pk)
+        if len(chunk) == INVALIDATION_CHUNK_SIZE:
+            invalidate_network_objects(chunk)
+            chunk = []
+    invalidate_network_objects(chunk)
+
+
+def invalidate_product_carriers(product_pks):
+    """
+    Сбрасывает кеш объектов сети, у которых в ассортименте есть продукты product_pks.
+    """
+    through = NetworkObject.products.through
+    carriers = through.objects.filter(product_id__in=product_pks).values("networkobject_id")
+    invalidate_network_queryset(NetworkObject.objects.filter(pk__in=carriers))
+
+
+class CachedRetrieveMixin:
+    """
+    Кеширует результат сериализации retrieve. Записи сбрасываются сигналами модели
+    (electronics.signals) и явными вызовами invalidate_* в массовых операциях. Ответы, прочитанные из
+    реплики, читаются из кеша, но не записываются в него.
+    """
+
+    def get_cache_variant(self):
+        """
+        Вариант ответа для одного объекта; представления с параметрами, меняющими ответ, переопределяют метод.
+        """
+        return ""
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = str(kwargs.get(self.lookup_url_kwarg or self.lookup_field, ""))
+        if not pk.isdigit():
+            return super().retrieve(request, *args, **kwargs)
+        cache = get_cache()
+        key = detail_cache_key(self.queryset.model, int(pk))
+        variant = self.get_cache_variant()
+        entry = cache.get(key) or {}
+        if variant in entry:
+            return Response(entry[variant])
+        response = super().retrieve(request, *args, **kwargs)
+        if not is_reading_from_replica():
+            entry[variant] = dict(response.data)
+            cache.set(key, entry)
+        return response
@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+BROKER_MESSAGE = "Не задан CELERY_BROKER_URL: фоновые задачи попадут в брокер в памяти и не будут выполнены"
+BROKER_HINT = "Укажите Redis или RabbitMQ в CELERY_BROKER_URL и запустите celery -A config worker"
+
+
+@register(Tags.compatibility)
+def check_celery_broker(app_configs, **kwargs):
+    """
+    Без брокера задачи, поставленные админкой и ?async=1, никто не выполнит: ошибка при DEBUG=False,
+    предупреждение при разработке. В режиме eager (тесты) брокер не нужен.
+    """
+    if settings.CELERY_TASK_ALWAYS_EAGER or not settings.CELERY_BROKER_URL.startswith("memory://"):
+        return []
+    if settings.DEBUG:
+        return [Warning(BROKER_MESSAGE, hint=BROKER_HINT, id="electronics.W001")]
+    return [Error(BROKER_MESSAGE, hint=BROKER_HINT, id="electronics.E001")]
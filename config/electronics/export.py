@@ -0,0 +1,95 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+
+from electronics.models import NetworkObject, Product
+
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_FIELDS = (
+    "id",
+    "name",
+    "email",
+    "country",
+    "town",
+    "street",
+    "house",
+    "phone_number",
+    "provider",
+    "level",
+    "debt_to_provider",
+    "time_of_creation",
+    "full_address",
+    "products",
+)
+
+EXPORT_CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def iter_network_rows(queryset=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Построчно выгружает объекты сети с продуктами, полным адресом и уровнем иерархии.
+    Строки читаются серверным курсором порциями по chunk_size, поэтому память не зависит от размера таблицы.
+    """
+    if queryset is None:
+        queryset = NetworkObject.objects.all()
+    queryset = queryset.order_by("pk").prefetch_related(
+        Prefetch("products", queryset=Product.objects.only("id", "name"))
+    )
+    for network_object in queryset.iterator(chunk_size=chunk_size):
+        yield {
+            "id": network_object.pk,
+            "name": network_object.name,
+            "email": network_object.email,
+            "country": network_object.country,
+            "town": network_object.town,
+            "street": network_object.street,
+            "house": network_object.house,
+            "phone_number": network_object.phone_number,
+            "provider": network_object.provider_id,
+            "level": network_object.level,
+            "debt_to_provider": network_object.debt_to_provider,
+            "time_of_creation": network_object.time_of_creation,
+            "full_address": network_object.get_full_address(),
+            "products": [{"id": product.pk, "name": product.name} for product in network_object.products.all()],
+        }
+
+
+def render_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + "\n"
+
+
+class Echo:
+    """
+    Объект с интерфейсом файла, который возвращает записанную строку вместо хранения.
+    """
+
+    def write(self, value):
+        return value
+
+
+def render_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        row["products"] = "; ".join(product["name"] for product in row["products"])
+        yield writer.writerow([row[field] for field in EXPORT_FIELDS])
+
+
+RENDERERS = {
+    "ndjson": render_ndjson,
+    "csv": render_csv,
+}
+
+
+def export_network(output, queryset=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Генератор строк выгрузки в формате output (ndjson или csv).
+    """
+    return RENDERERS[output](iter_network_rows(queryset, chunk_size=chunk_size))
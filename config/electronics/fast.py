@@ -0,0 +1,113 @@
+from functools import lru_cache
+
+import orjson
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+# Поля, у которых значение из .values() уже совпадает с тем, что вернул бы to_representation
+PASSTHROUGH_FIELDS = (
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.BooleanField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSON через orjson: тот же компактный вывод в UTF-8, что у JSONRenderer, но в несколько раз быстрее.
+    Типы, которых нет в orjson (Decimal, ленивые строки и т.п.), передаются кодировщику DRF.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return orjson.dumps(data, default=JSONEncoder().default)
+
+
+class FastRowEncoder:
+    """
+    Сериализация строк .values() в тот же JSON, что дает serializer_class, без создания моделей и
+    без обхода полей DRF для каждой строки.
+
+    При создании по полям сериализатора определяются колонки выборки и преобразования: для строк,
+    чисел, флагов и ссылок на id значение из базы берется как есть, для остальных полей (даты,
+    Decimal) заранее выбирается to_representation поля. Источник, который не является полем модели
+    или аннотацией выборки (свойство, метод), задается в Meta.fast_sources сериализатора:
+    {источник: колонка}.
+    """
+
+    def __init__(self, serializer_class, fields=None):
+        serializer = serializer_class()
+        sources = getattr(serializer.Meta, "fast_sources", {})
+        self.names, self.columns, self.converters = [], [], []
+        for name, field in serializer.fields.items():
+            if field.write_only or (fields is not None and name not in fields):
+                continue
+            column = sources.get(field.source, field.source)
+            if "." in column or column == "*":
+                raise ImproperlyConfigured(f"Поле {name}: источник {field.source} нельзя прочитать через values()")
+            self.names.append(name)
+            self.columns.append(column)
+            self.converters.append(None if isinstance(field, PASSTHROUGH_FIELDS) else field.to_representation)
+        self.converted = [
+            (name, column, converter)
+            for name, column, converter in zip(self.names, self.columns, self.converters)
+            if converter is not None
+        ]
+
+    def values(self, queryset):
+        """
+        Колонки полей плюс id и поля сортировки, которые нужны курсору пагинации (в ответ они не попадают).
+        """
+        query = queryset.query
+        ordering = query.order_by or (queryset.model._meta.ordering if query.default_ordering else ())
+        extra = [name.lstrip("-") for name in ordering if isinstance(name, str) and "__" not in name and name != "?"]
+        return queryset.values(*dict.fromkeys([*self.columns, "id", *extra]))
+
+    def encode(self, rows):
+        """
+        Преобразует словари из values() в словари ответа с именами и порядком полей сериализатора.
+        """
+        pairs, converted = list(zip(self.names, self.columns)), self.converted
+        result = []
+        for row in rows:
+            # Порядок ключей всегда по полям сериализатора: в values() аннотации идут после полей модели
+            item = {name: row[column] for name, column in pairs}
+            for name, column, converter in converted:
+                value = row[column]
+                item[name] = None if value is None else converter(value)
+            result.append(item)
+        return result
+
+
+@lru_cache(maxsize=None)
+def get_row_encoder(serializer_class, fields=None):
+    return FastRowEncoder(serializer_class, fields)
+
+
+class FastListMixin:
+    """
+    Быстрый режим списка (?fast=1): фильтры, поиск, сортировка и пагинация те же, но строки читаются
+    через .values(), сериализуются FastRowEncoder и отдаются через ORJSONRenderer. Форма JSON
+    совпадает с обычным списком. Выборочные поля (context["fields"]) поддерживаются, с раскрытием
+    связей (context["expand"]) используется обычный режим.
+    """
+
+    fast_query_param = "fast"
+
+    def list(self, request, *args, **kwargs):
+        context = self.get_serializer_context()
+        if request.query_params.get(self.fast_query_param) != "1" or context.get("expand"):
+            return super().list(request, *args, **kwargs)
+        encoder = get_row_encoder(self.get_serializer_class(), context.get("fields"))
+        queryset = encoder.values(self.filter_queryset(self.get_queryset()))
+        if request.accepted_renderer.format == "json":
+            request.accepted_renderer = ORJSONRenderer()
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(encoder.encode(page))
+        return Response(encoder.encode(queryset))
@@ -0,0 +1,101 @@
+from functools import reduce
+from operator import or_
+
+from django.contrib.admin.utils import prepare_lookup_value
+from django.db import connection
+from django.db.models import Q
+from django.http import QueryDict
+from django_filters import rest_framework as filters
+from rest_framework.filters import BaseFilterBackend
+
+from electronics.models import NetworkObject
+
+# Поля поиска (?search=) списка объектов сети
+NETWORK_SEARCH_FIELDS = ["name", "country", "town", "street", "phone_number"]
+
+
+def search_condition(fields, term):
+    """
+    То же условие, что строит DRF SearchFilter для одного слова: OR из icontains по всем полям.
+    """
+    return reduce(or_, (Q(**{f"{field}__icontains": term}) for field in fields))
+
+
+class NetworkObjectFilter(filters.FilterSet):
+    """
+    Класс фильтров списка объектов сети, в том числе по уровню и положению в иерархии.
+    """
+
+    ancestor = filters.NumberFilter(method="filter_ancestor", label="Поставщик любого уровня")
+    debt_over_limit = filters.BooleanFilter(method="filter_debt_over_limit", label="Долг превышает лимит")
+
+    class Meta:
+        model = NetworkObject
+        fields = {
+            "country": ("exact", "contains"),
+            "provider": ("exact",),
+            "level": ("exact", "lte", "gte"),
+        }
+
+    @staticmethod
+    def filter_ancestor(queryset, name, value):
+        """
+        Оставляет только объекты, которые прямо или косвенно снабжаются объектом value.
+        """
+        path = NetworkObject.objects.filter(pk=value).values_list("path", flat=True).first()
+        if path is None:
+            return queryset.none()
+        return queryset.filter(path__startswith=path).exclude(pk=value)
+
+    @staticmethod
+    def filter_debt_over_limit(queryset, name, value):
+        """
+        Условие в SQL; объекты без долга (NULL) считаются в пределах лимита.
+        """
+        over_limit = Q(debt_to_provider__gt=NetworkObject.MAX_DEBT)
+        return queryset.filter(over_limit) if value else queryset.exclude(over_limit)
+
+
+class ProductFullTextSearchFilter(BaseFilterBackend):
+    """
+    Полнотекстовый поиск продуктов по параметру q с ранжированием и подсветкой (PostgreSQL).
+    На других базах параметр q работает как обычный поиск icontains по search_fields представления.
+    """
+
+    search_param = "q"
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, "").strip()
+        if not text:
+            return queryset
+        if connection.vendor != "postgresql":
+            return queryset.filter(search_condition(view.search_fields, text))
+        return queryset.search(text)
+
+
+def filter_network_objects(params):
+    """
+    Объекты сети по сохраненным параметрам фоновой задачи: фильтры и поиск списка (filters - словарь
+    списков значений, как в строке запроса), условия фильтров списка админки (lookups), поддерево
+    поставщика provider и/или явный список ids.
+    """
+    queryset = NetworkObject.objects.all()
+    filters = QueryDict(mutable=True)
+    for key, values in (params.get("filters") or {}).items():
+        filters.setlist(key, [str(value) for value in values] if isinstance(values, list) else [str(values)])
+    filterset = NetworkObjectFilter(data=filters, queryset=queryset)
+    if not filterset.is_valid():
+        raise ValueError(filterset.errors)
+    queryset = filterset.qs
+    for term in " ".join(filters.getlist("search")).split():
+        queryset = queryset.filter(search_condition(NETWORK_SEARCH_FIELDS, term))
+    if params.get("lookups"):
+        queryset = queryset.filter(
+            **{key: prepare_lookup_value(key, value) for key, value in params["lookups"].items()}
+        )
+    if params.get("provider") is not None:
+        path = NetworkObject.objects.filter(pk=params["provider"]).values_list("path", flat=True).first()
+        queryset = queryset.filter(path__startswith=path) if path else queryset.none()
+    if params.get("ids") is not None:
+        queryset = queryset.filter(pk__in=params["ids"])
+    return queryset
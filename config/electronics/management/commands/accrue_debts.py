@@ -0,0 +1,30 @@
+from datetime import date
+
+from django.core.management import BaseCommand, CommandError
+
+from electronics.accrual import ACCRUAL_CHUNK_SIZE, run_accruals
+from electronics.models import DebtAccrualRule
+
+
+class Command(BaseCommand):
+    help = "Начисление долга по правилам за дату порциями с выводом скорости обработки"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", type=date.fromisoformat, help="Дата начисления (ГГГГ-ММ-ДД), по умолчанию сегодня")
+        parser.add_argument("--rule", type=int, action="append", help="id правила; можно указать несколько раз")
+        parser.add_argument("--chunk-size", type=int, default=ACCRUAL_CHUNK_SIZE, help="Объектов в одной транзакции")
+
+    def handle(self, *args, **options):
+        rules = None
+        if options["rule"]:
+            rules = DebtAccrualRule.objects.filter(pk__in=options["rule"])
+            if rules.count() != len(set(options["rule"])):
+                raise CommandError("Правило не найдено")
+        runs = run_accruals(run_date=options["date"], rules=rules, chunk_size=options["chunk_size"])
+        if not runs:
+            self.stdout.write("Нет правил для начисления")
+        for run in runs:
+            self.stdout.write(
+                f"{run.rule} ({run.run_date}): объектов={run.processed} начислено={run.debt_delta} "
+                f"время={run.duration:.2f} с скорость={run.rows_per_second or 0} строк/с"
+            )
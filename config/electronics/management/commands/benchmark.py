@@ -0,0 +1,30 @@
+from django.core.management import BaseCommand
+
+from electronics.benchmarks import SUITES, cleanup
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеры производительности на сгенерированных данных. Таблицы дозаполняются строками с префиксом "
+        "bench до нужного размера, поэтому запускайте команду на отдельной базе."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("suites", nargs="*", help=f"Наборы замеров: {', '.join(sorted(SUITES))}; по умолчанию все")
+        parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000], help="Размеры таблиц для замеров")
+        parser.add_argument("--repeat", type=int, default=5, help="Количество повторов каждого замера")
+        parser.add_argument("--cleanup", action="store_true", help="Удалить сгенерированные строки после замеров")
+
+    def handle(self, *args, **options):
+        names = options["suites"] or sorted(SUITES)
+        unknown = set(names) - set(SUITES)
+        if unknown:
+            self.stderr.write(f"Неизвестные наборы: {', '.join(sorted(unknown))}")
+            return
+        try:
+            for name in names:
+                for rows in sorted(options["rows"]):
+                    SUITES[name](rows, options["repeat"], self.stdout)
+        finally:
+            if options["cleanup"]:
+                cleanup()
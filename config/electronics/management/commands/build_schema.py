@@ -0,0 +1,15 @@
+from django.core.management import BaseCommand
+
+from config.schema import build_schema, code_version, schema_path
+
+
+class Command(BaseCommand):
+    help = (
+        "Собирает схему OpenAPI в файлы SCHEMA_DIR для текущей версии кода. Запускайте при развертывании: "
+        "процессы приложения читают готовые файлы вместо генерации схемы."
+    )
+
+    def handle(self, *args, **options):
+        for fmt, content in build_schema().items():
+            self.stdout.write(f"{schema_path(fmt)}: {len(content)} байт")
+        self.stdout.write(f"Версия кода: {code_version()}")
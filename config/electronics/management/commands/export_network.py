@@ -0,0 +1,24 @@
+from django.core.management import BaseCommand
+
+from electronics.export import EXPORT_CHUNK_SIZE, RENDERERS, export_network
+
+
+class Command(BaseCommand):
+    help = "Потоковая выгрузка всех объектов сети с продуктами в NDJSON или CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", choices=sorted(RENDERERS), default="ndjson", help="Формат выгрузки")
+        parser.add_argument("--file", help="Путь к файлу; по умолчанию вывод в stdout")
+        parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE, help="Размер порции чтения из базы")
+
+    def handle(self, *args, **options):
+        if options["file"]:
+            with open(options["file"], "w", encoding="utf-8", newline="") as stream:
+                self.write(stream, options)
+        else:
+            self.write(self.stdout, options)
+
+    @staticmethod
+    def write(stream, options):
+        for chunk in export_network(options["output"], chunk_size=options["chunk_size"]):
+            stream.write(chunk)
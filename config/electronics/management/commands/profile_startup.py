@@ -0,0 +1,50 @@
+import statistics
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from config.startup import STARTUP_TARGETS, first_request, import_times, package_times
+
+
+class Command(BaseCommand):
+    help = (
+        "Профиль холодного старта: время импорта модулей при загрузке config.wsgi/config.asgi "
+        "(python -X importtime) и время до ответа на первый запрос в обычном режиме и в режиме LAZY_LOADING. "
+        "Каждый замер выполняется в новом процессе."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--target", nargs="+", choices=sorted(STARTUP_TARGETS), default=["wsgi", "asgi"])
+        parser.add_argument("--top", type=int, default=15, help="Сколько пакетов и модулей выводить")
+        parser.add_argument("--repeat", type=int, default=5, help="Количество холодных стартов в каждом режиме")
+        parser.add_argument("--path", default="/electronics/products/", help="Адрес первого запроса")
+        parser.add_argument("--host", help="Заголовок Host первого запроса; по умолчанию из ALLOWED_HOSTS")
+
+    def handle(self, *args, **options):
+        hosts = [host.lstrip(".") for host in settings.ALLOWED_HOSTS if host != "*"]
+        host = options["host"] or (hosts[0] if hosts else "localhost")
+        for name in options["target"]:
+            target = STARTUP_TARGETS[name]
+            modules = import_times(target)
+            total = next(module["cumulative_ms"] for module in modules if module["name"] == target)
+            mode = "LAZY_LOADING" if settings.LAZY_LOADING else "обычный режим"
+            self.stdout.write(f"{target}: импорт {total:.0f} ms, модулей {len(modules)} ({mode})")
+            self.stdout.write("  Пакеты (собственное время модулей пакета):")
+            for package, self_ms in package_times(modules)[: options["top"]]:
+                self.stdout.write(f"    {package:<40} {self_ms:9.1f} ms")
+            self.stdout.write("  Модули (собственное / с вложенными импортами):")
+            for module in sorted(modules, key=lambda module: module["self_ms"], reverse=True)[: options["top"]]:
+                self.stdout.write(
+                    f"    {module['name']:<40} {module['self_ms']:9.1f} ms {module['cumulative_ms']:9.1f} ms"
+                )
+            self.stdout.write(f"  Холодный старт до ответа на GET {options['path']} (медиана {options['repeat']}):")
+            for lazy in (False, True):
+                runs = [first_request(target, options["path"], host, lazy) for _ in range(options["repeat"])]
+                timings = {
+                    key: statistics.median(run[key] for run in runs) for key in ("import_ms", "request_ms", "total_ms")
+                }
+                self.stdout.write(
+                    f"    {'LAZY_LOADING=1' if lazy else 'обычный':<16} импорт={timings['import_ms']:7.0f} ms "
+                    f"первый запрос={timings['request_ms']:6.0f} ms всего={timings['total_ms']:7.0f} ms "
+                    f"модулей={runs[-1]['modules']} статус={runs[-1]['status']}"
+                )
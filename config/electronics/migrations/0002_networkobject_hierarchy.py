@@ -0,0 +1,56 @@
+# Generated by Django 4.2.2 on 2026-10-18 12:50
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Concat
+
+
+def build_hierarchy(apps, schema_editor):
+    """Заполняет path и level для уже существующих объектов сети, уровень за уровнем."""
+    NetworkObject = apps.get_model("electronics", "NetworkObject")
+    own_segment = Concat(Cast("pk", models.CharField()), Value("/"))
+    provider_path = Subquery(
+        NetworkObject.objects.filter(pk=OuterRef("provider_id")).values("path")[:1]
+    )
+
+    NetworkObject.objects.filter(provider__isnull=True).update(level=0, path=own_segment)
+    level = 0
+    while (
+        NetworkObject.objects.filter(path="", provider__level=level)
+        .exclude(provider__path="")
+        .update(level=level + 1, path=Concat(provider_path, own_segment))
+    ):
+        level += 1
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("electronics", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="networkobject",
+            name="level",
+            field=models.PositiveIntegerField(
+                db_index=True,
+                default=0,
+                editable=False,
+                verbose_name="Уровень иерархии",
+            ),
+        ),
+        migrations.AddField(
+            model_name="networkobject",
+            name="path",
+            field=models.CharField(
+                db_index=True,
+                default="",
+                editable=False,
+                help_text="Идентификаторы поставщиков от завода до объекта, разделенные символом '/'",
+                max_length=255,
+                verbose_name="Путь в иерархии",
+            ),
+        ),
+        migrations.RunPython(build_hierarchy, migrations.RunPython.noop),
+    ]
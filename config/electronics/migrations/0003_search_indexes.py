@@ -0,0 +1,80 @@
+# Generated by Django 4.2.2 on 2026-10-18 12:55
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+# Поля search_fields, по которым DRF SearchFilter и админка ищут через icontains.
+# PostgreSQL выполняет icontains как UPPER("поле"::text) LIKE UPPER(...), поэтому
+# триграммный индекс строится по тому же выражению.
+TRIGRAM_INDEXES = {
+    "electronics_product": ("name", "model", "description"),
+    "electronics_networkobject": ("name", "country", "town", "street", "phone_number"),
+}
+
+
+def trigram_index_name(table, column):
+    return f"{table.replace('electronics_', '')}_{column}_trgm"
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """На SQLite и других базах поиск остается обычным LIKE без индексов."""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table, columns in TRIGRAM_INDEXES.items():
+        for column in columns:
+            schema_editor.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {trigram_index_name(table, column)} "
+                f'ON {table} USING gin ((UPPER("{column}"::text)) gin_trgm_ops)'
+            )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table, columns in TRIGRAM_INDEXES.items():
+        for column in columns:
+            schema_editor.execute(
+                f"DROP INDEX CONCURRENTLY IF EXISTS {trigram_index_name(table, column)}"
+            )
+
+
+class Migration(migrations.Migration):
+    # Триграммные индексы строятся CONCURRENTLY, чтобы не блокировать запись в большие таблицы
+    atomic = False
+
+    dependencies = [
+        ("electronics", "0002_networkobject_hierarchy"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="networkobject",
+            index=models.Index(fields=["town", "id"], name="networkobject_town_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="networkobject",
+            index=models.Index(fields=["name", "id"], name="networkobject_name_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="networkobject",
+            index=models.Index(
+                fields=["time_of_creation", "id"], name="networkobject_created_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="networkobject",
+            index=models.Index(fields=["country"], name="networkobject_country_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(fields=["name", "id"], name="product_name_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["launch_date", "id"], name="product_launch_date_id_idx"
+            ),
+        ),
+        TrigramExtension(),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
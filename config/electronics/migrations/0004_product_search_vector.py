@@ -0,0 +1,52 @@
+# Generated by Django 4.2.2 on 2026-10-18 13:20
+
+from functools import reduce
+from operator import add
+
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+SEARCH_CONFIGS = ("russian", "english")
+SEARCH_WEIGHTS = {"name": "A", "model": "B", "description": "C"}
+
+
+def build_search_vector(apps, schema_editor):
+    """Индекс и заполнение search_vector нужны только на PostgreSQL."""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    Product = apps.get_model("electronics", "Product")
+    vectors = (
+        SearchVector(field, weight=weight, config=config)
+        for config in SEARCH_CONFIGS
+        for field, weight in SEARCH_WEIGHTS.items()
+    )
+    Product.objects.update(search_vector=reduce(add, vectors))
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS product_search_vector_gin "
+        "ON electronics_product USING gin (search_vector)"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS product_search_vector_gin")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("electronics", "0003_search_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True, verbose_name="Поисковый вектор"
+            ),
+        ),
+        migrations.RunPython(build_search_vector, drop_search_index),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 4.2.2 on 2026-10-18 13:05
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Case, F, Max, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+MAX_DEBT = 10000
+
+
+def build_debt_rollups(apps, schema_editor):
+    """Заполняет сводные суммы долга для существующих объектов сети, снизу вверх по уровням."""
+    NetworkObject = apps.get_model("electronics", "NetworkObject")
+    NetworkObject.objects.update(
+        subtree_debt=Coalesce("debt_to_provider", Value(Decimal(0))),
+        subtree_over_limit=Case(When(debt_to_provider__gt=MAX_DEBT, then=Value(1)), default=Value(0)),
+    )
+    children = NetworkObject.objects.filter(provider=OuterRef("pk")).order_by().values("provider")
+    max_level = NetworkObject.objects.aggregate(level=Max("level"))["level"] or 0
+    for level in range(max_level - 1, -1, -1):
+        NetworkObject.objects.filter(
+            level=level, pk__in=NetworkObject.objects.filter(level=level + 1).values("provider")
+        ).update(
+            subtree_debt=F("subtree_debt")
+            + Subquery(children.annotate(total=Sum("subtree_debt")).values("total")),
+            subtree_over_limit=F("subtree_over_limit")
+            + Subquery(children.annotate(total=Sum("subtree_over_limit")).values("total")),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("electronics", "0005_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="networkobject",
+            name="subtree_debt",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=0,
+                editable=False,
+                help_text="Сумма долга объекта и всех объектов, которые он прямо или косвенно снабжает",
+                max_digits=14,
+                verbose_name="Долг поддерева",
+            ),
+        ),
+        migrations.AddField(
+            model_name="networkobject",
+            name="subtree_over_limit",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                verbose_name="Объектов сверх лимита в поддереве",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="networkobject",
+            index=models.Index(
+                fields=["level", "-subtree_debt", "id"], name="networkobject_level_debt_idx"
+            ),
+        ),
+        migrations.RunPython(build_debt_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.2 on 2026-10-18 13:07
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('electronics', '0006_debt_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DebtOperation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('operation', models.CharField(choices=[('accrue', 'Начисление'), ('pay', 'Погашение'), ('clear', 'Обнуление')], max_length=10, verbose_name='Операция')),
+                ('amount', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Сумма на объект')),
+                ('params', models.JSONField(blank=True, default=dict, verbose_name='Условия отбора')),
+                ('affected', models.PositiveIntegerField(default=0, verbose_name='Затронуто объектов')),
+                ('debt_delta', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Изменение общего долга')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата операции')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Операция с долгом',
+                'verbose_name_plural': 'Операции с долгом',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
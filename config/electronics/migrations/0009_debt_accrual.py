@@ -0,0 +1,59 @@
+# Generated by Django 4.2.2 on 2026-10-18 13:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('electronics', '0008_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DebtAccrualRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Название')),
+                ('operation', models.CharField(choices=[('accrue', 'Начисление суммы'), ('interest', 'Начисление процентов')], max_length=10, verbose_name='Операция')),
+                ('amount', models.DecimalField(decimal_places=2, help_text='Сумма на объект для начисления или процент от текущего долга', max_digits=10, verbose_name='Сумма или процент')),
+                ('filters', models.JSONField(blank=True, default=dict, help_text='Фильтры списка объектов сети, например {"country": ["Россия"], "level": ["2"]}', verbose_name='Фильтры')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Активно')),
+                ('provider', models.ForeignKey(blank=True, help_text='Начислять только объектам, которые прямо или косвенно снабжает этот поставщик', null=True, on_delete=django.db.models.deletion.CASCADE, to='electronics.networkobject', verbose_name='Поставщик')),
+            ],
+            options={
+                'verbose_name': 'Правило начисления долга',
+                'verbose_name_plural': 'Правила начисления долга',
+            },
+        ),
+        migrations.AlterField(
+            model_name='debtoperation',
+            name='operation',
+            field=models.CharField(choices=[('accrue', 'Начисление'), ('interest', 'Начисление процентов'), ('pay', 'Погашение'), ('clear', 'Обнуление')], max_length=10, verbose_name='Операция'),
+        ),
+        migrations.CreateModel(
+            name='DebtAccrualRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('run_date', models.DateField(verbose_name='Дата начисления')),
+                ('status', models.CharField(choices=[('running', 'Выполняется'), ('done', 'Завершено')], default='running', max_length=10, verbose_name='Статус')),
+                ('cursor', models.BigIntegerField(blank=True, null=True, verbose_name='Последний обработанный id')),
+                ('processed', models.PositiveIntegerField(default=0, verbose_name='Обработано объектов')),
+                ('debt_delta', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Начислено')),
+                ('duration', models.FloatField(default=0, verbose_name='Время обработки, с')),
+                ('started_at', models.DateTimeField(auto_now_add=True, verbose_name='Начало')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Окончание')),
+                ('rule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='runs', to='electronics.debtaccrualrule', verbose_name='Правило')),
+            ],
+            options={
+                'verbose_name': 'Запуск начисления долга',
+                'verbose_name_plural': 'Запуски начисления долга',
+                'ordering': ['-run_date', 'rule'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='debtaccrualrun',
+            constraint=models.UniqueConstraint(fields=('rule', 'run_date'), name='debt_accrual_run_rule_date_uniq'),
+        ),
+    ]
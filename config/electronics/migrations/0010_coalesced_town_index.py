@@ -0,0 +1,22 @@
+# Generated by Django 4.2.2 on 2026-10-18 14:41
+
+from django.db import migrations, models
+import django.db.models.functions.comparison
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('electronics', '0009_debt_accrual'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='networkobject',
+            name='networkobject_town_id_idx',
+        ),
+        migrations.AddIndex(
+            model_name='networkobject',
+            index=models.Index(django.db.models.functions.comparison.Coalesce('town', models.Value('')), models.F('id'), name='networkobject_town_id_idx'),
+        ),
+    ]
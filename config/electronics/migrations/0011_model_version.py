@@ -0,0 +1,25 @@
+# Generated by Django 4.2.2 on 2026-10-18 15:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('electronics', '0010_coalesced_town_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModelVersion',
+            fields=[
+                ('label', models.CharField(max_length=100, primary_key=True, serialize=False, verbose_name='Модель')),
+                ('timestamp', models.FloatField(verbose_name='Время изменения')),
+                ('version', models.CharField(max_length=32, verbose_name='Метка')),
+            ],
+            options={
+                'verbose_name': 'Версия данных модели',
+                'verbose_name_plural': 'Версии данных моделей',
+            },
+        ),
+    ]
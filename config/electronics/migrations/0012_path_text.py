@@ -0,0 +1,18 @@
+# Generated by Django 4.2.2 on 2026-10-18 15:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('electronics', '0011_model_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='networkobject',
+            name='path',
+            field=models.TextField(db_index=True, default='', editable=False, help_text="Идентификаторы поставщиков от завода до объекта, разделенные символом '/'", verbose_name='Путь в иерархии'),
+        ),
+    ]
@@ -1,4 +1,110 @@
-from django.db import models
+from decimal import Decimal
+from functools import reduce
+from operator import add
+
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVector, SearchVectorField
+from django.core.exceptions import ValidationError
+from django.conf import settings
+from django.db import connection, models, transaction
+from django.db.models import Case, Count, F, Max, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce, Concat, Greatest, Substr
+from django.utils import timezone
+
+from config.versions import bump_model_version
+
+PATH_SEPARATOR = "/"
+# Сводные суммы по поддереву объекта (включая сам объект), поддерживаемые сдвигами при изменении долга
+DEBT_ROLLUP_FIELDS = ("subtree_debt", "subtree_over_limit")
+ROLLUP_BATCH_SIZE = 1000
+DEBT_STATUS_OVER_LIMIT = "Долг превышает допустимый лимит"
+DEBT_STATUS_WITHIN_LIMIT = "Долг в пределах допустимого лимита"
+CYCLE_ERROR_MESSAGE = "Поставщик не может находиться ниже объекта в цепочке поставок"
+# Конфигурации полнотекстового поиска PostgreSQL для каталога продуктов и веса полей
+SEARCH_CONFIGS = ("russian", "english")
+SEARCH_WEIGHTS = {"name": "A", "model": "B", "description": "C"}
+
+
+def product_search_vector():
+    vectors = (
+        SearchVector(field, weight=weight, config=config)
+        for config in SEARCH_CONFIGS
+        for field, weight in SEARCH_WEIGHTS.items()
+    )
+    return reduce(add, vectors)
+
+
+class TimestampedQuerySet(models.QuerySet):
+    """
+    Массовые update() (и построенный на нем bulk_update) и bulk_create() обходят save(), auto_now и
+    сигналы, поэтому updated_at проставляется, а версия модели для валидаторов условных GET-запросов
+    (config.versions) меняется здесь.
+    """
+
+    def update(self, **kwargs):
+        kwargs.setdefault("updated_at", timezone.now())
+        rows = super().update(**kwargs)
+        bump_model_version(self.model)
+        return rows
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        bump_model_version(self.model)
+        return objs
+
+
+def with_updated_at(update_fields):
+    """
+    Добавляет updated_at в update_fields частичного сохранения, иначе auto_now не попадет в UPDATE.
+    """
+    if update_fields is None:
+        return None
+    return {*update_fields, "updated_at"}
+
+
+class ProductQuerySet(TimestampedQuerySet):
+    """
+    Полнотекстовый поиск по хранимому столбцу search_vector (только PostgreSQL).
+    """
+
+    def update_search_vector(self):
+        """
+        Пересчитывает search_vector одним UPDATE; на других базах ничего не делает.
+        """
+        if connection.vendor != "postgresql":
+            return 0
+        return self.update(search_vector=product_search_vector())
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        self.model.objects.filter(pk__in=[obj.pk for obj in objs if obj.pk is not None]).update_search_vector()
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        rows = super().bulk_update(objs, fields, *args, **kwargs)
+        if set(fields) & SEARCH_WEIGHTS.keys():
+            self.model.objects.filter(pk__in=[obj.pk for obj in objs]).update_search_vector()
+        return rows
+
+    def search(self, text):
+        """
+        Продукты, подходящие под запрос text (синтаксис websearch), по убыванию релевантности,
+        с фрагментом описания, в котором подсвечены найденные слова.
+        """
+        query = reduce(
+            lambda left, right: left | right,
+            (SearchQuery(text, config=config, search_type="websearch") for config in SEARCH_CONFIGS),
+        )
+        return (
+            self.filter(search_vector=query)
+            .annotate(
+                rank=SearchRank(F("search_vector"), query),
+                headline=SearchHeadline(
+                    "description", query, config=SEARCH_CONFIGS[0], start_sel="<b>", stop_sel="</b>", max_fragments=2
+                ),
+            )
+            .order_by("-rank", "id")
+        )
+
 
 class Product(models.Model):
     """
@@ -28,15 +134,282 @@ class Product(models.Model):
         blank=True,
         null=True,
     )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name="Поисковый вектор",
+    )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name="Дата изменения")
+
+    objects = ProductQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Продукт"
         verbose_name_plural = "Продукты"
         ordering = ["name"]  # Добавлено для сортировки по названию продукта
+        # Индексы под сортировки списка и курсорную пагинацию (поле + id); триграммные индексы
+        # для поиска icontains создаются миграцией только на PostgreSQL
+        indexes = [
+            models.Index(fields=["name", "id"], name="product_name_id_idx"),
+            models.Index(fields=["launch_date", "id"], name="product_launch_date_id_idx"),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = with_updated_at(update_fields)
+        super().save(*args, **kwargs)
+        if update_fields is None or set(update_fields) & SEARCH_WEIGHTS.keys():
+            Product.objects.filter(pk=self.pk).update_search_vector()
+
+
+def path_ids(path):
+    return [int(pk) for pk in path.split(PATH_SEPARATOR)[:-1]]
+
+
+def parent_path_of(path):
+    return path[: path.rstrip(PATH_SEPARATOR).rfind(PATH_SEPARATOR) + 1]
+
+
+def debt_contribution(debt):
+    """
+    Вклад одного объекта в сводные суммы: долг (NULL считается нулем) и признак превышения лимита.
+    """
+    debt = Decimal(str(debt)) if debt else Decimal(0)
+    return debt, int(debt > NetworkObject.MAX_DEBT)
+
+
+class NetworkObjectQuerySet(TimestampedQuerySet):
+    """
+    Запросы по иерархии объектов сети на основе материализованного пути.
+    """
+
+    def update(self, **kwargs):
+        """
+        Массовое изменение долга сдвигает сводные суммы поставщиков на разницу старых и новых значений.
+        """
+        if "debt_to_provider" not in kwargs:
+            return super().update(**kwargs)
+        rows, _ = self._update_debt(**kwargs)
+        return rows
+
+    def _update_debt(self, **kwargs):
+        """
+        Выполняет UPDATE с новым debt_to_provider и возвращает число строк и общее изменение долга.
+        Строки обрабатываются порциями по ROLLUP_BATCH_SIZE в порядке id и блокируются select_for_update
+        в том же порядке, поэтому параллельные изменения не захватывают блокировки навстречу друг другу.
+        Сводные суммы самих строк сдвигаются в порции, сдвиги поставщиков складываются по пути поставщика
+        и записываются один раз в конце: в памяти держится одна порция и по сумме на поставщика.
+        """
+        value = kwargs["debt_to_provider"]
+        queryset = self.order_by("pk").select_for_update()
+        rows, delta, last_pk, providers = 0, Decimal(0), 0, {}
+        with transaction.atomic():
+            while True:
+                before = list(
+                    queryset.filter(pk__gt=last_pk).values_list("pk", "path", "debt_to_provider")[:ROLLUP_BATCH_SIZE]
+                )
+                if not before:
+                    break
+                last_pk = before[-1][0]
+                chunk = self.model.objects.filter(pk__in=[pk for pk, _, _ in before])
+                rows += super(NetworkObjectQuerySet, chunk).update(**kwargs)
+                if hasattr(value, "resolve_expression"):
+                    after = dict(chunk.values_list("pk", "debt_to_provider"))
+                else:
+                    after = dict.fromkeys((pk for pk, _, _ in before), value)
+                shifts = []
+                for pk, path, old_debt in before:
+                    old, new = debt_contribution(old_debt), debt_contribution(after[pk])
+                    debt, over_limit = new[0] - old[0], new[1] - old[1]
+                    shifts.append((f"{pk}{PATH_SEPARATOR}", debt, over_limit))
+                    total = providers.setdefault(parent_path_of(path), [Decimal(0), 0])
+                    total[0] += debt
+                    total[1] += over_limit
+                    delta += debt
+                self.shift_debt_rollups(shifts)
+            self.shift_debt_rollups((path, debt, over_limit) for path, (debt, over_limit) in providers.items())
+        return rows, delta
+
+    def with_debt_status(self):
+        """
+        Признак превышения лимита и текстовый статус долга, вычисленные в SQL (NULL считается нулевым долгом).
+        """
+        over_limit = Q(debt_to_provider__gt=self.model.MAX_DEBT)
+        return self.annotate(
+            debt_over_limit=Case(When(over_limit, then=Value(True)), default=Value(False)),
+            debt_status=Case(
+                When(over_limit, then=Value(DEBT_STATUS_OVER_LIMIT)), default=Value(DEBT_STATUS_WITHIN_LIMIT)
+            ),
+        )
+
+    def with_product_names(self, separator=", "):
+        """
+        Названия продуктов объекта одной строкой product_names (в алфавитном порядке, NULL без продуктов),
+        собранные коррелированным подзапросом со StringAgg: основной запрос не группируется и не
+        размножает строки (только PostgreSQL).
+        """
+        # Модуль агрегатов PostgreSQL подтягивает поля и формы contrib.postgres, нужен только админке
+        from django.contrib.postgres.aggregates import StringAgg
+
+        through = self.model.products.through
+        names = (
+            through.objects.filter(networkobject_id=OuterRef("pk"))
+            .values("networkobject_id")
+            .annotate(names=StringAgg("product__name", separator, ordering="product__name"))
+            .values("names")
+        )
+        return self.annotate(product_names=Subquery(names))
+
+    def change_debt(self, operation, amount=None, user=None, params=None):
+        """
+        Начисляет сумму (accrue) или процент (interest), погашает (pay, не ниже нуля) или обнуляет (clear)
+        долг всех объектов queryset одним UPDATE и записывает операцию в журнал DebtOperation.
+        Возвращает запись журнала.
+        """
+        debt = Coalesce("debt_to_provider", Value(Decimal(0)))
+        expressions = {
+            DebtOperation.ACCRUE: lambda: debt + amount,
+            DebtOperation.INTEREST: lambda: debt * (Decimal(1) + Decimal(amount) / 100),
+            DebtOperation.PAY: lambda: Greatest(debt - amount, Value(Decimal(0))),
+            DebtOperation.CLEAR: lambda: Decimal(0),
+        }
+        with transaction.atomic():
+            rows, delta = self._update_debt(debt_to_provider=expressions[operation]())
+            return DebtOperation.objects.create(
+                operation=operation,
+                amount=amount,
+                user=user,
+                params=params or {},
+                affected=rows,
+                debt_delta=delta,
+            )
+
+    def shift_debt_rollups(self, shifts):
+        """
+        Прибавляет сдвиги (путь, долг, число объектов сверх лимита) к сводным суммам каждого объекта
+        пути, включая последний. Сдвиги одного объекта складываются, запись - один bulk_update после
+        блокировки строк в порядке id.
+        bulk_update не вызывает post_save, поэтому кеш карточек измененных объектов сбрасывается здесь.
+        """
+        # electronics.cache импортирует модели
+        from electronics.cache import invalidate_network_objects
+
+        totals = {}
+        for path, debt, over_limit in shifts:
+            for pk in path_ids(path):
+                total = totals.setdefault(pk, [Decimal(0), 0])
+                total[0] += debt
+                total[1] += over_limit
+        objects = [
+            self.model(
+                pk=pk,
+                subtree_debt=F("subtree_debt") + debt,
+                subtree_over_limit=F("subtree_over_limit") + over_limit,
+            )
+            for pk, (debt, over_limit) in sorted(totals.items())
+            if debt or over_limit
+        ]
+        if not objects:
+            return
+        pks = [network_object.pk for network_object in objects]
+        with transaction.atomic():
+            # Строки сводных сумм блокируются заранее в порядке id: UPDATE блокирует их в порядке плана,
+            # и две транзакции с общими поставщиками (порции начислений) могли бы ждать друг друга
+            for start in range(0, len(pks), ROLLUP_BATCH_SIZE):
+                locked = self.model.objects.filter(pk__in=pks[start : start + ROLLUP_BATCH_SIZE])
+                list(locked.order_by("pk").select_for_update().values_list("pk", flat=True))
+            self.model.objects.bulk_update(objects, DEBT_ROLLUP_FIELDS, batch_size=ROLLUP_BATCH_SIZE)
+        invalidate_network_objects(pks)
+
+    def rebuild_debt_rollups(self):
+        """
+        Пересчитывает сводные суммы всех объектов с нуля: сначала собственный долг, затем снизу вверх
+        суммы прямых потребителей - одним UPDATE на уровень иерархии.
+        """
+        objects = self.model.objects
+        objects.update(
+            subtree_debt=Coalesce("debt_to_provider", Value(Decimal(0))),
+            subtree_over_limit=Case(When(debt_to_provider__gt=self.model.MAX_DEBT, then=Value(1)), default=Value(0)),
+        )
+        children = objects.filter(provider=OuterRef("pk")).order_by().values("provider")
+        max_level = objects.aggregate(level=Max("level"))["level"] or 0
+        for level in range(max_level - 1, -1, -1):
+            objects.filter(level=level, pk__in=objects.filter(level=level + 1).values("provider")).update(
+                subtree_debt=F("subtree_debt") + Subquery(children.annotate(total=Sum("subtree_debt")).values("total")),
+                subtree_over_limit=F("subtree_over_limit")
+                + Subquery(children.annotate(total=Sum("subtree_over_limit")).values("total")),
+            )
+
+    def debt_summary(self, field):
+        """
+        Сумма долга, количество объектов и количество объектов сверх лимита по значениям field одним GROUP BY.
+        """
+        return (
+            self.order_by()
+            .values(field)
+            .annotate(
+                total_debt=Coalesce(Sum("debt_to_provider"), Value(Decimal(0))),
+                objects=Count("pk"),
+                over_limit=Count("pk", filter=Q(debt_to_provider__gt=self.model.MAX_DEBT)),
+            )
+            .order_by("-total_debt", field)
+        )
+
+    def roots(self):
+        return self.filter(level=0)
+
+    def descendants_of(self, network_object, max_depth=None, include_self=False):
+        """
+        Все объекты, которые прямо или косвенно снабжаются network_object.
+        """
+        queryset = self.filter(path__startswith=network_object.path)
+        if not include_self:
+            queryset = queryset.exclude(pk=network_object.pk)
+        if max_depth is not None:
+            queryset = queryset.filter(level__lte=network_object.level + max_depth)
+        return queryset
+
+    def ancestors_of(self, network_object, include_self=False):
+        """
+        Цепочка поставщиков network_object от завода (уровень 0) вниз.
+        """
+        ids = network_object.ancestor_ids
+        if include_self:
+            ids = ids + [network_object.pk]
+        return self.filter(pk__in=ids).order_by("level")
+
+    def rebuild_hierarchy(self):
+        """
+        Пересчитывает path и level всех объектов по полю provider: одним UPDATE на уровень иерархии.
+        Возвращает количество обновленных объектов.
+        """
+        self.filter(provider__isnull=False).update(path="")
+        updated = self.filter(provider__isnull=True).update(level=0, path=_own_path_segment())
+        level = 0
+        while True:
+            count = (
+                self.filter(path="", provider__level=level)
+                .exclude(provider__path="")
+                .update(level=level + 1, path=Concat(_provider_path(), _own_path_segment()))
+            )
+            if not count:
+                return updated
+            updated += count
+            level += 1
+
+
+def _own_path_segment():
+    return Concat(Cast("pk", models.CharField()), Value(PATH_SEPARATOR))
+
+
+def _provider_path():
+    return Subquery(NetworkObject.objects.filter(pk=OuterRef("provider_id")).values("path")[:1])
+
+
 class NetworkObject(models.Model):
     """
     Класс модели объекта сети.
@@ -108,8 +481,38 @@ class NetworkObject(models.Model):
         null=True,
     )
     time_of_creation = models.DateField(auto_now_add=True, verbose_name="Дата создания")
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name="Дата изменения")
+    # Без ограничения длины: путь растет с глубиной цепочки поставок
+    path = models.TextField(
+        default="",
+        db_index=True,
+        editable=False,
+        verbose_name="Путь в иерархии",
+        help_text="Идентификаторы поставщиков от завода до объекта, разделенные символом '/'",
+    )
+    level = models.PositiveIntegerField(
+        default=0,
+        db_index=True,
+        editable=False,
+        verbose_name="Уровень иерархии",
+    )
+    subtree_debt = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        editable=False,
+        verbose_name="Долг поддерева",
+        help_text="Сумма долга объекта и всех объектов, которые он прямо или косвенно снабжает",
+    )
+    subtree_over_limit = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Объектов сверх лимита в поддереве",
+    )
     MAX_DEBT = 10000  # Максимально допустимый долг перед поставщиком
 
+    objects = NetworkObjectQuerySet.as_manager()
+
     def get_full_address(self):
         return f"{self.street}, {self.house}, {self.town}, {self.country}"
 
@@ -117,16 +520,375 @@ class NetworkObject(models.Model):
         ordering = ["town"]  # Добавлено для сортировки по городу
         verbose_name = "Объект сети"
         verbose_name_plural = "Объекты сети"
+        indexes = [
+            # Курсорная пагинация сортирует по COALESCE(town, ''), так как город может быть пустым
+            models.Index(Coalesce("town", Value("")), F("id"), name="networkobject_town_id_idx"),
+            models.Index(fields=["name", "id"], name="networkobject_name_id_idx"),
+            models.Index(fields=["time_of_creation", "id"], name="networkobject_created_id_idx"),
+            models.Index(fields=["country"], name="networkobject_country_idx"),
+            # Рейтинг поставщиков уровня по долгу поддерева для аналитики
+            models.Index(fields=["level", "-subtree_debt", "id"], name="networkobject_level_debt_idx"),
+        ]
 
     def __str__(self):
         return self.name
 
+    @property
+    def ancestor_ids(self):
+        """
+        Идентификаторы поставщиков от завода до прямого поставщика, без запросов к базе.
+        """
+        return [int(pk) for pk in self.path.split(PATH_SEPARATOR)[:-2]]
+
+    @property
+    def root_id(self):
+        """
+        Идентификатор завода, с которого начинается цепочка поставок объекта.
+        """
+        return int(self.path.split(PATH_SEPARATOR, 1)[0]) if self.path else self.pk
+
+    def is_descendant_of(self, other, include_self=False):
+        if not self.path or not other.path:
+            return False
+        if self.path == other.path:
+            return include_self
+        return self.path.startswith(other.path)
+
+    def get_ancestors(self, include_self=False):
+        return NetworkObject.objects.ancestors_of(self, include_self=include_self)
+
+    def get_descendants(self, max_depth=None, include_self=False):
+        return NetworkObject.objects.descendants_of(self, max_depth=max_depth, include_self=include_self)
+
+    def clean(self):
+        """
+        Запрещает циклы в цепочке поставок.
+        """
+        super().clean()
+        if self.pk and self.provider_id and self.provider.is_descendant_of(self, include_self=True):
+            raise ValidationError({"provider": CYCLE_ERROR_MESSAGE})
+
+    def save(self, *args, **kwargs):
+        """
+        Сохраняет объект и поддерживает материализованный путь: при смене поставщика
+        путь и уровень всего поддерева переносятся одним UPDATE, а проверка цикла выполняется
+        под блокировкой строк объекта и поставщика. Изменение долга и перенос
+        поддерева сдвигают сводные суммы (subtree_debt, subtree_over_limit) у объекта и его поставщиков.
+        """
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = with_updated_at(update_fields)
+        moves = update_fields is None or "provider" in update_fields
+        changes_debt = update_fields is None or "debt_to_provider" in update_fields
+        if not moves and not changes_debt:
+            return super().save(*args, **kwargs)
+
+        with transaction.atomic():
+            # Объект и новый поставщик блокируются вместе в порядке id: два встречных переноса (A под B
+            # и B под A) выполняются по очереди, и второй видит путь, записанный первым
+            locked = {self.pk} - {None}
+            if self.provider_id is not None and moves:
+                locked.add(self.provider_id)
+            rows = {
+                row["pk"]: row
+                for row in NetworkObject.objects.select_for_update()
+                .filter(pk__in=locked)
+                .order_by("pk")
+                .values("pk", "path", "level", "debt_to_provider", *DEBT_ROLLUP_FIELDS)
+            }
+            stored = rows.get(self.pk) if self.pk is not None else None
+            parent_path = ""
+            if self.provider_id is not None and moves:
+                if self.provider_id not in rows:
+                    raise NetworkObject.DoesNotExist("Поставщик не найден")
+                parent_path = rows[self.provider_id]["path"]
+            if moves and stored and stored["path"] and parent_path.startswith(stored["path"]):
+                raise ValidationError({"provider": CYCLE_ERROR_MESSAGE})
+
+            if stored is None:
+                self.subtree_debt, self.subtree_over_limit = 0, 0
+                super().save(*args, **kwargs)
+                self.set_path(parent_path)
+                NetworkObject.objects.filter(pk=self.pk).update(path=self.path, level=self.level)
+                NetworkObject.objects.shift_debt_rollups([(self.path, *self.debt_contribution())])
+                self.subtree_debt, self.subtree_over_limit = self.debt_contribution()
+                return
+
+            # Сводные суммы меняются только сдвигами в базе: значения в памяти могут быть устаревшими
+            if update_fields is None:
+                kwargs["update_fields"] = {
+                    field.name
+                    for field in self._meta.concrete_fields
+                    if not field.primary_key and field.name not in DEBT_ROLLUP_FIELDS
+                }
+            old_path = stored["path"]
+            old_contribution = debt_contribution(stored["debt_to_provider"])
+            debt_delta = [new - old for new, old in zip(self.debt_contribution(), old_contribution)]
+            shifts = []
+            if moves:
+                self.set_path(parent_path)
+                kwargs["update_fields"] = kwargs["update_fields"] | {"path", "level"}
+                if old_path and old_path != self.path:
+                    # Поддерево целиком уходит от старых поставщиков к новым
+                    moved = [stored[field] for field in DEBT_ROLLUP_FIELDS]
+                    shifts.append((parent_path_of(old_path), *[-value for value in moved]))
+                    shifts.append((parent_path, *moved))
+            else:
+                self.path, self.level = old_path, stored["level"]
+            # Старый путь нужен обработчикам post_save, чтобы найти перенесенное поддерево
+            self.moved_from_path = old_path if old_path and old_path != self.path else None
+            shifts.append((self.path, *debt_delta))
+            super().save(*args, **kwargs)
+            if self.moved_from_path:
+                NetworkObject.objects.filter(path__startswith=old_path).exclude(pk=self.pk).update(
+                    path=Concat(Value(self.path), Substr("path", len(old_path) + 1)),
+                    level=F("level") + (self.level - stored["level"]),
+                )
+            NetworkObject.objects.shift_debt_rollups(shifts)
+            self.subtree_debt = stored["subtree_debt"] + debt_delta[0]
+            self.subtree_over_limit = stored["subtree_over_limit"] + debt_delta[1]
+
+    def set_path(self, parent_path):
+        self.path = f"{parent_path}{self.pk}{PATH_SEPARATOR}"
+        self.level = self.path.count(PATH_SEPARATOR) - 1
+
+    def debt_contribution(self):
+        return debt_contribution(self.debt_to_provider)
+
     def check_debt(self):
-        return self.debt_to_provider > self.MAX_DEBT
+        if hasattr(self, "debt_over_limit"):
+            return self.debt_over_limit
+        return debt_contribution(self.debt_to_provider)[1] == 1
 
     @property
     def debt_status(self):
-        if self.check_debt():
-            return "Долг превышает допустимый лимит"
-        else:
-            return "Долг в пределах допустимого лимита"
\ No newline at end of file
+        """
+        Статус долга; в выборках with_debt_status() берется из аннотации без вычислений в Python.
+        """
+        if hasattr(self, "_debt_status"):
+            return self._debt_status
+        return DEBT_STATUS_OVER_LIMIT if self.check_debt() else DEBT_STATUS_WITHIN_LIMIT
+
+    @debt_status.setter
+    def debt_status(self, value):
+        self._debt_status = value
+
+
+class DebtOperation(models.Model):
+    """
+    Журнал массовых операций с долгом перед поставщиком.
+    """
+
+    ACCRUE = "accrue"
+    INTEREST = "interest"
+    PAY = "pay"
+    CLEAR = "clear"
+    OPERATIONS = (
+        (ACCRUE, "Начисление"),
+        (INTEREST, "Начисление процентов"),
+        (PAY, "Погашение"),
+        (CLEAR, "Обнуление"),
+    )
+
+    operation = models.CharField(max_length=10, choices=OPERATIONS, verbose_name="Операция")
+    amount = models.DecimalField(
+        max_digits=10, decimal_places=2, blank=True, null=True, verbose_name="Сумма на объект"
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        verbose_name="Пользователь",
+    )
+    params = models.JSONField(default=dict, blank=True, verbose_name="Условия отбора")
+    affected = models.PositiveIntegerField(default=0, verbose_name="Затронуто объектов")
+    debt_delta = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, verbose_name="Изменение общего долга"
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата операции")
+
+    class Meta:
+        verbose_name = "Операция с долгом"
+        verbose_name_plural = "Операции с долгом"
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.get_operation_display()} ({self.affected})"
+
+
+class Job(models.Model):
+    """
+    Фоновая задача над сетью (см. electronics.tasks): статус, прогресс по порциям и результат.
+    cursor хранит последний обработанный id, чтобы повтор после сбоя продолжил с того же места.
+    """
+
+    DEBT = "debt"
+    BULK_IMPORT = "bulk_import"
+    EXPORT = "export"
+    REBUILD_HIERARCHY = "rebuild_hierarchy"
+    KINDS = (
+        (DEBT, "Операция с долгом"),
+        (BULK_IMPORT, "Массовая загрузка"),
+        (EXPORT, "Выгрузка"),
+        (REBUILD_HIERARCHY, "Пересчет иерархии"),
+    )
+
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    STATUSES = (
+        (PENDING, "В очереди"),
+        (RUNNING, "Выполняется"),
+        (SUCCEEDED, "Выполнена"),
+        (FAILED, "Ошибка"),
+    )
+
+    kind = models.CharField(max_length=20, choices=KINDS, verbose_name="Тип задачи")
+    status = models.CharField(max_length=10, choices=STATUSES, default=PENDING, db_index=True, verbose_name="Статус")
+    params = models.JSONField(default=dict, blank=True, verbose_name="Параметры")
+    total = models.PositiveIntegerField(blank=True, null=True, verbose_name="Всего")
+    processed = models.PositiveIntegerField(default=0, verbose_name="Обработано")
+    cursor = models.BigIntegerField(blank=True, null=True, verbose_name="Последний обработанный id")
+    result = models.JSONField(blank=True, null=True, verbose_name="Результат")
+    error = models.TextField(blank=True, default="", verbose_name="Ошибка")
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Попыток")
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        verbose_name="Пользователь",
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+    started_at = models.DateTimeField(blank=True, null=True, verbose_name="Начало")
+    finished_at = models.DateTimeField(blank=True, null=True, verbose_name="Окончание")
+
+    class Meta:
+        verbose_name = "Фоновая задача"
+        verbose_name_plural = "Фоновые задачи"
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.pk} ({self.get_status_display()})"
+
+    @property
+    def progress(self):
+        """
+        Доля выполнения в процентах, если общее количество уже известно.
+        """
+        if not self.total:
+            return 100 if self.status == self.SUCCEEDED else None
+        return round(self.processed * 100 / self.total, 1)
+
+
+class DebtAccrualRule(models.Model):
+    """
+    Правило периодического начисления долга: сумма (accrue) или процент (interest) для объектов,
+    отобранных фильтрами списка (filters) и/или поддеревом поставщика.
+    """
+
+    OPERATIONS = (
+        (DebtOperation.ACCRUE, "Начисление суммы"),
+        (DebtOperation.INTEREST, "Начисление процентов"),
+    )
+
+    name = models.CharField(max_length=100, verbose_name="Название")
+    operation = models.CharField(max_length=10, choices=OPERATIONS, verbose_name="Операция")
+    amount = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        verbose_name="Сумма или процент",
+        help_text="Сумма на объект для начисления или процент от текущего долга",
+    )
+    filters = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name="Фильтры",
+        help_text='Фильтры списка объектов сети, например {"country": ["Россия"], "level": ["2"]}',
+    )
+    provider = models.ForeignKey(
+        NetworkObject,
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        verbose_name="Поставщик",
+        help_text="Начислять только объектам, которые прямо или косвенно снабжает этот поставщик",
+    )
+    is_active = models.BooleanField(default=True, verbose_name="Активно")
+
+    class Meta:
+        verbose_name = "Правило начисления долга"
+        verbose_name_plural = "Правила начисления долга"
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def params(self):
+        """
+        Параметры отбора объектов для filter_network_objects; сам поставщик долг не получает.
+        """
+        filters = dict(self.filters)
+        if self.provider_id is not None:
+            filters["ancestor"] = [self.provider_id]
+        return {"filters": filters}
+
+
+class DebtAccrualRun(models.Model):
+    """
+    Выполнение правила за дату. Одна запись на правило и дату делает запуск идемпотентным,
+    cursor (последний обработанный id) позволяет продолжить после сбоя, а блокировка строки запуска
+    на время каждой порции не дает двум процессам обработать одну порцию.
+    """
+
+    RUNNING = "running"
+    DONE = "done"
+    STATUSES = (
+        (RUNNING, "Выполняется"),
+        (DONE, "Завершено"),
+    )
+
+    rule = models.ForeignKey(DebtAccrualRule, on_delete=models.CASCADE, related_name="runs", verbose_name="Правило")
+    run_date = models.DateField(verbose_name="Дата начисления")
+    status = models.CharField(max_length=10, choices=STATUSES, default=RUNNING, verbose_name="Статус")
+    cursor = models.BigIntegerField(blank=True, null=True, verbose_name="Последний обработанный id")
+    processed = models.PositiveIntegerField(default=0, verbose_name="Обработано объектов")
+    debt_delta = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Начислено")
+    duration = models.FloatField(default=0, verbose_name="Время обработки, с")
+    started_at = models.DateTimeField(auto_now_add=True, verbose_name="Начало")
+    finished_at = models.DateTimeField(blank=True, null=True, verbose_name="Окончание")
+
+    class Meta:
+        verbose_name = "Запуск начисления долга"
+        verbose_name_plural = "Запуски начисления долга"
+        ordering = ["-run_date", "rule"]
+        constraints = [
+            models.UniqueConstraint(fields=["rule", "run_date"], name="debt_accrual_run_rule_date_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.rule} за {self.run_date}"
+
+    @property
+    def rows_per_second(self):
+        return round(self.processed / self.duration) if self.duration else None
+
+
+class ModelVersion(models.Model):
+    """
+    Версия данных модели для валидаторов условных GET-запросов (config.versions). Хранится в базе,
+    чтобы изменение в любом процессе (веб-процессе или Celery worker) видели все остальные.
+    """
+
+    label = models.CharField(max_length=100, primary_key=True, verbose_name="Модель")
+    timestamp = models.FloatField(verbose_name="Время изменения")
+    version = models.CharField(max_length=32, verbose_name="Метка")
+
+    class Meta:
+        verbose_name = "Версия данных модели"
+        verbose_name_plural = "Версии данных моделей"
+
+    def __str__(self):
+        return self.label
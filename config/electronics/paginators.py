@@ -0,0 +1,227 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import CharField, Q, TextField, Value
+from django.db.models.functions import Coalesce
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+# До скольких строк выборка считается точно; дальше используется оценка планировщика PostgreSQL
+EXACT_COUNT_LIMIT = 10000
+
+
+def estimate_count(queryset, limit=EXACT_COUNT_LIMIT):
+    """
+    Количество строк queryset без полного COUNT(*) на больших таблицах. Строки считаются точно, пока их
+    не больше limit (COUNT по подзапросу с LIMIT), иначе на PostgreSQL возвращается оценка из плана
+    запроса (EXPLAIN), но не меньше limit. На других базах - точный COUNT(*).
+    """
+    if connections[queryset.db].vendor != "postgresql":
+        return queryset.count()
+    queryset = queryset.order_by()
+    count = queryset[: limit + 1].count()
+    if count <= limit:
+        return count
+    plan = json.loads(queryset.explain(format="json"))
+    return max(int(plan[0]["Plan"]["Plan Rows"]), count)
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator для списков админки на больших таблицах: количество строк берется из estimate_count.
+    """
+
+    @cached_property
+    def count(self):
+        return estimate_count(self.object_list)
+
+
+class NetworkPageNumberPagination(PageNumberPagination):
+    """
+    Постраничная пагинация (?page=) для интерфейсов администраторов.
+    """
+
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Курсорная (keyset) пагинация: курсор хранит значения всех полей сортировки и id последней записи,
+    поэтому следующая страница выбирается условием WHERE по индексу, а не OFFSET, и любая глубина
+    стоит столько же, сколько первая страница.
+
+    Сортировка берется из запроса (OrderingFilter) или из Meta.ordering модели; к ней всегда
+    добавляется id для однозначности. Текстовые поля, допускающие NULL, сортируются по
+    COALESCE(поле, ''): записи без значения идут вместе с пустой строкой (первыми по возрастанию).
+    Если передан параметр page или сортировка идет по полю, которое не подходит для курсора
+    (другое поле с NULL, выражение, связанное поле), используется постраничный режим
+    NetworkPageNumberPagination.
+    """
+
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    page_query_param = "page"
+    tiebreaker = "id"
+    key_prefix = "keyset_"
+    invalid_cursor_message = "Неверный курсор"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_number_paginator = None
+        ordering = self.get_keyset_ordering(queryset)
+        if ordering is None or self.page_query_param in request.query_params:
+            self.page_number_paginator = NetworkPageNumberPagination()
+            return self.page_number_paginator.paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = ordering
+        position, self.reverse = self.decode_cursor(request)
+
+        directions = [not field.startswith("-") for field in ordering]
+        if self.reverse:
+            directions = [not ascending for ascending in directions]
+        queryset = self.annotate_keys(queryset)
+        queryset = queryset.order_by(*[name if asc else f"-{name}" for name, asc in zip(self.key_names, directions)])
+        if position is not None:
+            queryset = queryset.filter(self._after_position(position, directions))
+
+        results = list(queryset[: self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[: self.page_size]
+        if self.reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        return self.page
+
+    def get_paginated_response(self, data):
+        if self.page_number_paginator is not None:
+            return self.page_number_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self._position(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self._position(self.page[0]), reverse=True)
+
+    def get_keyset_ordering(self, queryset):
+        """
+        Возвращает сортировку с добавленным id или None, если по ней нельзя построить курсор.
+        """
+        model = queryset.model
+        ordering = list(queryset.query.order_by)
+        if ordering:
+            if not all(self._is_keyset_field(model, field) for field in ordering):
+                return None
+        elif all(self._is_keyset_field(model, field) for field in model._meta.ordering):
+            ordering = list(model._meta.ordering)
+        names = [field.lstrip("-") for field in ordering]
+        if self.tiebreaker not in names and "pk" not in names:
+            ordering.append(self.tiebreaker)
+        return tuple(ordering)
+
+    @property
+    def field_names(self):
+        return [field.lstrip("-") for field in self.ordering]
+
+    @property
+    def key_names(self):
+        """
+        Имена, по которым строятся сортировка и условие курсора: поле или аннотация с COALESCE.
+        """
+        return [self.key_prefix + name if name in self.coalesced else name for name in self.field_names]
+
+    def annotate_keys(self, queryset):
+        """
+        Добавляет COALESCE(поле, '') для текстовых полей с NULL: значение NULL нельзя сравнить
+        в условии курсора, а индекс networkobject_town_id_idx построен по тому же выражению.
+        """
+        self.coalesced = {
+            name for name in self.field_names if name != "pk" and queryset.model._meta.get_field(name).null
+        }
+        return queryset.annotate(
+            **{self.key_prefix + name: Coalesce(name, Value("")) for name in self.coalesced}
+        )
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode("ascii")))
+            position, reverse = cursor["p"], bool(cursor.get("r"))
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def encode_cursor(self, position, reverse):
+        cursor = {"p": position}
+        if reverse:
+            cursor["r"] = 1
+        encoded = urlsafe_b64encode(json.dumps(cursor, separators=(",", ":")).encode()).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _position(self, item):
+        position = []
+        for name in self.field_names:
+            value = item[name] if isinstance(item, dict) else getattr(item, name)
+            if value is None and name in self.coalesced:
+                value = ""
+            elif isinstance(value, (date, datetime)):
+                value = value.isoformat()
+            elif isinstance(value, Decimal):
+                value = str(value)
+            position.append(value)
+        return position
+
+    def _after_position(self, position, directions):
+        """
+        Условие «строго после позиции» для составного ключа сортировки:
+        a >= x AND ((a > x) OR (a = x AND b > y) OR ...). Граница по первому полю дублирует цепочку,
+        но без нее планировщик не видит диапазон по индексу и читает его целиком.
+        """
+        names = self.key_names
+        condition = Q()
+        for index, (name, ascending) in enumerate(zip(names, directions)):
+            lookup = "gt" if ascending else "lt"
+            term = Q(**{f"{name}__{lookup}": position[index]})
+            for previous_name, previous_value in zip(names[:index], position[:index]):
+                term &= Q(**{previous_name: previous_value})
+            condition |= term
+        if len(names) > 1:
+            condition &= Q(**{f"{names[0]}__{'gte' if directions[0] else 'lte'}": position[0]})
+        return condition
+
+    @staticmethod
+    def _is_keyset_field(model, field):
+        if not isinstance(field, str) or "__" in field or field.lstrip("-") == "?":
+            return False
+        name = field.lstrip("-")
+        if name == "pk":
+            return True
+        try:
+            model_field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return False
+        if not model_field.concrete or model_field.many_to_many:
+            return False
+        return not model_field.null or isinstance(model_field, (CharField, TextField))
@@ -1,18 +1,100 @@
+from django.http import QueryDict
 from rest_framework import serializers
 
-from electronics.models import NetworkObject, Product
+from electronics.export import EXPORT_CONTENT_TYPES
+from electronics.filters import NetworkObjectFilter
+from electronics.models import CYCLE_ERROR_MESSAGE, DebtOperation, Job, NetworkObject, Product
+
+# Ограничение размера массовой загрузки за один запрос или одну фоновую задачу
+BULK_MAX_ROWS = 10000
+WHOLE_TABLE_MESSAGE = "Укажите фильтры списка или provider; для всех объектов сети передайте all=true"
 
 
 class ProductSerializer(serializers.ModelSerializer):
     class Meta:
         model = Product
-        fields = "__all__"
+        exclude = ("search_vector",)
+
+
+class ProductSearchSerializer(ProductSerializer):
+    """
+    Продукт в результатах полнотекстового поиска: релевантность и фрагмент описания с подсветкой.
+    """
+
+    rank = serializers.FloatField(read_only=True, default=None)
+    headline = serializers.CharField(read_only=True, default=None)
+
+
+class SparseFieldsMixin:
+    """
+    Выборочные поля и раскрытие связей по context["fields"] (None - все поля) и context["expand"].
+    Вложенные сериализаторы раскрываемых связей создает expandable_fields; field_columns перечисляет
+    колонки модели для полей, которые вычисляются не из одноименного поля (для .only() в представлении).
+    """
+
+    expandable_fields = {}
+    field_columns = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        expand = self.context.get("expand") or ()
+        for name in expand:
+            self.fields[name] = self.expandable_fields[name]()
+        fields = self.context.get("fields")
+        if fields is not None:
+            for name in set(self.fields) - set(fields) - set(expand):
+                self.fields.pop(name)
+
+    @classmethod
+    def get_available_fields(cls):
+        return set(cls().fields) | set(cls.expandable_fields)
+
+    @classmethod
+    def get_required_columns(cls, names):
+        """
+        Колонки модели, нужные для вывода полей names.
+        """
+        model_fields = {field.name for field in cls.Meta.model._meta.concrete_fields}
+        columns = []
+        for name in names:
+            if name in cls.field_columns:
+                columns.extend(cls.field_columns[name])
+            elif name in model_fields:
+                columns.append(name)
+        return columns
+
+
+class NetworkObjectShortSerializer(serializers.ModelSerializer):
+    """
+    Поставщик в раскрытом виде (?expand=provider).
+    """
+
+    class Meta:
+        model = NetworkObject
+        fields = ("id", "name", "country", "town", "level")
+
+
+def expand_provider():
+    return NetworkObjectShortSerializer(read_only=True)
+
 
+def expand_products():
+    return ProductSerializer(many=True, read_only=True)
+
+
+class NetworkObjectSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {"provider": expand_provider, "products": expand_products}
+    # Признак и статус долга берутся из аннотаций with_debt_status()
+    field_columns = {"debt_over_limit": (), "debt_status": ()}
+
+    debt_over_limit = serializers.BooleanField(source="check_debt", read_only=True)
+    debt_status = serializers.CharField(read_only=True)
 
-class NetworkObjectSerializer(serializers.ModelSerializer):
     class Meta:
         model = NetworkObject
         exclude = ("products",)
+        # Колонки with_debt_status() для быстрого режима списка (electronics.fast)
+        fast_sources = {"check_debt": "debt_over_limit"}
 
 
 class NetworkObjectCreateSerializer(serializers.ModelSerializer):
@@ -26,33 +108,256 @@ class NetworkObjectUpdateSerializer(serializers.ModelSerializer):
         model = NetworkObject
         fields = ("name", "country", "town", "street", "house", "phone_number", "provider", "email", "debt_to_provider")
 
+    def validate_provider(self, provider):
+        """
+        Метод запрещает назначать поставщиком сам объект или объект из его поддерева.
+        """
+        if self.instance is not None and provider is not None:
+            if provider.is_descendant_of(self.instance, include_self=True):
+                raise serializers.ValidationError(CYCLE_ERROR_MESSAGE)
+        return provider
+
+
+class NetworkObjectDetailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {"provider": expand_provider, "products": expand_products}
+    field_columns = {
+        "count_products_for_networkobject": (),
+        "url_provider": ("provider",),
+        "hierarchy": ("level",),
+        "root": ("path",),
+        "ancestors": ("path",),
+        "debt_over_limit": (),
+        "debt_status": (),
+    }
 
-class NetworkObjectDetailSerializer(serializers.ModelSerializer):
     count_products_for_networkobject = serializers.SerializerMethodField()
     products = ProductSerializer(many=True, read_only=True)
     url_provider = serializers.SerializerMethodField()
     hierarchy = serializers.SerializerMethodField()
+    root = serializers.SerializerMethodField()
+    ancestors = serializers.SerializerMethodField()
+    debt_over_limit = serializers.BooleanField(source="check_debt", read_only=True)
+    debt_status = serializers.CharField(read_only=True)
 
     @staticmethod
     def get_count_products_for_networkobject(networkobject):
-        return networkobject.products.count()
+        products_count = getattr(networkobject, "products_count", None)
+        if products_count is None:
+            return networkobject.products.count()
+        return products_count
 
     @staticmethod
     def get_url_provider(networkobject):
-        provider = networkobject.provider
-        url_provider = f"http://127.0.0.1:8000/network/networkobjects/{provider.pk}/"
+        if networkobject.provider_id is None:
+            return None
+        url_provider = f"http://127.0.0.1:8000/network/networkobjects/{networkobject.provider_id}/"
         return url_provider
 
     @staticmethod
     def get_hierarchy(networkobject):
-        if "Завод" in networkobject.name:
-            hierarchy = 0
-        elif networkobject.pk == networkobject.provider.pk:
-            hierarchy = 0
-        else:
-            hierarchy = 1
-        return hierarchy
+        """
+        Уровень объекта в цепочке поставок: 0 - завод, далее по числу поставщиков выше.
+        """
+        return networkobject.level
+
+    @staticmethod
+    def get_root(networkobject):
+        return networkobject.root_id
+
+    @staticmethod
+    def get_ancestors(networkobject):
+        return networkobject.ancestor_ids
+
+    class Meta:
+        model = NetworkObject
+        fields = "__all__"
+
+
+class NetworkObjectBulkItemSerializer(serializers.ModelSerializer):
+    """
+    Строка массовой загрузки объектов сети. Поставщик задается id существующего объекта (provider)
+    или временным ключом строки из той же загрузки (provider_key); ссылки проверяются пакетно.
+    """
+
+    id = serializers.IntegerField(required=False)
+    key = serializers.CharField(required=False, max_length=100)
+    provider = serializers.IntegerField(required=False, allow_null=True)
+    provider_key = serializers.CharField(required=False, max_length=100)
 
     class Meta:
         model = NetworkObject
-        fields = "__all__"
\ No newline at end of file
+        fields = (
+            "id",
+            "key",
+            "name",
+            "country",
+            "town",
+            "street",
+            "house",
+            "phone_number",
+            "provider",
+            "provider_key",
+            "email",
+            "debt_to_provider",
+        )
+
+    def validate(self, attrs):
+        if "provider" in attrs and "provider_key" in attrs:
+            raise serializers.ValidationError("Укажите либо provider, либо provider_key")
+        if "id" in attrs and "key" in attrs:
+            raise serializers.ValidationError({"key": "Временный ключ задается только для новых объектов"})
+        return attrs
+
+
+class AssortmentSerializer(serializers.Serializer):
+    """
+    Запрос на изменение ассортимента: продукты add добавляются, продукты remove удаляются у объектов
+    network_objects и/или у всего поддерева поставщика provider (включая его самого).
+    """
+
+    network_objects = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    provider = serializers.PrimaryKeyRelatedField(queryset=NetworkObject.objects.all(), required=False)
+    add = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    remove = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+
+    def validate(self, attrs):
+        if not attrs["network_objects"] and "provider" not in attrs:
+            raise serializers.ValidationError("Укажите network_objects или provider")
+        if not attrs["add"] and not attrs["remove"]:
+            raise serializers.ValidationError("Укажите продукты для добавления или удаления")
+        product_ids = set(attrs["add"]) | set(attrs["remove"])
+        found = set(Product.objects.filter(pk__in=product_ids).values_list("pk", flat=True))
+        if found != product_ids:
+            raise serializers.ValidationError({"add": f"Продукты не найдены: {sorted(product_ids - found)}"})
+        return attrs
+
+
+class DebtOperationSerializer(serializers.ModelSerializer):
+    """
+    Массовая операция с долгом: начисление и погашение требуют сумму на объект, обнуление - нет.
+    Объекты отбираются фильтрами списка из строки запроса и/или поддеревом поставщика provider;
+    операция над всей таблицей требует явного all=true.
+    """
+
+    provider = serializers.PrimaryKeyRelatedField(
+        queryset=NetworkObject.objects.all(), required=False, write_only=True
+    )
+    all = serializers.BooleanField(default=False, write_only=True)
+
+    class Meta:
+        model = DebtOperation
+        fields = (
+            "id",
+            "operation",
+            "amount",
+            "provider",
+            "all",
+            "user",
+            "params",
+            "affected",
+            "debt_delta",
+            "created_at",
+        )
+        read_only_fields = ("user", "params", "affected", "debt_delta", "created_at")
+        extra_kwargs = {"amount": {"min_value": 0}}
+
+    def validate(self, attrs):
+        if attrs["operation"] != DebtOperation.CLEAR and attrs.get("amount") is None:
+            raise serializers.ValidationError({"amount": "Укажите сумму операции"})
+        if attrs["operation"] == DebtOperation.CLEAR:
+            attrs["amount"] = None
+        return attrs
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """
+    Фоновая задача. При создании params проверяются по типу задачи:
+    debt - как тело эндпоинта debt плюс filters; bulk_import - rows; export - output плюс filters;
+    rebuild_hierarchy - без параметров. filters - фильтры списка объектов сети вида {"country": ["Россия"]}.
+    """
+
+    progress = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = Job
+        fields = (
+            "id",
+            "kind",
+            "status",
+            "params",
+            "total",
+            "processed",
+            "progress",
+            "result",
+            "error",
+            "attempts",
+            "user",
+            "created_at",
+            "started_at",
+            "finished_at",
+        )
+        read_only_fields = tuple(field for field in fields if field not in ("kind", "params"))
+
+    def validate(self, attrs):
+        params = attrs.get("params") or {}
+        if not isinstance(params, dict):
+            raise serializers.ValidationError({"params": "Ожидается объект"})
+        validate = getattr(self, f"validate_{attrs['kind']}_params")
+        attrs["params"] = validate(params)
+        return attrs
+
+    @staticmethod
+    def validate_filters(params):
+        filters = params.get("filters") or {}
+        if not isinstance(filters, dict):
+            raise serializers.ValidationError({"params": {"filters": "Ожидается объект"}})
+        filters = {
+            key: [str(value) for value in values] if isinstance(values, list) else [str(values)]
+            for key, values in filters.items()
+        }
+        query = QueryDict(mutable=True)
+        for key, values in filters.items():
+            query.setlist(key, values)
+        filterset = NetworkObjectFilter(data=query)
+        if not filterset.is_valid():
+            raise serializers.ValidationError({"params": {"filters": filterset.errors}})
+        return filters
+
+    def validate_debt_params(self, params):
+        serializer = DebtOperationSerializer(data=params)
+        if not serializer.is_valid():
+            raise serializers.ValidationError({"params": serializer.errors})
+        data = serializer.validated_data
+        result = {
+            "operation": data["operation"],
+            "amount": None if data["amount"] is None else str(data["amount"]),
+            "filters": self.validate_filters(params),
+        }
+        if data.get("provider") is not None:
+            result["provider"] = data["provider"].pk
+        if params.get("ids") is not None:
+            result["ids"] = serializers.ListField(child=serializers.IntegerField()).run_validation(params["ids"])
+        if not (result["filters"] or "provider" in result or "ids" in result or data["all"]):
+            raise serializers.ValidationError({"params": {"all": WHOLE_TABLE_MESSAGE}})
+        return result
+
+    @staticmethod
+    def validate_bulk_import_params(params):
+        rows = params.get("rows")
+        if not isinstance(rows, list) or not rows:
+            raise serializers.ValidationError({"params": {"rows": "Ожидается непустой список объектов"}})
+        if len(rows) > BULK_MAX_ROWS:
+            raise serializers.ValidationError({"params": {"rows": f"Не более {BULK_MAX_ROWS} строк за одну задачу"}})
+        return {"rows": rows}
+
+    def validate_export_params(self, params):
+        output = params.get("output", "ndjson")
+        if output not in EXPORT_CONTENT_TYPES:
+            raise serializers.ValidationError(
+                {"params": {"output": f"Допустимые форматы: {', '.join(EXPORT_CONTENT_TYPES)}"}}
+            )
+        return {"output": output, "filters": self.validate_filters(params)}
+
+    @staticmethod
+    def validate_rebuild_hierarchy_params(params):
+        return {}
@@ -0,0 +1,267 @@
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+
+from electronics.cache import invalidate_network_objects, invalidate_network_queryset
+from electronics.models import NetworkObject
+from electronics.serializers import BULK_MAX_ROWS, NetworkObjectBulkItemSerializer
+
+BULK_BATCH_SIZE = 1000
+ASSORTMENT_CHUNK_SIZE = 2000
+# Естественный ключ для upsert строк без id: единственный объект с тем же названием и email обновляется,
+# а не создается. Уникальность в базе не гарантируется, поэтому неоднозначные совпадения - ошибка строки
+NATURAL_KEY = ("name", "email")
+HIERARCHY_FIELDS = ("provider", "provider_key")
+
+
+class BulkUpsertError(Exception):
+    """
+    Ошибки проверки строк массовой загрузки: список {"index": ..., "errors": ...}.
+    """
+
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def bulk_upsert_network_objects(rows):
+    """
+    Массово создает и обновляет объекты сети в одной транзакции.
+
+    Строки с id обновляются; строки без id сопоставляются с существующими объектами по естественному
+    ключу (название и email, если email указан), если он указывает ровно на один объект. Остальные
+    строки и строки с временным ключом key создаются через bulk_create уровень за уровнем, чтобы
+    дочерние строки получали id поставщиков из той же загрузки. Один объект можно изменить только
+    одной строкой. При любой ошибке ничего не записывается, а BulkUpsertError содержит ошибки по
+    номерам строк.
+    """
+    if not isinstance(rows, list):
+        raise BulkUpsertError([{"index": None, "errors": "Ожидается список объектов"}])
+    if len(rows) > BULK_MAX_ROWS:
+        raise BulkUpsertError([{"index": None, "errors": f"Не более {BULK_MAX_ROWS} строк за один запрос"}])
+
+    serializer = NetworkObjectBulkItemSerializer(data=rows, many=True)
+    serializer.is_valid()
+    errors = [
+        {"index": index, "errors": row_errors} for index, row_errors in enumerate(serializer.errors or []) if row_errors
+    ]
+    if errors:
+        raise BulkUpsertError(errors)
+    items = serializer.validated_data
+
+    keys = {}
+    for index, item in enumerate(items):
+        if "key" in item:
+            if item["key"] in keys:
+                errors.append({"index": index, "errors": {"key": "Временный ключ повторяется"}})
+            keys[item["key"]] = index
+    for index, item in enumerate(items):
+        if "provider_key" in item and item["provider_key"] not in keys:
+            errors.append({"index": index, "errors": {"provider_key": "Нет строки с таким временным ключом"}})
+
+    provider_ids = {item["provider"] for item in items if item.get("provider")}
+    existing_providers = set(NetworkObject.objects.filter(pk__in=provider_ids).values_list("pk", flat=True))
+    for index, item in enumerate(items):
+        if item.get("provider") and item["provider"] not in existing_providers:
+            errors.append({"index": index, "errors": {"provider": "Поставщик не найден"}})
+
+    _match_natural_keys(items, errors)
+    rows_by_id = {}
+    for index, item in enumerate(items):
+        if "id" in item:
+            first = rows_by_id.setdefault(item["id"], index)
+            if first != index:
+                errors.append({"index": index, "errors": {"id": f"Объект уже изменяется строкой {first}"}})
+    update_ids = [item["id"] for item in items if "id" in item]
+    existing = NetworkObject.objects.in_bulk(update_ids)
+    for index, item in enumerate(items):
+        if "id" in item and item["id"] not in existing:
+            errors.append({"index": index, "errors": {"id": "Объект не найден"}})
+
+    depths = _key_depths(items, keys, errors)
+    if errors:
+        raise BulkUpsertError(sorted(errors, key=lambda error: error["index"]))
+
+    with transaction.atomic():
+        results = _apply_updates(items, existing)
+        results.update(_create(items, keys, depths))
+        results.update(_apply_updates(items, existing, keys=keys, created=results))
+    return [results[index] for index in range(len(items))]
+
+
+def _match_natural_keys(items, errors):
+    """
+    Подставляет id существующих объектов в строки без id и key по естественному ключу. Ключ не уникален
+    в базе, поэтому строка, подходящая к нескольким объектам или повторяющая ключ другой строки загрузки,
+    считается ошибкой: для нее нужно указать id.
+    """
+    rows = {}
+    for index, item in enumerate(items):
+        if "id" not in item and "key" not in item and item.get("email"):
+            rows.setdefault((item["name"], item["email"]), []).append(index)
+    if not rows:
+        return
+    matches = {}
+    emails = {email for _, email in rows}
+    for pk, name, email in NetworkObject.objects.filter(email__in=emails).values_list("pk", *NATURAL_KEY):
+        matches.setdefault((name, email), []).append(pk)
+    for natural_key, indexes in rows.items():
+        pks = matches.get(natural_key, [])
+        if len(indexes) > 1:
+            for index in indexes[1:]:
+                errors.append({"index": index, "errors": {"id": f"Название и email совпадают со строкой {indexes[0]}"}})
+        elif len(pks) > 1:
+            message = "Название и email есть у нескольких объектов, укажите id"
+            errors.append({"index": indexes[0], "errors": {"id": message}})
+        elif pks:
+            items[indexes[0]]["id"] = pks[0]
+
+
+def _key_depths(items, keys, errors):
+    """
+    Глубина новых строк внутри загрузки: строка создается только после строки своего provider_key.
+    """
+    depths = {}
+
+    def depth(index, seen):
+        if index in depths:
+            return depths[index]
+        if index in seen:
+            raise ValueError(index)
+        provider_key = items[index].get("provider_key")
+        result = 0 if provider_key is None else depth(keys[provider_key], seen | {index}) + 1
+        depths[index] = result
+        return result
+
+    for index, item in enumerate(items):
+        if "id" in item or ("provider_key" in item and item["provider_key"] not in keys):
+            continue
+        try:
+            depth(index, frozenset())
+        except ValueError:
+            errors.append({"index": index, "errors": {"provider_key": "Цикл в цепочке поставщиков"}})
+    return depths
+
+
+def _fields(item):
+    return {name: value for name, value in item.items() if name not in ("id", "key") + HIERARCHY_FIELDS}
+
+
+def _create(items, keys, depths):
+    results = {}
+    created = {}
+    provider_ids = {item["provider"] for index, item in enumerate(items) if index in depths and item.get("provider")}
+    paths = dict(NetworkObject.objects.filter(pk__in=provider_ids).values_list("pk", "path"))
+    for level in sorted(set(depths.values())):
+        indexes = [index for index, depth in depths.items() if depth == level]
+        objects = []
+        for index in indexes:
+            item = items[index]
+            provider_id = item.get("provider")
+            if "provider_key" in item:
+                provider_id = created[keys[item["provider_key"]]].pk
+            objects.append(NetworkObject(provider_id=provider_id, **_fields(item)))
+        NetworkObject.objects.bulk_create(objects, batch_size=BULK_BATCH_SIZE)
+        for index, network_object in zip(indexes, objects):
+            parent_path = paths.get(network_object.provider_id, "")
+            network_object.set_path(parent_path)
+            paths[network_object.pk] = network_object.path
+            created[index] = network_object
+            results[index] = {"index": index, "id": network_object.pk, "status": "created"}
+            if "key" in items[index]:
+                results[index]["key"] = items[index]["key"]
+        NetworkObject.objects.bulk_update(objects, ["path", "level"], batch_size=BULK_BATCH_SIZE)
+    # bulk_create минует save(), поэтому вклад новых объектов в сводные суммы долга добавляется здесь
+    NetworkObject.objects.shift_debt_rollups(
+        (network_object.path, *network_object.debt_contribution()) for network_object in created.values()
+    )
+    return results
+
+
+def _apply_updates(items, existing, keys=None, created=None):
+    """
+    Обновляет существующие объекты. Смена поставщика идет через save(), чтобы перенести поддерево
+    в индексе иерархии; остальные строки пишутся одним bulk_update.
+    """
+    results = {}
+    plain = []
+    plain_fields = set()
+    for index, item in enumerate(items):
+        if "id" not in item or ("provider_key" in item) != (keys is not None):
+            continue
+        network_object = existing[item["id"]]
+        for name, value in _fields(item).items():
+            setattr(network_object, name, value)
+        if "provider_key" in item:
+            network_object.provider_id = created[keys[item["provider_key"]]]["id"]
+        elif "provider" in item:
+            network_object.provider_id = item["provider"]
+        if "provider" in item or "provider_key" in item:
+            try:
+                network_object.save()
+            except ValidationError as error:
+                raise BulkUpsertError([{"index": index, "errors": error.message_dict}])
+        else:
+            plain.append(network_object)
+            plain_fields.update(_fields(item))
+        results[index] = {"index": index, "id": network_object.pk, "status": "updated"}
+    if plain and plain_fields:
+        NetworkObject.objects.bulk_update(plain, sorted(plain_fields), batch_size=BULK_BATCH_SIZE)
+        # bulk_update не отправляет post_save, поэтому кеш сбрасывается явно
+        invalidate_network_objects([network_object.pk for network_object in plain])
+    return results
+
+
+def change_assortment(network_object_ids=(), provider=None, add=(), remove=()):
+    """
+    Добавляет и удаляет продукты у набора объектов сети и/или у всего поддерева provider.
+
+    Связи пишутся напрямую в промежуточную таблицу: добавление - bulk_create(ignore_conflicts=True)
+    порциями по ASSORTMENT_CHUNK_SIZE объектов, удаление - одним DELETE по подзапросу.
+    Возвращает количество добавленных и удаленных связей. Запись в обход related-менеджера
+    не отправляет m2m_changed, поэтому кеш и updated_at объектов обновляются явно.
+    """
+    through = NetworkObject.products.through
+    condition = Q(pk__in=network_object_ids)
+    if provider is not None:
+        condition |= Q(path__startswith=provider.path)
+    targets = NetworkObject.objects.filter(condition).order_by()
+
+    added = removed = 0
+    with transaction.atomic():
+        if remove:
+            removed, _ = through.objects.filter(
+                networkobject_id__in=targets.values("pk"), product_id__in=remove
+            ).delete()
+        if add:
+            target_ids = targets.values_list("pk", flat=True).iterator(chunk_size=ASSORTMENT_CHUNK_SIZE)
+            for chunk in _chunks(target_ids, ASSORTMENT_CHUNK_SIZE):
+                existing = set(
+                    through.objects.filter(networkobject_id__in=chunk, product_id__in=add).values_list(
+                        "networkobject_id", "product_id"
+                    )
+                )
+                links = [
+                    through(networkobject_id=network_object_id, product_id=product_id)
+                    for network_object_id in chunk
+                    for product_id in add
+                    if (network_object_id, product_id) not in existing
+                ]
+                through.objects.bulk_create(links, batch_size=BULK_BATCH_SIZE, ignore_conflicts=True)
+                added += len(links)
+        invalidate_network_queryset(targets)
+        if added or removed:
+            # Промежуточная таблица не хранит дату изменения: ассортимент меняет updated_at объектов
+            targets.update()
+    return added, removed
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
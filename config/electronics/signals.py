@@ -0,0 +1,104 @@
+from django.db.models import QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from config.versions import bump_model_version
+from electronics.cache import (
+    invalidate,
+    invalidate_network_objects,
+    invalidate_network_queryset,
+    invalidate_product_carriers,
+)
+from electronics.models import (
+    DEBT_ROLLUP_FIELDS,
+    NetworkObject,
+    Product,
+    debt_contribution,
+    parent_path_of,
+    path_ids,
+)
+
+
+@receiver(post_save, sender=NetworkObject)
+@receiver(post_delete, sender=NetworkObject)
+def invalidate_network_object(sender, instance, **kwargs):
+    """
+    Сбрасывает кеш объекта сети, а при смене поставщика - и всего его поддерева (меняются путь и уровень).
+    """
+    invalidate_network_objects([instance.pk])
+    moved_from_path = getattr(instance, "moved_from_path", None)
+    if moved_from_path:
+        # post_save приходит до переноса поддерева, поэтому потомки еще лежат под старым путем
+        invalidate_network_queryset(NetworkObject.objects.filter(path__startswith=moved_from_path))
+
+
+@receiver(post_save, sender=NetworkObject)
+@receiver(post_delete, sender=NetworkObject)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def bump_version(sender, **kwargs):
+    """
+    Меняет версию модели, по которой строятся ETag и Last-Modified (config.mixins.ConditionalGetMixin).
+    Изменения ассортимента меняют версию объектов сети через update() в invalidate_assortment.
+    """
+    bump_model_version(sender)
+
+
+@receiver(pre_delete, sender=NetworkObject)
+def shift_debt_rollups_on_delete(sender, instance, origin=None, **kwargs):
+    """
+    Вычитает удаляемое поддерево из сводных сумм поставщиков один раз - для корня удаления: его
+    сводные суммы уже включают все каскадно удаляемые объекты. Объекты, чей поставщик удаляется тем же
+    вызовом, пропускаются. Значения читаются из базы, так как экземпляр в памяти может быть устаревшим.
+    """
+    if isinstance(origin, NetworkObject):
+        if instance.pk != origin.pk:
+            return
+    elif isinstance(origin, QuerySet) and origin.model is NetworkObject:
+        if not hasattr(origin, "deleted_pks"):
+            # Один запрос на вызов delete(): остальные удаляемые объекты - потомки этих
+            origin.deleted_pks = set(origin.values_list("pk", flat=True))
+        if origin.deleted_pks.intersection(path_ids(instance.path)[:-1]):
+            return
+    else:
+        # Удаление не через объект или QuerySet объектов сети: каждый объект вычитает только свой долг
+        stored = NetworkObject.objects.filter(pk=instance.pk).values_list("path", "debt_to_provider").first()
+        if stored is not None:
+            path, debt = stored
+            debt, over_limit = debt_contribution(debt)
+            NetworkObject.objects.shift_debt_rollups([(parent_path_of(path), -debt, -over_limit)])
+        return
+    stored = NetworkObject.objects.filter(pk=instance.pk).values_list("path", *DEBT_ROLLUP_FIELDS).first()
+    if stored is None:
+        return
+    path, debt, over_limit = stored
+    NetworkObject.objects.shift_debt_rollups([(parent_path_of(path), -debt, -over_limit)])
+
+
+@receiver(post_save, sender=Product)
+@receiver(pre_delete, sender=Product)
+def invalidate_product(sender, instance, **kwargs):
+    """
+    Сбрасывает кеш продукта и всех объектов сети, у которых он есть в ассортименте.
+    """
+    invalidate(Product, [instance.pk])
+    invalidate_product_carriers([instance.pk])
+
+
+@receiver(m2m_changed, sender=NetworkObject.products.through)
+def invalidate_assortment(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Сбрасывает кеш объектов сети, у которых изменился ассортимент, и обновляет их updated_at:
+    промежуточная таблица своей даты изменения не имеет.
+    """
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if not reverse:
+        invalidate_network_objects([instance.pk])
+        NetworkObject.objects.filter(pk=instance.pk).update()
+    elif action == "pre_clear":
+        invalidate_product_carriers([instance.pk])
+        NetworkObject.objects.filter(products=instance).update()
+    else:
+        invalidate_network_objects(pk_set)
+        NetworkObject.objects.filter(pk__in=pk_set).update()
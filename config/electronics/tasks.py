@@ -0,0 +1,185 @@
+from decimal import Decimal
+from pathlib import Path
+
+from celery import shared_task
+from django.conf import settings
+from django.db import InterfaceError, OperationalError, transaction
+from django.utils import timezone
+
+from electronics.accrual import run_accruals
+from electronics.cache import invalidate_network_objects, invalidate_network_queryset
+from electronics.export import EXPORT_CHUNK_SIZE, EXPORT_CONTENT_TYPES, RENDERERS, iter_network_rows
+from electronics.filters import filter_network_objects
+from electronics.models import Job, NetworkObject
+from electronics.services import BulkUpsertError, bulk_upsert_network_objects
+
+JOB_CHUNK_SIZE = 5000
+JOB_MAX_RETRIES = 3
+JOB_RETRY_DELAY = 10  # секунд, удваивается с каждой попыткой
+# Сбои соединения с базой повторяются; порции, записанные до сбоя, не выполняются повторно благодаря cursor
+RETRYABLE_ERRORS = (OperationalError, InterfaceError)
+
+
+class JobError(Exception):
+    """
+    Ошибка в данных задачи: повтор не поможет, задача завершается со статусом failed и результатом result.
+    """
+
+    def __init__(self, message, result=None):
+        super().__init__(message)
+        self.result = result
+
+
+def enqueue_job(kind, params, user=None):
+    """
+    Создает задачу и ставит ее в очередь после фиксации транзакции, чтобы worker увидел запись.
+    """
+    if user is not None and not user.is_authenticated:
+        user = None
+    job = Job.objects.create(kind=kind, params=params, user=user)
+    transaction.on_commit(lambda: run_job.delay(job.pk))
+    return job
+
+
+def save_progress(job, **fields):
+    for name, value in fields.items():
+        setattr(job, name, value)
+    Job.objects.filter(pk=job.pk).update(**fields)
+
+
+def run_debt(job):
+    """
+    Операция с долгом порциями по JOB_CHUNK_SIZE объектов в порядке id: каждая порция - короткая транзакция
+    из одного UPDATE, записи в журнал и сдвига cursor, поэтому повтор продолжает со следующей порции.
+    """
+    params = job.params
+    queryset = filter_network_objects(params)
+    if job.total is None:
+        save_progress(job, total=queryset.count())
+    amount = Decimal(params["amount"]) if params.get("amount") is not None else None
+    audit_params = {key: value for key, value in params.items() if key != "ids"} | {"job": job.pk}
+    result = job.result or {"affected": 0, "debt_delta": "0"}
+    while True:
+        with transaction.atomic():
+            chunk = list(
+                queryset.filter(pk__gt=job.cursor or 0).order_by("pk").values_list("pk", flat=True)[:JOB_CHUNK_SIZE]
+            )
+            if not chunk:
+                return result
+            operation = NetworkObject.objects.filter(pk__in=chunk).change_debt(
+                params["operation"], amount=amount, user=job.user, params=audit_params
+            )
+            invalidate_network_objects(chunk)
+            result = {
+                "affected": result["affected"] + operation.affected,
+                "debt_delta": str(Decimal(result["debt_delta"]) + operation.debt_delta),
+            }
+            save_progress(job, cursor=chunk[-1], processed=job.processed + len(chunk), result=result)
+
+
+def run_bulk_import(job):
+    """
+    Массовая загрузка выполняется целиком в одной транзакции, как и синхронный эндпоинт bulk.
+    """
+    rows = job.params["rows"]
+    save_progress(job, total=len(rows))
+    try:
+        results = bulk_upsert_network_objects(rows)
+    except BulkUpsertError as error:
+        raise JobError("Ошибки в строках загрузки", result={"errors": error.errors})
+    save_progress(job, processed=len(rows))
+    return {
+        "created": sum(result["status"] == "created" for result in results),
+        "updated": sum(result["status"] == "updated" for result in results),
+        "results": results,
+    }
+
+
+def run_export(job):
+    """
+    Выгрузка в файл JOB_FILES_DIR/job-<id>.<формат>; прогресс обновляется через каждые EXPORT_CHUNK_SIZE строк.
+    При повторе файл пишется заново.
+    """
+    output = job.params["output"]
+    queryset = filter_network_objects(job.params)
+    save_progress(job, total=queryset.count(), processed=0)
+
+    def counted(rows):
+        for processed, row in enumerate(rows, start=1):
+            yield row
+            if processed % EXPORT_CHUNK_SIZE == 0:
+                save_progress(job, processed=processed)
+        save_progress(job, processed=job.total)
+
+    directory = Path(settings.JOB_FILES_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    name = f"job-{job.pk}.{output}"
+    with open(directory / name, "w", encoding="utf-8", newline="") as file:
+        file.writelines(RENDERERS[output](counted(iter_network_rows(queryset))))
+    return {"file": name, "content_type": EXPORT_CONTENT_TYPES[output], "rows": job.total}
+
+
+def run_rebuild_hierarchy(job):
+    """
+    Пересчет индекса иерархии и сводных сумм долга всей сети.
+    """
+    save_progress(job, total=2)
+    updated = NetworkObject.objects.rebuild_hierarchy()
+    save_progress(job, processed=1)
+    NetworkObject.objects.rebuild_debt_rollups()
+    with transaction.atomic():
+        invalidate_network_queryset(NetworkObject.objects.all())
+    save_progress(job, processed=2)
+    return {"updated": updated}
+
+
+JOB_HANDLERS = {
+    Job.DEBT: run_debt,
+    Job.BULK_IMPORT: run_bulk_import,
+    Job.EXPORT: run_export,
+    Job.REBUILD_HIERARCHY: run_rebuild_hierarchy,
+}
+
+
+@shared_task(bind=True, max_retries=JOB_MAX_RETRIES)
+def run_job(self, job_id):
+    """
+    Выполняет задачу Job. Сбои базы повторяются с экспоненциальной задержкой, ошибки данных завершают
+    задачу сразу. Уже завершенные задачи (например, при повторной доставке сообщения) пропускаются.
+    """
+    job = Job.objects.filter(pk=job_id).exclude(status__in=(Job.SUCCEEDED, Job.FAILED)).first()
+    if job is None:
+        return
+    save_progress(
+        job, status=Job.RUNNING, attempts=job.attempts + 1, started_at=job.started_at or timezone.now(), error=""
+    )
+    try:
+        result = JOB_HANDLERS[job.kind](job)
+    except JobError as error:
+        save_progress(job, status=Job.FAILED, result=error.result, error=str(error), finished_at=timezone.now())
+    except RETRYABLE_ERRORS as error:
+        if self.request.retries >= self.max_retries:
+            save_progress(job, status=Job.FAILED, error=str(error), finished_at=timezone.now())
+            raise
+        save_progress(job, status=Job.PENDING, error=str(error))
+        raise self.retry(exc=error, countdown=JOB_RETRY_DELAY * 2**self.request.retries)
+    except Exception as error:
+        save_progress(job, status=Job.FAILED, error=repr(error), finished_at=timezone.now())
+        raise
+    else:
+        save_progress(job, status=Job.SUCCEEDED, result=result, finished_at=timezone.now())
+
+
+@shared_task(bind=True, max_retries=JOB_MAX_RETRIES)
+def accrue_debts(self):
+    """
+    Периодическое начисление долга по активным правилам (расписание - CELERY_BEAT_SCHEDULE).
+    Повтор после сбоя продолжает незавершенные запуски с сохраненной позиции.
+    """
+    try:
+        runs = run_accruals()
+    except RETRYABLE_ERRORS as error:
+        raise self.retry(exc=error, countdown=JOB_RETRY_DELAY * 2**self.request.retries)
+    return [
+        {"rule": run.rule_id, "processed": run.processed, "rows_per_second": run.rows_per_second} for run in runs
+    ]
@@ -1,6 +1,49 @@
-from django.test import TestCase, Client
+import json
+import os
+import tempfile
+import threading
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.admin import AdminSite
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections
+from django.db.models import F
+from django.test import SimpleTestCase, TestCase, Client, modify_settings, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from electronics.models import Product, NetworkObject
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from electronics.accrual import process_run, run_accruals
+from electronics.cache import detail_cache_key, get_cache
+from electronics.checks import check_celery_broker
+from electronics.models import (
+    DebtAccrualRule,
+    DebtAccrualRun,
+    DebtOperation,
+    Job,
+    ModelVersion,
+    NetworkObject,
+    Product,
+)
+from electronics.tasks import JOB_HANDLERS, accrue_debts, run_job
+from config.db.pool import POOLS, ConnectionPool, PoolTimeout
+from config.lazy import LazyAdminURLConf, admin_urls, lazy_view
+from config.middleware import ReplicaRoutingMiddleware
+from config.profiling import RequestProfile
+from config.schema import clear_schema_cache, generate_schema, source_version
+from config.startup import first_request, import_times, package_times, run_child
+from config.db.router import reads_from_replica
+from users.authentication import clear_local_flags
+from users.models import User
 
 
 class ProductModelTests(TestCase):
@@ -106,4 +149,1518 @@ class NetworkObjectAdminTests(TestCase):
                                     {"password1": "newpassword", "password2": "newpassword"})
         self.assertEqual(response.status_code, 302)
         self.assertRedirects(self.admin_url)
-        self.assertTrue(self.client.login(username="admin@gmail.com", password="newpassword"))
\ No newline at end of file
+        self.assertTrue(self.client.login(username="admin@gmail.com", password="newpassword"))
+
+
+class StaffAPITestCase(APITestCase):
+    """
+    Базовый класс API-тестов: активный сотрудник и пустой кеш перед каждым тестом.
+    """
+
+    def setUp(self):
+        cache.clear()
+        clear_local_flags()
+        self.user = User(email="staff@example.com", first_name="Staff", last_name="User", is_staff=True)
+        self.user.set_password("testpassword")
+        self.user.save()
+        self.client.force_authenticate(user=self.user)
+
+
+class NetworkObjectHierarchyTests(TestCase):
+    def setUp(self):
+        self.factory = NetworkObject.objects.create(name="Завод")
+        self.retail = NetworkObject.objects.create(name="Розничная сеть", provider=self.factory)
+        self.entrepreneur = NetworkObject.objects.create(name="ИП", provider=self.retail)
+
+    def test_path_and_level_on_create(self):
+        self.assertEqual(self.factory.level, 0)
+        self.assertEqual(self.retail.level, 1)
+        self.assertEqual(self.entrepreneur.level, 2)
+        self.assertEqual(self.entrepreneur.ancestor_ids, [self.factory.pk, self.retail.pk])
+        self.assertEqual(self.entrepreneur.root_id, self.factory.pk)
+
+    def test_descendants_and_ancestors(self):
+        self.assertEqual(
+            list(self.factory.get_descendants().order_by("level")), [self.retail, self.entrepreneur]
+        )
+        self.assertEqual(list(self.factory.get_descendants(max_depth=1)), [self.retail])
+        with self.assertNumQueries(1):
+            self.assertEqual(list(self.entrepreneur.get_ancestors()), [self.factory, self.retail])
+
+    def test_reparent_moves_subtree(self):
+        other_factory = NetworkObject.objects.create(name="Другой завод")
+        self.retail.provider = other_factory
+        self.retail.save()
+        self.entrepreneur.refresh_from_db()
+        self.assertEqual(self.entrepreneur.ancestor_ids, [other_factory.pk, self.retail.pk])
+        self.assertEqual(self.entrepreneur.level, 2)
+
+        self.retail.provider = None
+        self.retail.save()
+        self.entrepreneur.refresh_from_db()
+        self.assertEqual(self.entrepreneur.ancestor_ids, [self.retail.pk])
+        self.assertEqual(self.entrepreneur.level, 1)
+
+    def test_cycle_is_rejected(self):
+        self.factory.provider = self.entrepreneur
+        with self.assertRaises(ValidationError):
+            self.factory.save()
+
+    def test_crossed_reparent_is_rejected(self):
+        first, second = NetworkObject.objects.create(name="A"), NetworkObject.objects.create(name="B")
+        stale_second = NetworkObject.objects.get(pk=second.pk)
+        first.provider = second
+        with CaptureQueriesContext(connection) as context:
+            first.save()
+        lock = context.captured_queries[1]["sql"]
+        self.assertIn(f"IN ({first.pk}, {second.pk})", lock)
+        self.assertIn('ORDER BY "electronics_networkobject"."id" ASC', lock)
+        stale_second.provider = first
+        with self.assertRaises(ValidationError):
+            stale_second.save()
+
+    def test_deep_hierarchy(self):
+        provider = self.entrepreneur
+        for index in range(40):
+            provider = NetworkObject.objects.create(pk=1000000 + index, name=f"Уровень {index}", provider=provider)
+        provider.refresh_from_db()
+        self.assertGreater(len(provider.path), 255)
+        self.assertEqual(provider.level, 42)
+
+    def test_cascade_delete_removes_subtree(self):
+        self.retail.delete()
+        self.assertEqual(list(NetworkObject.objects.all()), [self.factory])
+
+    def test_rebuild_hierarchy(self):
+        NetworkObject.objects.update(path="", level=0)
+        NetworkObject.objects.rebuild_hierarchy()
+        self.entrepreneur.refresh_from_db()
+        self.assertEqual(self.entrepreneur.path, f"{self.factory.pk}/{self.retail.pk}/{self.entrepreneur.pk}/")
+        self.assertEqual(self.entrepreneur.level, 2)
+
+
+class NetworkObjectTreeApiTests(StaffAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.factory = NetworkObject.objects.create(name="Завод")
+        self.retail = NetworkObject.objects.create(name="Розничная сеть", provider=self.factory)
+        self.entrepreneur = NetworkObject.objects.create(name="ИП", provider=self.retail)
+
+    def test_descendants(self):
+        url = reverse("network:networkobject-descendants", args=[self.factory.pk])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item["id"] for item in response.data["results"]], [self.retail.pk, self.entrepreneur.pk])
+
+        response = self.client.get(url, {"depth": 1})
+        self.assertEqual([item["id"] for item in response.data["results"]], [self.retail.pk])
+
+    def test_ancestors(self):
+        url = reverse("network:networkobject-ancestors", args=[self.entrepreneur.pk])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item["id"] for item in response.data["results"]], [self.factory.pk, self.retail.pk])
+
+        response = self.client.get(url, {"depth": 1})
+        self.assertEqual([item["id"] for item in response.data["results"]], [self.retail.pk])
+
+        response = self.client.get(url, {"search": "Завод"})
+        self.assertEqual([item["id"] for item in response.data["results"]], [self.factory.pk])
+        response = self.client.get(url, {"ordering": "-level"})
+        self.assertEqual([item["id"] for item in response.data["results"]], [self.retail.pk, self.factory.pk])
+
+    def test_invalid_depth(self):
+        url = reverse("network:networkobject-descendants", args=[self.factory.pk])
+        response = self.client.get(url, {"depth": "-1"})
+        self.assertEqual(response.status_code, 400)
+
+
+class QueryBudgetTests(StaffAPITestCase):
+    """
+    Число запросов к базе на каждый эндпоинт фиксировано и не растет вместе с количеством объектов.
+    """
+
+    budgets = {
+        # ETag list и retrieve строится по версиям моделей: один запрос к таблице версий
+        "network:product-list": 2,
+        "network:product-detail": 2,
+        "network:networkobject-list": 2,
+        "network:networkobject-detail": 3,
+        "network:networkobject-descendants": 2,
+        "network:networkobject-ancestors": 2,
+    }
+
+    def setUp(self):
+        super().setUp()
+        self.factory = NetworkObject.objects.create(name="Завод")
+        self.product = Product.objects.create(name="Телевизор")
+
+    def add_rows(self, count):
+        provider = self.factory
+        for index in range(count):
+            product = Product.objects.create(name=f"Продукт {index}")
+            provider = NetworkObject.objects.create(name=f"Объект {index}", provider=provider)
+            provider.products.add(product, self.product)
+            self.factory.products.add(product)
+
+    def get_url(self, name):
+        if name.startswith("network:product-"):
+            args = [self.product.pk] if name.endswith("detail") else []
+        else:
+            deepest = NetworkObject.objects.order_by("-level").first()
+            node = deepest if name.endswith("ancestors") else self.factory
+            args = [] if name.endswith("list") else [node.pk]
+        return reverse(name, args=args)
+
+    def count_queries(self, name):
+        url = self.get_url(name)
+        # Записи версий моделей создаются первым запросом
+        self.client.get(url)
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, name)
+        return len(context)
+
+    def test_query_budget_does_not_depend_on_rows(self):
+        self.add_rows(2)
+        small = {name: self.count_queries(name) for name in self.budgets}
+        self.add_rows(10)
+        large = {name: self.count_queries(name) for name in self.budgets}
+        for name, budget in self.budgets.items():
+            with self.subTest(endpoint=name):
+                self.assertLessEqual(small[name], budget)
+                self.assertEqual(small[name], large[name])
+
+
+class KeysetPaginationTests(StaffAPITestCase):
+    def setUp(self):
+        super().setUp()
+        for index in range(7):
+            Product.objects.create(name=f"Продукт {index % 3}")
+        self.url = reverse("network:product-list")
+
+    def collect(self, params):
+        names, ids, url = [], [], self.url
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            names += [item["name"] for item in response.data["results"]]
+            ids += [item["id"] for item in response.data["results"]]
+            if not response.data["next"]:
+                return names, ids, response
+            response = self.client.get(response.data["next"])
+
+    def test_pages_follow_ordering_with_id_tiebreaker(self):
+        names, ids, _ = self.collect({"page_size": 2, "ordering": "-name"})
+        expected = list(Product.objects.order_by("-name", "id").values_list("name", "id"))
+        self.assertEqual(list(zip(names, ids)), expected)
+
+    def test_previous_link(self):
+        first = self.client.get(self.url, {"page_size": 3})
+        second = self.client.get(first.data["next"])
+        previous = self.client.get(second.data["previous"])
+        self.assertEqual(previous.data["results"], first.data["results"])
+
+    def test_deep_page_uses_single_query(self):
+        response = self.client.get(self.url, {"page_size": 2})
+        response = self.client.get(response.data["next"])
+        # Страница читается одним запросом, ETag строится по версиям моделей - еще один
+        with self.assertNumQueries(2):
+            self.client.get(response.data["next"])
+
+    def test_page_number_mode(self):
+        response = self.client.get(self.url, {"page": 2, "page_size": 5})
+        self.assertEqual(response.data["count"], 7)
+        self.assertEqual(len(response.data["results"]), 2)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {"cursor": "garbage"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_cursor_condition_has_leading_bound(self):
+        response = self.client.get(self.url, {"page_size": 2, "ordering": "-name"})
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(response.data["next"])
+        sql = queries.captured_queries[-1]["sql"]
+        self.assertIn('"electronics_product"."name" <= ', sql)
+
+    def test_nullable_town_ordering(self):
+        for town in ("Москва", None, "Казань", None, "Москва"):
+            NetworkObject.objects.create(name="Магазин", town=town)
+        url = reverse("network:networkobject-list")
+        towns, response = [], self.client.get(url, {"page_size": 2})
+        while True:
+            towns += [item["town"] for item in response.data["results"]]
+            if not response.data["next"]:
+                break
+            response = self.client.get(response.data["next"])
+        self.assertEqual(towns, [None, None, "Казань", "Москва", "Москва"])
+
+
+class NetworkExportTests(StaffAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.factory = NetworkObject.objects.create(name="Завод", town="Москва", debt_to_provider="10.50")
+        self.retail = NetworkObject.objects.create(name="Сеть", provider=self.factory)
+        self.factory.products.add(Product.objects.create(name="Телевизор"))
+        self.url = reverse("network:networkobject-export")
+
+    def test_ndjson_export(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row["id"] for row in rows], [self.factory.pk, self.retail.pk])
+        self.assertEqual(rows[0]["products"][0]["name"], "Телевизор")
+        self.assertEqual(rows[0]["debt_to_provider"], "10.50")
+        self.assertEqual(rows[1]["level"], 1)
+        self.assertEqual(rows[1]["full_address"], "None, None, None, None")
+
+    def test_csv_export_with_filter(self):
+        response = self.client.get(self.url, {"output": "csv", "level": 0})
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].startswith(f"{self.factory.pk},Завод"))
+        self.assertIn("Телевизор", lines[1])
+
+    def test_management_command(self):
+        stdout = StringIO()
+        call_command("export_network", output="ndjson", stdout=stdout)
+        self.assertEqual(len(stdout.getvalue().splitlines()), 2)
+
+
+class NetworkObjectBulkTests(StaffAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.factory = NetworkObject.objects.create(name="Завод", email="factory@example.com")
+        self.url = reverse("network:networkobject-bulk")
+
+    def test_create_parents_and_children_together(self):
+        rows = [
+            {"key": "retail", "name": "Розничная сеть", "provider": self.factory.pk},
+            {"key": "shop", "name": "ИП", "provider_key": "retail"},
+            {"name": "Завод", "email": "factory@example.com", "town": "Москва"},
+        ]
+        with self.assertNumQueries(11):
+            response = self.client.post(self.url, rows, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data["created"], response.data["updated"]), (2, 1))
+        shop = NetworkObject.objects.get(name="ИП")
+        retail = NetworkObject.objects.get(name="Розничная сеть")
+        self.assertEqual(shop.provider, retail)
+        self.assertEqual(shop.ancestor_ids, [self.factory.pk, retail.pk])
+        self.factory.refresh_from_db()
+        self.assertEqual(self.factory.town, "Москва")
+
+    def test_reparent_existing_under_new_row(self):
+        retail = NetworkObject.objects.create(name="Сеть", provider=self.factory)
+        rows = [
+            {"key": "new", "name": "Новый завод"},
+            {"id": retail.pk, "name": "Сеть", "provider_key": "new"},
+        ]
+        response = self.client.post(self.url, rows, format="json")
+        self.assertEqual(response.status_code, 200)
+        retail.refresh_from_db()
+        self.assertEqual(retail.level, 1)
+        self.assertEqual(retail.provider.name, "Новый завод")
+
+    def test_per_row_errors_write_nothing(self):
+        rows = [
+            {"key": "a", "name": "A", "provider_key": "b"},
+            {"key": "b", "name": "B", "provider_key": "a"},
+            {"name": "C", "provider": 999999},
+            {"name": "D", "email": "not-an-email"},
+        ]
+        response = self.client.post(self.url, rows, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error["index"] for error in response.data["errors"]], [3])
+
+        response = self.client.post(self.url, rows[:3], format="json")
+        self.assertEqual([error["index"] for error in response.data["errors"]], [0, 1, 2])
+        self.assertEqual(NetworkObject.objects.count(), 1)
+
+    def test_ambiguous_natural_key_rejected(self):
+        NetworkObject.objects.create(name="Завод", email="factory@example.com")
+        rows = [
+            {"name": "Завод", "email": "factory@example.com", "town": "Москва"},
+            {"name": "Сеть", "email": "retail@example.com"},
+            {"name": "Сеть", "email": "retail@example.com"},
+        ]
+        response = self.client.post(self.url, rows, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error["index"] for error in response.data["errors"]], [0, 2])
+        self.assertFalse(NetworkObject.objects.filter(town="Москва").exists())
+
+        rows[0]["id"] = self.factory.pk
+        response = self.client.post(self.url, rows[:2], format="json")
+        self.assertEqual((response.data["created"], response.data["updated"]), (1, 1))
+
+    def test_duplicate_ids_rejected(self):
+        rows = [
+            {"id": self.factory.pk, "name": "Завод", "town": "Москва"},
+            {"name": "Сеть"},
+            {"id": self.factory.pk, "name": "Завод", "town": "Казань"},
+            {"name": "Завод", "email": "factory@example.com", "town": "Тула"},
+        ]
+        response = self.client.post(self.url, rows, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error["index"] for error in response.data["errors"]], [2, 3])
+        self.assertEqual(NetworkObject.objects.count(), 1)
+
+
+class AssortmentTests(StaffAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.factory = NetworkObject.objects.create(name="Завод")
+        self.retail = NetworkObject.objects.create(name="Сеть", provider=self.factory)
+        self.shop = NetworkObject.objects.create(name="ИП", provider=self.retail)
+        self.other = NetworkObject.objects.create(name="Другой завод")
+        self.tv = Product.objects.create(name="Телевизор")
+        self.phone = Product.objects.create(name="Телефон")
+        self.url = reverse("network:networkobject-assortment")
+
+    def test_add_to_subtree_and_remove(self):
+        self.shop.products.add(self.tv)
+        response = self.client.post(
+            self.url, {"provider": self.retail.pk, "add": [self.tv.pk, self.phone.pk]}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {"added": 3, "removed": 0})
+        self.assertEqual(set(self.retail.products.all()), {self.tv, self.phone})
+        self.assertFalse(self.factory.products.exists())
+
+        response = self.client.post(
+            self.url, {"network_objects": [self.shop.pk, self.other.pk], "remove": [self.tv.pk]}, format="json"
+        )
+        self.assertEqual(response.data, {"added": 0, "removed": 1})
+        self.assertEqual(list(self.shop.products.all()), [self.phone])
+
+    def test_unknown_product(self):
+        response = self.client.post(self.url, {"network_objects": [self.shop.pk], "add": [999999]}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+
+class BenchmarkCommandTests(TestCase):
+    def test_search_suite_smoke(self):
+        stdout = StringIO()
+        call_command("benchmark", "search", rows=[150], repeat=1, cleanup=True, stdout=stdout)
+        self.assertIn("search", stdout.getvalue())
+        self.assertFalse(NetworkObject.objects.exists())
+
+
+class ProductFullTextSearchTests(StaffAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.tv = Product.objects.create(name="Телевизор", description="Большой экран")
+        Product.objects.create(name="Телефон", description="Маленький экран")
+        self.url = reverse("network:product-list")
+
+    def test_q_falls_back_to_icontains(self):
+        response = self.client.get(self.url, {"q": "визор"})
+        self.assertEqual(response.status_code, 200)
+        results = response.data["results"]
+        self.assertEqual([item["id"] for item in results], [self.tv.pk])
+        self.assertIn("rank", results[0])
+        self.assertNotIn("search_vector", results[0])
+
+    def test_search_filter_still_available(self):
+        response = self.client.get(self.url, {"search": "экран"})
+        self.assertEqual(len(response.data["results"]), 2)
+
+
+class DetailCacheTests(StaffAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.factory = NetworkObject.objects.create(name="Завод")
+        self.shop = NetworkObject.objects.create(name="Магазин", provider=self.factory)
+        self.product = Product.objects.create(name="Телевизор")
+        self.shop.products.add(self.product)
+
+    def get_detail(self, network_object):
+        return self.client.get(reverse("network:networkobject-detail", args=[network_object.pk]))
+
+    def test_second_read_is_served_from_cache(self):
+        self.get_detail(self.shop)
+        # Из базы читаются только версии моделей для ETag
+        with self.assertNumQueries(1):
+            response = self.get_detail(self.shop)
+        self.assertEqual(response.data["name"], "Магазин")
+
+    def test_product_update_evicts_carriers(self):
+        self.get_detail(self.shop)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.name = "Смартфон"
+            self.product.save()
+        self.assertEqual(self.get_detail(self.shop).data["products"][0]["name"], "Смартфон")
+
+    def test_reparent_evicts_subtree(self):
+        other = NetworkObject.objects.create(name="Другой завод")
+        self.get_detail(self.shop)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.factory.provider = other
+            self.factory.save()
+        self.assertEqual(self.get_detail(self.shop).data["ancestors"], [other.pk, self.factory.pk])
+
+    def test_assortment_change_evicts(self):
+        self.get_detail(self.shop)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.shop.products.remove(self.product)
+        self.assertEqual(self.get_detail(self.shop).data["products"], [])
+
+    def test_debt_change_evicts_ancestor_rollups(self):
+        self.assertEqual(self.get_detail(self.factory).data["subtree_debt"], "0.00")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.shop.debt_to_provider = 70000
+            self.shop.save()
+        data = self.get_detail(self.factory).data
+        self.assertEqual((data["subtree_debt"], data["subtree_over_limit"]), ("70000.00", 1))
+        with self.captureOnCommitCallbacks(execute=True):
+            NetworkObject.objects.filter(pk=self.shop.pk).change_debt(DebtOperation.PAY, Decimal(69000))
+        self.assertEqual(self.get_detail(self.factory).data["subtree_debt"], "1000.00")
+
+
+class ConditionalGetTests(StaffAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.network_object = NetworkObject.objects.create(name="Магазин", debt_to_provider=100)
+        self.url = reverse("network:networkobject-list")
+
+    def get(self, **headers):
+        return self.client.get(self.url, **headers)
+
+    def test_not_modified_skips_queryset(self):
+        etag = self.get()["ETag"]
+        with self.assertNumQueries(1):
+            response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_bulk_update_changes_etag(self):
+        response = self.get()
+        self.assertIn("Last-Modified", response)
+        with self.captureOnCommitCallbacks(execute=True):
+            NetworkObject.objects.filter(pk=self.network_object.pk).update(debt_to_provider=0)
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 200)
+
+    def test_assortment_change_changes_detail_etag(self):
+        url = reverse("network:networkobject-detail", args=[self.network_object.pk])
+        etag = self.client.get(url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.network_object.products.add(Product.objects.create(name="Телевизор"))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_delete_changes_etag(self):
+        etag = self.get()["ETag"]
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.network_object.delete()
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_version_shared_between_processes(self):
+        etag = self.get()["ETag"]
+        # Другой процесс (например, Celery worker) меняет версию в базе, кеш этого процесса не участвует
+        ModelVersion.objects.filter(label="electronics.networkobject").update(version="other")
+        cache.clear()
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_change_in_same_second_is_modified(self):
+        for _ in range(2):
+            last_modified = self.get()["Last-Modified"]
+            with self.captureOnCommitCallbacks(execute=True):
+                self.network_object.save()
+            response = self.get(HTTP_IF_MODIFIED_SINCE=last_modified)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response["Last-Modified"], last_modified)
+
+
+class DebtRollupTests(TestCase):
+    def setUp(self):
+        self.factory = NetworkObject.objects.create(name="Завод", debt_to_provider=0)
+        self.retail = NetworkObject.objects.create(name="Сеть", provider=self.factory, debt_to_provider=500)
+        self.shop = NetworkObject.objects.create(name="ИП", provider=self.retail, debt_to_provider=20000)
+
+    def assertRollup(self, network_object, debt, over_limit):
+        network_object.refresh_from_db()
+        self.assertEqual((network_object.subtree_debt, network_object.subtree_over_limit), (debt, over_limit))
+
+    def assertMatchesRebuild(self):
+        current = list(NetworkObject.objects.order_by("pk").values_list("pk", "subtree_debt", "subtree_over_limit"))
+        NetworkObject.objects.rebuild_debt_rollups()
+        rebuilt = list(NetworkObject.objects.order_by("pk").values_list("pk", "subtree_debt", "subtree_over_limit"))
+        self.assertEqual(current, rebuilt)
+
+    def test_create_and_change_debt(self):
+        self.assertRollup(self.factory, 20500, 1)
+        self.shop.debt_to_provider = 100
+        self.shop.save()
+        self.assertRollup(self.factory, 600, 0)
+        self.assertRollup(self.retail, 600, 0)
+        self.assertMatchesRebuild()
+
+    def test_reparent_moves_subtree_totals(self):
+        other = NetworkObject.objects.create(name="Другой завод")
+        self.retail.provider = other
+        self.retail.save()
+        self.assertRollup(self.factory, 0, 0)
+        self.assertRollup(other, 20500, 1)
+        self.assertMatchesRebuild()
+
+    def test_queryset_update_and_delete(self):
+        NetworkObject.objects.filter(pk=self.shop.pk).update(debt_to_provider=None)
+        self.assertRollup(self.factory, 500, 0)
+        NetworkObject.objects.filter(pk=self.retail.pk).update(debt_to_provider=F("debt_to_provider") + 15000)
+        self.assertRollup(self.factory, 15500, 1)
+        self.retail.delete()
+        self.assertRollup(self.factory, 0, 0)
+        self.assertMatchesRebuild()
+
+    def test_chunked_update_shifts_providers_once(self):
+        for index in range(5):
+            NetworkObject.objects.create(name=f"Магазин {index}", provider=self.retail, debt_to_provider=100)
+        with mock.patch("electronics.models.ROLLUP_BATCH_SIZE", 2), CaptureQueriesContext(connection) as context:
+            rows = NetworkObject.objects.filter(provider=self.retail).update(debt_to_provider=F("debt_to_provider") * 2)
+        self.assertEqual(rows, 6)
+        # На SQLite FOR UPDATE не выводится: порции узнаются по чтению пути в порядке id
+        chunks = [query["sql"] for query in context.captured_queries if query["sql"].endswith("LIMIT 2")]
+        self.assertEqual(len(chunks), 4)
+        self.assertTrue(all('ORDER BY "electronics_networkobject"."id" ASC' in sql for sql in chunks))
+        rollups = [query for query in context.captured_queries if '"subtree_debt" =' in query["sql"]]
+        # По UPDATE сводных сумм на каждую порцию и один для поставщиков
+        self.assertEqual(len(rollups), 4)
+        self.assertRollup(self.retail, 41500, 1)
+        self.assertRollup(self.factory, 41500, 1)
+        self.assertMatchesRebuild()
+
+    def test_cascade_delete_shifts_ancestors_once(self):
+        for index in range(5):
+            NetworkObject.objects.create(name=f"Магазин {index}", provider=self.shop, debt_to_provider=100)
+        with CaptureQueriesContext(connection) as context:
+            self.retail.delete()
+        rollup_updates = [query for query in context.captured_queries if '"subtree_debt" =' in query["sql"]]
+        self.assertEqual(len(rollup_updates), 1)
+        self.assertRollup(self.factory, 0, 0)
+        self.assertMatchesRebuild()
+
+    def test_queryset_delete_skips_deleted_descendants(self):
+        other = NetworkObject.objects.create(name="Магазин", provider=self.factory, debt_to_provider=300)
+        NetworkObject.objects.filter(pk__in=[self.retail.pk, self.shop.pk]).delete()
+        self.assertRollup(self.factory, 300, 0)
+        other.delete()
+        self.assertRollup(self.factory, 0, 0)
+        self.assertMatchesRebuild()
+
+
+class DebtAnalyticsApiTests(StaffAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.factory = NetworkObject.objects.create(name="Завод", country="Россия", town="Москва")
+        NetworkObject.objects.create(
+            name="Магазин", provider=self.factory, country="Россия", town="Казань", debt_to_provider=12000
+        )
+        NetworkObject.objects.create(name="ИП", provider=self.factory, country="Беларусь", debt_to_provider=300)
+        self.url = reverse("network:networkobject-analytics")
+
+    def test_group_by_country(self):
+        rows = self.client.get(self.url, {"group": "country"}).data["results"]
+        self.assertEqual(
+            [(row["country"], row["total_debt"], row["objects"], row["over_limit"]) for row in rows],
+            [("Россия", 12000, 2, 1), ("Беларусь", 300, 1, 0)],
+        )
+
+    def test_subtree_lists_factories_by_default(self):
+        response = self.client.get(self.url)
+        self.assertEqual(
+            [(row["name"], row["subtree_debt"], row["subtree_over_limit"]) for row in response.data["results"]],
+            [("Завод", Decimal("12300.00"), 1)],
+        )
+        response = self.client.get(self.url, {"group": "subtree", "provider": self.factory.pk})
+        self.assertEqual([row["name"] for row in response.data["results"]], ["Магазин", "ИП"])
+
+    def test_unknown_group(self):
+        self.assertEqual(self.client.get(self.url, {"group": "street"}).status_code, 400)
+
+
+class DebtOperationTests(StaffAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.factory = NetworkObject.objects.create(name="Завод")
+        self.shop = NetworkObject.objects.create(name="Магазин", provider=self.factory, debt_to_provider=15000)
+        self.other = NetworkObject.objects.create(name="ИП", debt_to_provider=100)
+        self.list_url = reverse("network:networkobject-list")
+        self.url = reverse("network:networkobject-debt")
+
+    def test_null_debt_is_within_limit(self):
+        self.assertFalse(self.factory.check_debt())
+        self.assertEqual(self.factory.debt_status, "Долг в пределах допустимого лимита")
+
+    def test_status_annotation_and_filter(self):
+        response = self.client.get(self.list_url, {"debt_over_limit": "true"})
+        self.assertEqual([row["name"] for row in response.data["results"]], ["Магазин"])
+        self.assertEqual(response.data["results"][0]["debt_status"], "Долг превышает допустимый лимит")
+        response = self.client.get(self.list_url, {"debt_over_limit": "false"})
+        self.assertEqual(len(response.data["results"]), 2)
+
+    def test_accrue_subtree_and_pay_by_filter(self):
+        response = self.client.post(
+            self.url, {"operation": "accrue", "amount": "50.00", "provider": self.factory.pk}, format="json"
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data["affected"], response.data["debt_delta"]), (2, "100.00"))
+        response = self.client.post(f"{self.url}?debt_over_limit=false", {"operation": "pay", "amount": "70"})
+        self.assertEqual(response.data["affected"], 2)
+        self.assertEqual(
+            dict(NetworkObject.objects.values_list("name", "debt_to_provider")),
+            {"Завод": 0, "Магазин": 15050, "ИП": 30},
+        )
+        self.factory.refresh_from_db()
+        self.assertEqual(self.factory.subtree_debt, 15050)
+        operation = DebtOperation.objects.order_by("pk").last()
+        self.assertEqual((operation.user, operation.params), (self.user, {"debt_over_limit": ["false"]}))
+
+    def test_amount_required(self):
+        response = self.client.post(self.url, {"operation": "accrue", "provider": self.factory.pk})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(self.url, {"operation": "clear", "provider": self.factory.pk})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["affected"], 2)
+
+    def test_whole_table_requires_all_and_async(self):
+        response = self.client.post(self.url, {"operation": "clear"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("all", response.data)
+        self.assertEqual(self.client.post(self.url, {"operation": "clear", "all": True}).status_code, 400)
+        self.assertEqual(self.client.post(f"{self.url}?async=1", {"operation": "clear"}).status_code, 400)
+        self.assertFalse(NetworkObject.objects.filter(debt_to_provider=0).exists())
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f"{self.url}?async=1", {"operation": "clear", "all": True})
+        self.assertEqual(response.status_code, 202)
+        self.assertFalse(NetworkObject.objects.exclude(debt_to_provider=0).exists())
+
+
+class CelerySettingsTests(SimpleTestCase):
+    def test_eager_only_for_tests(self):
+        script = "from config import settings; print(settings.CELERY_TASK_ALWAYS_EAGER)"
+        for eager_env, eager in (("", "False"), ("1", "True")):
+            env = {"CELERY_BROKER_URL": "", "CELERY_TASK_ALWAYS_EAGER": eager_env}
+            with self.subTest(eager=eager_env), mock.patch.dict(os.environ, env):
+                self.assertEqual(run_child(["-c", script]).stdout.strip(), eager)
+        self.assertTrue(settings.CELERY_TASK_ALWAYS_EAGER)
+
+    def test_broker_required_without_debug(self):
+        cases = (
+            (False, "memory://", ["electronics.E001"]),
+            (True, "memory://", ["electronics.W001"]),
+            (False, "redis://localhost:6379/0", []),
+        )
+        for debug, broker, ids in cases:
+            with self.subTest(debug=debug, broker=broker), override_settings(
+                DEBUG=debug, CELERY_BROKER_URL=broker, CELERY_TASK_ALWAYS_EAGER=False
+            ):
+                self.assertEqual([message.id for message in check_celery_broker(None)], ids)
+
+
+class JobTests(StaffAPITestCase):
+    """
+    Задачи выполняются Celery в режиме eager: .delay() после фиксации транзакции запускает их сразу.
+    """
+
+    def setUp(self):
+        super().setUp()
+        files_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(files_dir.cleanup)
+        settings_override = override_settings(CELERY_TASK_ALWAYS_EAGER=True, JOB_FILES_DIR=files_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.factory = NetworkObject.objects.create(name="Завод", country="Россия", debt_to_provider=10)
+        self.shops = [
+            NetworkObject.objects.create(name=f"Магазин {index}", provider=self.factory, debt_to_provider=100)
+            for index in range(5)
+        ]
+
+    def post(self, url, data):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, data, format="json")
+        return response
+
+    def test_async_debt_in_chunks(self):
+        url = reverse("network:networkobject-debt") + f"?async=1&ancestor={self.factory.pk}"
+        with mock.patch("electronics.tasks.JOB_CHUNK_SIZE", 2):
+            response = self.post(url, {"operation": "pay", "amount": "30"})
+        self.assertEqual(response.status_code, 202)
+        job = Job.objects.get(pk=response.data["id"])
+        self.assertEqual(response["Location"], reverse("network:job-detail", args=[job.pk]))
+        self.assertEqual((job.status, job.total, job.processed, job.progress), (Job.SUCCEEDED, 5, 5, 100))
+        self.assertEqual(job.result, {"affected": 5, "debt_delta": "-150.00"})
+        self.assertEqual(DebtOperation.objects.filter(params__job=job.pk).count(), 3)
+        self.factory.refresh_from_db()
+        self.assertEqual((self.factory.debt_to_provider, self.factory.subtree_debt), (10, 360))
+
+    def test_resume_from_cursor(self):
+        job = Job.objects.create(
+            kind=Job.DEBT, params={"operation": "clear", "amount": None, "filters": {}}, cursor=self.shops[2].pk
+        )
+        run_job.delay(job.pk)
+        debts = NetworkObject.objects.order_by("pk").values_list("debt_to_provider", flat=True)
+        self.assertEqual([int(debt) for debt in debts], [10, 100, 100, 100, 0, 0])
+
+    def test_export_job_and_download(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.get(reverse("network:networkobject-export"), {"async": "1", "output": "csv"})
+        self.assertEqual(response.status_code, 202)
+        job = self.client.get(response["Location"]).data
+        self.assertEqual((job["status"], job["result"]["rows"]), (Job.SUCCEEDED, 6))
+        download = self.client.get(reverse("network:job-download", args=[job["id"]]))
+        self.assertEqual(len(b"".join(download.streaming_content).decode().splitlines()), 7)
+
+    def test_bulk_import_errors_fail_job(self):
+        response = self.post(reverse("network:job-list"), {"kind": "bulk_import", "params": {"rows": [{"name": ""}]}})
+        job = Job.objects.get(pk=response.data["id"])
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.result["errors"][0]["index"], 0)
+
+    def test_retry_after_database_error(self):
+        calls = []
+
+        def flaky(job):
+            calls.append(job.attempts)
+            if len(calls) == 1:
+                raise OperationalError("соединение потеряно")
+            return {"ok": True}
+
+        with mock.patch.dict(JOB_HANDLERS, {Job.REBUILD_HIERARCHY: flaky}):
+            response = self.post(reverse("network:job-list"), {"kind": "rebuild_hierarchy"})
+        job = Job.objects.get(pk=response.data["id"])
+        self.assertEqual((job.status, job.attempts, job.result), (Job.SUCCEEDED, 2, {"ok": True}))
+
+    def test_invalid_params(self):
+        response = self.client.post(
+            reverse("network:job-list"), {"kind": "export", "params": {"output": "xml"}}, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class DebtAccrualTests(TestCase):
+    def setUp(self):
+        self.factory = NetworkObject.objects.create(name="Завод", country="Россия", debt_to_provider=0)
+        self.shops = [
+            NetworkObject.objects.create(name=f"Магазин {index}", provider=self.factory, debt_to_provider=100)
+            for index in range(5)
+        ]
+        self.other = NetworkObject.objects.create(name="Чужой завод", debt_to_provider=100)
+        self.rule = DebtAccrualRule.objects.create(
+            name="Ежедневно", operation=DebtOperation.ACCRUE, amount=10, provider=self.factory
+        )
+        self.run_date = date(2026, 1, 15)
+
+    def debts(self):
+        return [shop.debt_to_provider for shop in NetworkObject.objects.filter(provider=self.factory).order_by("pk")]
+
+    def test_accrual_in_chunks(self):
+        runs = run_accruals(run_date=self.run_date, chunk_size=2)
+        self.assertEqual(len(runs), 1)
+        self.assertEqual((runs[0].status, runs[0].processed, runs[0].debt_delta), (DebtAccrualRun.DONE, 5, 50))
+        self.assertEqual(self.debts(), [Decimal(110)] * 5)
+        self.other.refresh_from_db()
+        self.assertEqual(self.other.debt_to_provider, 100)
+        # по одной записи журнала на порцию
+        self.assertEqual(DebtOperation.objects.filter(params__accrual_run=runs[0].pk).count(), 3)
+        self.factory.refresh_from_db()
+        self.assertEqual(self.factory.subtree_debt, 550)
+
+    def test_rollups_locked_in_id_order(self):
+        with CaptureQueriesContext(connection) as context:
+            run_accruals(run_date=self.run_date, chunk_size=2)
+        sql = [query["sql"] for query in context.captured_queries]
+        rollups = [index for index, query in enumerate(sql) if '"subtree_debt" =' in query]
+        # Порция сдвигает свои строки и завод; перед каждым UPDATE строки читаются с блокировкой в порядке id
+        self.assertEqual(len(rollups), 6)
+        for index in rollups:
+            self.assertTrue(sql[index - 1].startswith('SELECT "electronics_networkobject"."id" FROM'))
+            self.assertIn('ORDER BY "electronics_networkobject"."id" ASC', sql[index - 1])
+
+    def test_rerun_same_date_is_idempotent(self):
+        run_accruals(run_date=self.run_date)
+        self.assertEqual(run_accruals(run_date=self.run_date), [])
+        self.assertEqual(self.debts(), [Decimal(110)] * 5)
+        run_accruals(run_date=date(2026, 1, 16))
+        self.assertEqual(self.debts(), [Decimal(120)] * 5)
+
+    def test_resume_from_cursor(self):
+        run = DebtAccrualRun.objects.create(rule=self.rule, run_date=self.run_date, cursor=self.shops[1].pk, processed=2)
+        self.assertTrue(process_run(run, chunk_size=2))
+        run.refresh_from_db()
+        self.assertEqual((run.status, run.processed), (DebtAccrualRun.DONE, 5))
+        self.assertEqual(self.debts(), [Decimal(100)] * 2 + [Decimal(110)] * 3)
+
+    def test_inactive_rules_skipped(self):
+        DebtAccrualRule.objects.update(is_active=False)
+        self.assertEqual(run_accruals(run_date=self.run_date), [])
+        self.assertEqual(self.debts(), [Decimal(100)] * 5)
+
+    def test_interest_with_filters(self):
+        DebtAccrualRule.objects.filter(pk=self.rule.pk).update(
+            operation=DebtOperation.INTEREST, amount=5, provider=None, filters={"search": ["Магазин"]}
+        )
+        run_accruals(run_date=self.run_date)
+        self.assertEqual(self.debts(), [Decimal(105)] * 5)
+        self.other.refresh_from_db()
+        self.assertEqual(self.other.debt_to_provider, 100)
+
+    @override_settings(CELERY_TASK_ALWAYS_EAGER=True)
+    def test_periodic_task(self):
+        result = accrue_debts.delay().get()
+        self.assertEqual([(item["rule"], item["processed"]) for item in result], [(self.rule.pk, 5)])
+
+    def test_command_reports_speed(self):
+        out = StringIO()
+        call_command("accrue_debts", "--date", "2026-01-15", "--chunk-size", "2", stdout=out)
+        self.assertIn("объектов=5", out.getvalue())
+        self.assertIn("строк/с", out.getvalue())
+
+
+class FakeConnection:
+    closed = 0
+
+    def close(self):
+        self.closed = 1
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def test_reuses_idle_connection(self):
+        pool = ConnectionPool(FakeConnection, max_size=2)
+        first = pool.get()
+        pool.put(first)
+        self.assertIs(pool.get(), first)
+        self.assertEqual((pool.stats()["in_use"], pool.stats()["idle"], pool.stats()["opened"]), (1, 0, 1))
+
+    def test_waits_for_released_connection(self):
+        pool = ConnectionPool(FakeConnection, max_size=1, timeout=5)
+        connection = pool.get()
+        timer = threading.Timer(0.05, pool.put, args=(connection,))
+        timer.start()
+        self.assertIs(pool.get(), connection)
+        timer.join()
+        stats = pool.stats()
+        self.assertEqual((stats["wait_count"], stats["opened"]), (1, 1))
+        self.assertGreater(stats["wait_time_max_ms"], 0)
+
+    def test_timeout_when_exhausted(self):
+        pool = ConnectionPool(FakeConnection, max_size=1, timeout=0.01)
+        pool.get()
+        with self.assertRaises(PoolTimeout):
+            pool.get()
+        self.assertEqual(pool.stats()["timeouts"], 1)
+
+    def test_discards_broken_and_expired_connections(self):
+        pool = ConnectionPool(FakeConnection, max_size=2, max_lifetime=3600)
+        broken = pool.get()
+        pool.put(broken, discard=True)
+        self.assertEqual(broken.closed, 1)
+        pool.max_lifetime = 0
+        expired = pool.get()
+        pool.put(expired)
+        self.assertEqual(expired.closed, 1)
+        self.assertEqual((pool.stats()["idle"], pool.stats()["closed"], pool.stats()["in_use"]), (0, 2, 0))
+
+    def test_health_check_replaces_dead_connection(self):
+        def check(connection):
+            if connection.dead:
+                raise OSError
+
+        pool = ConnectionPool(FakeConnection, check=check)
+        connection = pool.get()
+        connection.dead = True
+        pool.put(connection)
+        fresh = pool.get()
+        fresh.dead = False
+        self.assertIsNot(fresh, connection)
+        self.assertEqual(connection.closed, 1)
+
+    def test_failed_connect_releases_slot(self):
+        pool = ConnectionPool(mock.Mock(side_effect=OSError), max_size=1, timeout=0.01)
+        with self.assertRaises(OSError):
+            pool.get()
+        self.assertEqual(pool.stats()["in_use"], 0)
+
+
+class DatabasePoolViewTests(StaffAPITestCase):
+    def test_stats(self):
+        url = reverse("db-pool")
+        self.client.force_authenticate(user=User(email="user@example.com", first_name="User", last_name="User"))
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_authenticate(user=self.user)
+        pool = ConnectionPool(FakeConnection)
+        pool.get()
+        with mock.patch.dict(POOLS, {"default": pool}):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["default"]["pool"]["in_use"], 1)
+        self.assertIn("conn_max_age", response.data["default"])
+
+
+class SchemaTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(SCHEMA_DIR=directory.name, CODE_VERSION="v1")
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        clear_schema_cache()
+        self.addCleanup(clear_schema_cache)
+        self.directory = Path(directory.name)
+        self.url = reverse("schema-json", kwargs={"format": ".json"})
+
+    def test_build_schema_command(self):
+        call_command("build_schema", stdout=StringIO())
+        self.assertEqual(sorted(path.name for path in self.directory.iterdir()), ["openapi-v1.json", "openapi-v1.yaml"])
+        schema = json.loads((self.directory / "openapi-v1.json").read_bytes())
+        self.assertIn("/electronics/networkobjects/", schema["paths"])
+        self.assertNotIn("host", schema)
+        # Предыдущая версия остается для процессов со старым кодом, более старые удаляются
+        for version in ("v2", "v3"):
+            with override_settings(CODE_VERSION=version):
+                call_command("build_schema", stdout=StringIO())
+        self.assertEqual(
+            sorted(path.name for path in self.directory.iterdir()),
+            ["openapi-v2.json", "openapi-v2.yaml", "openapi-v3.json", "openapi-v3.yaml"],
+        )
+
+    def test_source_version_ignores_tests_and_migrations(self):
+        with tempfile.TemporaryDirectory() as base_dir, override_settings(BASE_DIR=base_dir):
+            app = Path(base_dir) / "app"
+            (app / "migrations").mkdir(parents=True)
+            (app / "views.py").write_text("VIEWS = 1")
+            versions = [source_version()]
+            for name, content in (("tests.py", "TESTS = 1"), ("migrations/0001_initial.py", "MIGRATION = 1")):
+                source_version.cache_clear()
+                (app / name).write_text(content)
+                versions.append(source_version())
+            for name in ("settings.py", "permissions.py"):
+                source_version.cache_clear()
+                (app / name).write_text("CHANGED = 1")
+                versions.append(source_version())
+            source_version.cache_clear()
+        self.assertEqual(len(set(versions[:3])), 1)
+        self.assertEqual(len(set(versions[2:])), 3)
+
+    def test_served_from_built_file(self):
+        (self.directory / "openapi-v1.json").write_bytes(b'{"swagger": "2.0"}')
+        with mock.patch("config.schema.generate_schema") as generate:
+            response = self.client.get(self.url)
+            self.client.get(self.url)
+        generate.assert_not_called()
+        self.assertEqual(response.content, b'{"swagger": "2.0"}')
+        self.assertEqual(response["ETag"], '"v1-json"')
+        self.assertEqual(response["Cache-Control"], "public, max-age=3600")
+
+    def test_generated_once_per_version(self):
+        with mock.patch("config.schema.generate_schema", wraps=generate_schema) as generate:
+            self.assertEqual(self.client.get(self.url).json()["swagger"], "2.0")
+            response = self.client.get(reverse("schema-json", kwargs={"format": ".yaml"}))
+            self.assertEqual(generate.call_count, 1)
+            with override_settings(CODE_VERSION="v2"):
+                self.assertEqual(self.client.get(self.url)["ETag"], '"v2-json"')
+            self.assertEqual(generate.call_count, 2)
+        self.assertTrue(response["Content-Type"].startswith("application/yaml"))
+        self.assertTrue((self.directory / "openapi-v2.json").exists())
+
+    def test_not_modified(self):
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH='"v1-json"')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], '"v1-json"')
+
+    def test_ui_uses_built_schema(self):
+        with mock.patch("config.schema.generate_schema") as generate:
+            response = self.client.get(reverse("schema-swagger-ui"))
+        generate.assert_not_called()
+        self.assertContains(response, self.url)
+
+
+class LazyLoadingTests(SimpleTestCase):
+    @override_settings(LAZY_LOADING=True)
+    def test_lazy_view_imports_on_first_request(self):
+        with mock.patch("config.lazy.import_string") as import_string:
+            view = lazy_view("config.docs.swagger_ui")
+            import_string.assert_not_called()
+            view("request", format=".json")
+        import_string.assert_called_once_with("config.docs.swagger_ui")
+        import_string.return_value.assert_called_once_with("request", format=".json")
+
+    @override_settings(LAZY_LOADING=False)
+    def test_eager_view(self):
+        from config.docs import swagger_ui
+
+        self.assertIs(lazy_view("config.docs.swagger_ui"), swagger_ui)
+
+    @override_settings(LAZY_LOADING=True)
+    def test_lazy_admin_urls(self):
+        site = AdminSite(name="lazy")
+        urlconf, app_name, namespace = admin_urls(site)
+        self.assertEqual((app_name, namespace), ("admin", "lazy"))
+        with mock.patch("config.lazy.autodiscover") as autodiscover:
+            self.assertIsInstance(urlconf, LazyAdminURLConf)
+            autodiscover.assert_not_called()
+            names = [pattern.name for pattern in urlconf.urlpatterns]
+            urlconf.urlpatterns
+        autodiscover.assert_called_once_with()
+        self.assertIn("index", names)
+
+    def test_import_times(self):
+        stderr = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       500 |        500 |     yaml.reader\n"
+            "import time:      1500 |       2000 |   yaml\n"
+            "import time:      3000 |       5000 | config.wsgi\n"
+        )
+        with mock.patch("config.startup.run_child", return_value=mock.Mock(stderr=stderr)):
+            modules = import_times("config.wsgi")
+        self.assertEqual(modules[-1], {"name": "config.wsgi", "self_ms": 3.0, "cumulative_ms": 5.0})
+        self.assertEqual(package_times(modules), [("config", 3.0), ("yaml", 2.0)])
+
+    def test_first_request(self):
+        result = first_request("config.wsgi", "/electronics/products/", "localhost", lazy=True)
+        self.assertEqual(result["status"], 401)
+        self.assertGreater(result["total_ms"], result["request_ms"])
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class ReplicaRoutingTests(StaffAPITestCase):
+    """
+    Реплику заменяет отдельная база SQLite в памяти с таблицей продуктов. Данные в ней отличаются
+    от основной базы, поэтому по ответу видно, откуда прочитан список. База подключается после
+    настройки тестовых баз и существует, пока открыто ее соединение.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        databases = {"default": {}, "replica": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"}}
+        connections.settings["replica"] = connections.configure_settings(databases)["replica"]
+        cls.addClassCleanup(cls.remove_replica)
+        with connections["replica"].schema_editor() as editor:
+            editor.create_model(Product)
+            editor.create_model(ModelVersion)
+        Product.objects.using("replica").create(name="Из реплики")
+
+    @classmethod
+    def remove_replica(cls):
+        connections["replica"].close()
+        del connections["replica"]
+        del connections.settings["replica"]
+
+    def setUp(self):
+        super().setUp()
+        Product.objects.create(name="Из основной базы")
+        self.url = reverse("network:product-list")
+
+    def names(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return [item["name"] for item in response.data["results"]]
+
+    def test_safe_requests_read_from_replica(self):
+        self.assertEqual(self.names(), ["Из реплики"])
+
+    def test_reads_outside_requests_use_primary(self):
+        self.assertEqual(list(Product.objects.values_list("name", flat=True)), ["Из основной базы"])
+        with reads_from_replica():
+            self.assertEqual(list(Product.objects.values_list("name", flat=True)), ["Из реплики"])
+
+    def test_client_reads_own_writes(self):
+        response = self.client.post(self.url, {"name": "Новый"}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Product.objects.using("default").filter(name="Новый").exists())
+        self.assertFalse(Product.objects.using("replica").filter(name="Новый").exists())
+        self.assertCountEqual(self.names(), ["Из основной базы", "Новый"])
+        # По истечении окна (cookie с отметкой больше нет) чтение снова идет в реплику
+        del self.client.cookies[ReplicaRoutingMiddleware.sticky_cookie]
+        self.assertEqual(self.names(), ["Из реплики"])
+
+    def test_unsigned_marker_ignored(self):
+        self.client.cookies[ReplicaRoutingMiddleware.sticky_cookie] = "1"
+        self.assertEqual(self.names(), ["Из реплики"])
+
+    def test_replica_reads_are_not_cached(self):
+        pk = Product.objects.using("replica").get().pk
+        response = self.client.get(reverse("network:product-detail", args=[pk]))
+        self.assertEqual(response.data["name"], "Из реплики")
+        self.assertIsNone(get_cache().get(detail_cache_key(Product, pk)))
+
+    def test_failed_write_does_not_stick(self):
+        response = self.client.post(self.url, {}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.names(), ["Из реплики"])
+
+
+class AsyncReadApiTests(StaffAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = Product.objects.create(name="Телевизор", model="X1")
+        self.factory = NetworkObject.objects.create(name="Завод", debt_to_provider=10)
+        self.shops = [
+            NetworkObject.objects.create(name=f"Магазин {index}", provider=self.factory, debt_to_provider=100000)
+            for index in range(3)
+        ]
+        self.shops[0].products.add(self.product)
+        self.headers = {"Authorization": f"Bearer {AccessToken.for_user(self.user)}"}
+
+    def save_user(self):
+        # Флаги пользователя в кеше обновляются после фиксации транзакции
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+
+    async def get(self, name, *args, headers=None, **params):
+        return await self.async_client.get(
+            reverse(f"network:{name}", args=args), params, headers=self.headers if headers is None else headers
+        )
+
+    async def test_matches_sync_endpoints(self):
+        cases = [
+            ("product-list", "async-product-list", ()),
+            ("product-detail", "async-product-detail", (self.product.pk,)),
+            ("networkobject-list", "async-networkobject-list", ()),
+            ("networkobject-detail", "async-networkobject-detail", (self.shops[0].pk,)),
+        ]
+        for sync_name, async_name, args in cases:
+            with self.subTest(async_name):
+                sync_response = await sync_to_async(self.client.get)(reverse(f"network:{sync_name}", args=args))
+                cache.clear()
+                response = await self.get(async_name, *args)
+                self.assertEqual(response.status_code, 200)
+                expected = json.loads(json.dumps(sync_response.data))
+                if "results" in expected:
+                    expected, data = expected["results"], response.json()["results"]
+                else:
+                    data = response.json()
+                self.assertEqual(data, expected)
+
+    async def test_pagination(self):
+        response = await self.get("async-networkobject-list", page_size=2)
+        self.assertEqual([item["id"] for item in response.json()["results"]], [self.factory.pk, self.shops[0].pk])
+        response = await self.async_client.get(response.json()["next"], headers=self.headers)
+        self.assertEqual([item["id"] for item in response.json()["results"]], [self.shops[1].pk, self.shops[2].pk])
+        self.assertIsNone(response.json()["next"])
+
+    async def test_detail_uses_shared_cache(self):
+        response = await self.get("async-networkobject-detail", self.shops[0].pk)
+        self.assertEqual(response.json()["count_products_for_networkobject"], 1)
+        cached = await get_cache().aget(detail_cache_key(NetworkObject, self.shops[0].pk))
+        self.assertEqual(cached[""]["id"], self.shops[0].pk)
+        response = await self.get("async-networkobject-detail", 0)
+        self.assertEqual(response.status_code, 404)
+
+    async def test_access(self):
+        response = await self.get("async-product-list", headers={})
+        self.assertEqual(response.status_code, 401)
+        response = await self.get("async-product-list", headers={"Authorization": "Bearer invalid"})
+        self.assertEqual(response.status_code, 401)
+        self.user.is_staff = False
+        await sync_to_async(self.save_user)()
+        self.assertEqual((await self.get("async-product-list")).status_code, 403)
+        response = await self.async_client.post(reverse("network:async-product-list"), headers=self.headers)
+        self.assertEqual(response.status_code, 405)
+
+
+class FastListTests(StaffAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.factory = NetworkObject.objects.create(name="Завод", town="Казань", debt_to_provider="10.5")
+        for index in range(6):
+            NetworkObject.objects.create(
+                name=f"Магазин {index}", town="Москва", provider=self.factory, debt_to_provider=index * 20000
+            )
+        for index in range(4):
+            Product.objects.create(name=f"Продукт {index}", model="X1", description=None if index else "Описание")
+
+    def compare(self, name, params):
+        url = reverse(f"network:{name}")
+        expected = json.loads(self.client.get(url, params).content)
+        response = self.client.get(url, {**params, "fast": "1"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/json")
+        data = json.loads(response.content)
+        self.assertEqual(data["results"], expected["results"])
+        # Порядок ключей тоже совпадает: сравнение словарей его не учитывает
+        self.assertEqual([list(item) for item in data["results"]], [list(item) for item in expected["results"]])
+        self.assertEqual(bool(data["next"]), bool(expected["next"]))
+        return data
+
+    def test_same_json_as_serializers(self):
+        cases = [
+            ("networkobject-list", {}),
+            ("networkobject-list", {"ordering": "-level", "page_size": 3}),
+            ("networkobject-list", {"search": "Магазин", "debt_over_limit": "true"}),
+            ("networkobject-list", {"page": 2, "page_size": 4}),
+            ("networkobject-list", {"ordering": "-name", "page_size": 4}),
+            ("product-list", {}),
+            ("product-list", {"ordering": "-name", "page_size": 2}),
+        ]
+        for name, params in cases:
+            with self.subTest(name=name, params=params):
+                self.compare(name, params)
+
+    def test_cursor_pages(self):
+        data = self.compare("networkobject-list", {"ordering": "name", "page_size": 4})
+        response = self.client.get(data["next"])
+        self.assertEqual([item["name"] for item in response.json()["results"]], ["Магазин 3", "Магазин 4", "Магазин 5"])
+
+
+class SparseFieldsTests(StaffAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.factory = NetworkObject.objects.create(name="Завод", town="Казань", country="Россия")
+        self.shops = [
+            NetworkObject.objects.create(name=f"Магазин {index}", town="Москва", provider=self.factory)
+            for index in range(3)
+        ]
+        self.product = Product.objects.create(name="Телевизор")
+        for shop in self.shops:
+            shop.products.add(self.product)
+        self.list_url = reverse("network:networkobject-list")
+        self.detail_url = reverse("network:networkobject-detail", args=[self.shops[0].pk])
+
+    def get(self, url, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response, queries
+
+    def test_list_fields_select_only_requested_columns(self):
+        response, queries = self.get(self.list_url, {"fields": "id,name,town"})
+        self.assertEqual(response.data["results"][0], {"id": self.factory.pk, "name": "Завод", "town": "Казань"})
+        sql = queries.captured_queries[-1]["sql"]
+        self.assertNotIn('"email"', sql)
+        self.assertNotIn('"debt_to_provider"', sql.split("CASE")[0])
+
+    def test_list_fast_mode_with_fields(self):
+        response = self.client.get(self.list_url, {"fields": "name,town", "fast": "1", "page_size": 2})
+        data = json.loads(response.content)
+        self.assertEqual(data["results"], [{"name": "Завод", "town": "Казань"}, {"name": "Магазин 0", "town": "Москва"}])
+        self.assertEqual(len(self.client.get(data["next"]).data["results"]), 2)
+
+    def test_expand_provider_and_products(self):
+        # Первый запрос создает записи версий моделей, в сравнении он не участвует
+        self.client.get(self.list_url)
+        response, queries = self.get(self.list_url, {"fields": "id,name", "expand": "provider,products"})
+        shop = response.data["results"][1]
+        self.assertEqual(shop["provider"]["name"], "Завод")
+        self.assertEqual([product["name"] for product in shop["products"]], ["Телевизор"])
+        with_expand = len(queries)
+        response, queries = self.get(self.list_url, {"fields": "id,name"})
+        self.assertNotIn("products", response.data["results"][1])
+        self.assertEqual(len(queries), with_expand - 1)
+
+    def test_detail_without_products(self):
+        response, queries = self.get(self.detail_url, {"fields": "id,name,hierarchy,ancestors"})
+        expected = {"id": self.shops[0].pk, "name": "Магазин 0", "hierarchy": 1, "ancestors": [self.factory.pk]}
+        self.assertEqual(response.data, expected)
+        self.assertFalse(any("networkobject_products" in query["sql"] for query in queries.captured_queries))
+
+    def test_detail_variants_cached_separately(self):
+        full = self.client.get(self.detail_url).data
+        self.assertIn("products", full)
+        sparse = self.client.get(self.detail_url, {"fields": "name"}).data
+        self.assertEqual(sparse, {"name": "Магазин 0"})
+        expanded = self.client.get(self.detail_url, {"expand": "provider"}).data
+        self.assertEqual(expanded["provider"]["id"], self.factory.pk)
+        self.assertEqual(self.client.get(self.detail_url).data, full)
+
+    def test_unknown_fields(self):
+        response = self.client.get(self.list_url, {"fields": "name,secret"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("secret", str(response.data["fields"]))
+        response = self.client.get(self.detail_url, {"expand": "email"})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(ADMIN_SCALABLE_CHANGELIST=True)
+class ScalableAdminChangelistTests(TestCase):
+    def setUp(self):
+        self.user = User(email="admin@example.com", first_name="Admin", last_name="User", is_staff=True)
+        self.user.is_superuser = True
+        self.user.set_password("testpassword")
+        self.user.save()
+        self.client.force_login(self.user)
+        self.url = reverse("admin:electronics_networkobject_changelist")
+        self.factory = NetworkObject.objects.create(name="Завод", town="Казань")
+        self.shops = [
+            NetworkObject.objects.create(name=f"Магазин {index}", town="Москва", provider=self.factory)
+            for index in range(3)
+        ]
+        self.shops[0].products.add(Product.objects.create(name="Телевизор"), Product.objects.create(name="Ноутбук"))
+
+    def get_ids(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(obj.pk for obj in response.context["cl"].result_list)
+
+    def test_changelist(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        cl = response.context["cl"]
+        self.assertEqual(cl.result_count, 4)
+        self.assertIsNone(cl.full_result_count)
+        self.assertEqual(cl.list_editable, ())
+        self.assertContains(response, "Ноутбук, Телевизор")
+        self.assertContains(response, 'name="name__icontains"')
+        self.assertContains(response, 'class="admin-autocomplete')
+        self.assertFalse(any("DISTINCT" in query["sql"] for query in queries.captured_queries))
+
+    def test_filters(self):
+        self.assertEqual(self.get_ids(name__icontains="Магазин 1"), [self.shops[1].pk])
+        self.assertEqual(self.get_ids(town__icontains="Каз"), [self.factory.pk])
+        self.assertEqual(self.get_ids(level__exact=0), [self.factory.pk])
+        self.assertEqual(self.get_ids(provider__exact=self.factory.pk), [shop.pk for shop in self.shops])
+        response = self.client.get(self.url, {"provider__exact": self.factory.pk, "town__icontains": "Моск"})
+        self.assertContains(response, f'<option value="{self.factory.pk}" selected>{self.factory}</option>', html=True)
+        self.assertContains(response, '<input type="hidden" name="town__icontains" value="Моск">', html=True)
+
+    def test_autocomplete_provider(self):
+        response = self.client.get(
+            reverse("admin:autocomplete"),
+            {"app_label": "electronics", "model_name": "networkobject", "field_name": "provider", "term": "Завод"},
+        )
+        self.assertEqual([item["id"] for item in response.json()["results"]], [str(self.factory.pk)])
+
+    def test_estimated_count(self):
+        from electronics.paginators import EstimatedCountPaginator
+
+        paginator = EstimatedCountPaginator(NetworkObject.objects.order_by("pk"), 2)
+        self.assertEqual((paginator.count, paginator.num_pages), (4, 2))
+
+    @override_settings(ADMIN_SCALABLE_CHANGELIST=False)
+    def test_default_mode(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.context["cl"].full_result_count, 4)
+        self.assertEqual(response.context["cl"].list_editable, ("email", "phone_number"))
+
+
+@modify_settings(MIDDLEWARE={"append": "config.middleware.RequestProfilingMiddleware"})
+@override_settings(REQUEST_PROFILING_SLOW_MS=60000, REQUEST_PROFILING_SAMPLE_RATE=0)
+class RequestProfilingTests(StaffAPITestCase):
+    def setUp(self):
+        super().setUp()
+        # Заголовок профиля проверяется по JWT, как у клиентов API
+        self.client.force_authenticate(user=None)
+        self.factory = NetworkObject.objects.create(name="Завод")
+        self.factory.products.add(Product.objects.create(name="Телевизор"))
+        self.url = reverse("network:networkobject-detail", args=[self.factory.pk])
+
+    def get(self, profile=None, user=None):
+        headers = {"Authorization": f"Bearer {AccessToken.for_user(user or self.user)}"}
+        if profile:
+            headers["X-Profile"] = profile
+        return self.client.get(self.url, headers=headers)
+
+    def test_staff_header_returns_metrics(self):
+        with self.assertLogs("config.profiling", "INFO") as logs:
+            response = self.get("1")
+        self.assertEqual(response.status_code, 200)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(logs.records[0].levelname, "INFO")
+        self.assertEqual(response["X-Profile-Id"], record["id"])
+        self.assertEqual(int(response["X-Profile-Queries"]), record["queries"])
+        self.assertGreater(record["queries"], 0)
+        self.assertGreater(record["serializer_ms"], 0)
+        self.assertIn(f'desc="{record["queries"]} queries"', response["Server-Timing"])
+        self.assertEqual(record["path"], self.url)
+        self.assertEqual(record["user"], self.user.pk)
+        self.assertIsNone(record["trace"])
+
+    def test_header_ignored_for_non_staff(self):
+        user = User(email="client@example.com", first_name="Client", last_name="User")
+        user.set_password("testpassword")
+        user.save()
+        with self.assertNoLogs("config.profiling"):
+            response = self.get("cprofile", user=user)
+        self.assertNotIn("Server-Timing", response)
+
+    def test_requests_without_header_are_not_logged(self):
+        with self.assertNoLogs("config.profiling"):
+            response = self.get()
+        self.assertNotIn("X-Profile-Id", response)
+
+    @override_settings(REQUEST_PROFILING_SLOW_MS=0)
+    def test_slow_request_log(self):
+        with self.assertLogs("config.profiling", "WARNING") as logs:
+            response = self.get()
+        self.assertNotIn("Server-Timing", response)
+        record = logs.records[0].profile
+        self.assertEqual(record["status"], 200)
+        self.assertEqual(len(record["slowest_queries"]), min(record["queries"], 5))
+
+    def test_cprofile_trace(self):
+        with self.assertLogs("config.profiling", "INFO") as logs:
+            self.get("cprofile")
+        record = logs.records[0].profile
+        self.assertEqual(record["tracer"], "cprofile")
+        self.assertIn("function calls", record["trace"])
+
+    def test_pyinstrument_falls_back_to_cprofile(self):
+        with mock.patch("config.profiling.PyinstrumentProfiler", None), self.assertLogs("config.profiling") as logs:
+            self.get("pyinstrument")
+        self.assertEqual(logs.records[0].profile["tracer"], "cprofile")
+
+    @override_settings(REQUEST_PROFILING_SAMPLE_RATE=1)
+    def test_sampled_trace(self):
+        with self.assertLogs("config.profiling", "INFO") as logs:
+            response = self.get()
+        self.assertNotIn("X-Profile-Id", response)
+        self.assertEqual(logs.records[0].profile["tracer"], "cprofile")
+
+    def test_duplicate_queries(self):
+        products = [Product.objects.create(name=f"Продукт {index}").pk for index in range(3)]
+        with RequestProfile() as profile:
+            for pk in products:
+                Product.objects.get(pk=pk)
+            NetworkObject.objects.count()
+        duplicates = profile.duplicates()
+        self.assertEqual(len(profile.queries), 4)
+        self.assertEqual(len(duplicates), 1)
+        self.assertEqual(duplicates[0]["count"], 3)
+        self.assertIn("electronics_product", duplicates[0]["sql"])
+
+
+class AdminDebtActionTests(TestCase):
+    def setUp(self):
+        self.user = User(email="admin@example.com", first_name="Admin", last_name="User", is_staff=True)
+        self.user.is_superuser = True
+        self.user.set_password("testpassword")
+        self.user.save()
+        self.client.force_login(self.user)
+        self.url = reverse("admin:electronics_networkobject_changelist")
+        self.factory = NetworkObject.objects.create(name="Завод", town="Казань", debt_to_provider=100)
+        self.shops = [
+            NetworkObject.objects.create(
+                name=f"Магазин {index}", town="Москва", provider=self.factory, debt_to_provider=50
+            )
+            for index in range(3)
+        ]
+
+    def clear_debt(self, query, **data):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                f"{self.url}?{query}", {"action": "clear_debt_to_provider", "index": 0, **data}
+            )
+        self.assertEqual(response.status_code, 302)
+        return Job.objects.get()
+
+    def debts(self):
+        return dict(NetworkObject.objects.values_list("name", "debt_to_provider"))
+
+    def test_select_across_passes_changelist_filters(self):
+        job = self.clear_debt("town__exact=Москва&q=Магазин", select_across="1", _selected_action=[self.shops[0].pk])
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.params["lookups"], {"town__exact": "Москва"})
+        self.assertEqual(job.params["filters"], {"search": ["Магазин"]})
+        self.assertNotIn("ids", job.params)
+        self.assertEqual(job.result["affected"], 3)
+        self.assertEqual(self.debts()["Завод"], 100)
+        self.assertEqual({self.debts()[shop.name] for shop in self.shops}, {0})
+
+    def test_selected_rows(self):
+        job = self.clear_debt("", _selected_action=[self.shops[0].pk])
+        self.assertEqual(job.params["ids"], [self.shops[0].pk])
+        self.assertEqual(self.debts()[self.shops[0].name], 0)
+        self.assertEqual(self.debts()[self.shops[1].name], 50)
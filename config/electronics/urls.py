@@ -2,15 +2,22 @@ from django.urls import path, include
 
 from rest_framework.routers import SimpleRouter
 
+from electronics import async_views
 from electronics.apps import ElectronicsConfig
-from electronics.views import NetworkObjectViewSet, ProductViewSet
+from electronics.views import JobViewSet, NetworkObjectViewSet, ProductViewSet
 
 app_name = ElectronicsConfig.name
 
 router = SimpleRouter()
 router.register("products", ProductViewSet)
 router.register("networkobjects", NetworkObjectViewSet)
+router.register("jobs", JobViewSet)
 
 urlpatterns = [
     path("", include(router.urls)),
-]
\ No newline at end of file
+    # Асинхронные эндпоинты чтения для запуска под ASGI
+    path("async/products/", async_views.product_list, name="async-product-list"),
+    path("async/products/<int:pk>/", async_views.product_detail, name="async-product-detail"),
+    path("async/networkobjects/", async_views.networkobject_list, name="async-networkobject-list"),
+    path("async/networkobjects/<int:pk>/", async_views.networkobject_detail, name="async-networkobject-detail"),
+]
@@ -1,30 +1,74 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.http import FileResponse, StreamingHttpResponse
+from django.urls import reverse
+from rest_framework import mixins, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import IsAdminUser
-from rest_framework.viewsets import ModelViewSet
+from rest_framework.response import Response
+from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 from rest_framework.filters import SearchFilter, OrderingFilter
-from django_filters.rest_framework import FilterSet
+from django_filters.rest_framework import DjangoFilterBackend
 
-from electronics.models import NetworkObject, Product
+from config.db.router import is_reading_from_replica
+from config.mixins import ConditionalGetMixin
+from electronics.cache import CachedRetrieveMixin, get_cache, invalidate_network_queryset
+from electronics.export import EXPORT_CONTENT_TYPES, export_network
+from electronics.fast import FastListMixin
+from electronics.filters import NETWORK_SEARCH_FIELDS, NetworkObjectFilter, ProductFullTextSearchFilter
+from electronics.models import Job, NetworkObject, Product
+from electronics.paginators import KeysetPagination
+from electronics.services import BulkUpsertError, bulk_upsert_network_objects, change_assortment
 from electronics.serializers import (
     NetworkObjectDetailSerializer,
     NetworkObjectSerializer,
+    NetworkObjectShortSerializer,
     ProductSerializer,
+    ProductSearchSerializer,
     NetworkObjectCreateSerializer,
     NetworkObjectUpdateSerializer,
+    AssortmentSerializer,
+    DebtOperationSerializer,
+    JobSerializer,
+    WHOLE_TABLE_MESSAGE,
 )
+from electronics.tasks import enqueue_job
 from users.permissions import IsActiveAndIsStaff
 
+ANALYTICS_GROUPS = ("subtree", "country", "town", "provider")
+# ?async=1 у тяжелых операций ставит фоновую задачу и сразу возвращает 202 со ссылкой на ее статус
+ASYNC_PARAM = "async"
+# Выборочные поля и раскрытие связей в list и retrieve объектов сети
+FIELDS_PARAM = "fields"
+EXPAND_PARAM = "expand"
+SPARSE_ACTIONS = ("list", "retrieve")
+
 
-class ProductViewSet(ModelViewSet):
+class ProductViewSet(ConditionalGetMixin, CachedRetrieveMixin, FastListMixin, ModelViewSet):
     """
     Класс настройки CRUD для модели Product с помощью метода ViewSet
     """
 
     serializer_class = ProductSerializer
     queryset = Product.objects.all()
-    filter_backends = [SearchFilter, OrderingFilter]
+    pagination_class = KeysetPagination
+    filter_backends = [ProductFullTextSearchFilter, SearchFilter, OrderingFilter]
     search_fields = ["name", "model", "description"]
     ordering_fields = ["name", "launch_date"]
 
+    def get_serializer_class(self):
+        """
+        Метод возвращает сериализатор с релевантностью и подсветкой для полнотекстового поиска (?q=).
+        """
+        if self.action == "list" and self.request.query_params.get(ProductFullTextSearchFilter.search_param):
+            return ProductSearchSerializer
+        return super().get_serializer_class()
+
     def get_permissions(self):
         """
         Метод для проверки доступа к функционалу сайта в зависимости от роли пользователя.
@@ -37,16 +81,79 @@ class ProductViewSet(ModelViewSet):
         return super().get_permissions()
 
 
-class NetworkObjectViewSet(ModelViewSet):
+class NetworkObjectViewSet(ConditionalGetMixin, CachedRetrieveMixin, FastListMixin, ModelViewSet):
     """
     Класс настройки CRUD для модели NetworkObject с помощью метода ViewSet
     """
 
     queryset = NetworkObject.objects.all()
-    filter_backends = [SearchFilter, OrderingFilter, FilterSet]
-    search_fields = ["name", "country", "town", "street", "phone_number"]
-    ordering_fields = ["name", "time_of_creation"]
-    filterset_fields = {"country": ("exact", "contains"), "provider": ("exact", "contains")}
+    # Карточка объекта включает продукты, поэтому их изменения тоже меняют ETag
+    conditional_models = (NetworkObject, Product)
+    pagination_class = KeysetPagination
+    filter_backends = [SearchFilter, OrderingFilter, DjangoFilterBackend]
+    search_fields = NETWORK_SEARCH_FIELDS
+    ordering_fields = ["name", "time_of_creation", "level"]
+    filterset_class = NetworkObjectFilter
+
+    def get_queryset(self):
+        """
+        Метод подбирает предзагрузку связей и аннотации под действие, чтобы число запросов
+        не зависело от количества объектов. Для list и retrieve с ?fields= выбираются только колонки
+        запрошенных полей, а связи загружаются, только если они запрошены.
+        """
+        queryset = super().get_queryset().with_debt_status()
+        if self.action not in SPARSE_ACTIONS:
+            return queryset
+        fields, expand = self.get_sparse_params()
+        requested = set(expand) if fields is None else set(fields) | set(expand)
+        detail = self.action == "retrieve"
+        if "products" in expand or (detail and (fields is None or "products" in fields)):
+            queryset = queryset.prefetch_related("products")
+        if detail and (fields is None or "count_products_for_networkobject" in fields):
+            queryset = queryset.annotate(products_count=Count("products"))
+        provider_columns = ()
+        if "provider" in expand:
+            queryset = queryset.select_related("provider")
+            provider_columns = [f"provider__{name}" for name in NetworkObjectShortSerializer.Meta.fields]
+        if fields is not None:
+            # Поля сортировки нужны курсору пагинации
+            ordering = [name.lstrip("-") for name in [*self.ordering_fields, *NetworkObject._meta.ordering]]
+            columns = self.get_serializer_class().get_required_columns(requested)
+            queryset = queryset.only(*columns, *ordering, *provider_columns)
+        return queryset
+
+    def get_sparse_params(self):
+        """
+        Разбирает ?fields= и ?expand= (имена через запятую) для list и retrieve.
+        Возвращает кортеж полей (None - все поля) и кортеж раскрываемых связей.
+        """
+        if not hasattr(self, "_sparse_params"):
+            fields, expand = None, ()
+            if self.action in SPARSE_ACTIONS:
+                serializer_class = self.get_serializer_class()
+                params = self.request.query_params
+                if params.get(FIELDS_PARAM) is not None:
+                    fields = tuple(dict.fromkeys(filter(None, map(str.strip, params[FIELDS_PARAM].split(",")))))
+                    unknown = set(fields) - serializer_class.get_available_fields()
+                    if unknown:
+                        raise ValidationError({FIELDS_PARAM: f"Неизвестные поля: {', '.join(sorted(unknown))}"})
+                expand = tuple(dict.fromkeys(filter(None, map(str.strip, params.get(EXPAND_PARAM, "").split(",")))))
+                unknown = set(expand) - set(serializer_class.expandable_fields)
+                if unknown:
+                    raise ValidationError({EXPAND_PARAM: f"Нельзя раскрыть: {', '.join(sorted(unknown))}"})
+            self._sparse_params = fields, expand
+        return self._sparse_params
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["fields"], context["expand"] = self.get_sparse_params()
+        return context
+
+    def get_cache_variant(self):
+        fields, expand = self.get_sparse_params()
+        if fields is None and not expand:
+            return ""
+        return f"fields={','.join(sorted(fields)) if fields is not None else '*'};expand={','.join(sorted(expand))}"
 
     def get_serializer_class(self):
         """
@@ -57,6 +164,10 @@ class NetworkObjectViewSet(ModelViewSet):
             return NetworkObjectDetailSerializer
         elif self.action == "create":
             return NetworkObjectCreateSerializer
+        elif self.action == "assortment":
+            return AssortmentSerializer
+        elif self.action == "debt":
+            return DebtOperationSerializer
         elif self.action in ["partial_update", "update"]:
             return NetworkObjectUpdateSerializer
 
@@ -66,11 +177,246 @@ class NetworkObjectViewSet(ModelViewSet):
         """
         Метод для проверки доступа к функционалу сайта в зависимости от роли пользователя.
         """
-        if self.action in ["create", "retrieve", "list"]:
+        if self.action in [
+            "create",
+            "retrieve",
+            "list",
+            "descendants",
+            "ancestors",
+            "export",
+            "bulk",
+            "assortment",
+            "analytics",
+        ]:
             self.permission_classes = (IsActiveAndIsStaff,)
         elif self.action in ["partial_update", "update"]:
             self.permission_classes = (IsActiveAndIsStaff,)
-        elif self.action == "destroy":
+        elif self.action in ["destroy", "debt"]:
             self.permission_classes = (IsAdminUser,)
 
         return super().get_permissions()
+
+    @action(detail=True, methods=["get"])
+    def descendants(self, request, pk=None):
+        """
+        Все объекты, которые прямо или косвенно снабжаются данным объектом, одним запросом по индексу пути.
+        Параметр depth ограничивает глубину поддерева.
+        """
+        network_object = self._get_node()
+        queryset = NetworkObject.objects.descendants_of(network_object, max_depth=self._get_depth()).order_by("path")
+        return self._list_response(self.filter_queryset(queryset))
+
+    @action(detail=True, methods=["get"])
+    def ancestors(self, request, pk=None):
+        """
+        Цепочка поставщиков объекта от завода до прямого поставщика.
+        Параметр depth оставляет только ближайшие к объекту уровни; фильтры списка, поиск и сортировка
+        применяются так же, как в descendants.
+        """
+        network_object = self._get_node()
+        queryset = NetworkObject.objects.ancestors_of(network_object)
+        depth = self._get_depth()
+        if depth is not None:
+            queryset = queryset.filter(level__gte=network_object.level - depth)
+        return self._list_response(self.filter_queryset(queryset))
+
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        """
+        Потоковая выгрузка объектов сети (с учетом фильтров списка) в NDJSON или CSV: ?output=ndjson|csv.
+        С ?async=1 выгрузка пишется в файл фоновой задачей.
+        """
+        output = request.query_params.get("output", "ndjson")
+        if output not in EXPORT_CONTENT_TYPES:
+            raise ValidationError({"output": f"Допустимые форматы: {', '.join(EXPORT_CONTENT_TYPES)}"})
+        if self._is_async():
+            return self._enqueue(Job.EXPORT, {"output": output, "filters": self._filter_params("output")})
+        queryset = self.filter_queryset(self.get_queryset())
+        response = StreamingHttpResponse(export_network(output, queryset), content_type=EXPORT_CONTENT_TYPES[output])
+        response["Content-Disposition"] = f'attachment; filename="networkobjects.{output}"'
+        return response
+
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        """
+        Массовое создание и обновление объектов сети одним запросом и одной транзакцией.
+        Поставщик задается id (provider) или временным ключом строки из того же запроса (provider_key).
+        С ?async=1 загрузка выполняется фоновой задачей.
+        """
+        if self._is_async():
+            return self._enqueue(Job.BULK_IMPORT, {"rows": request.data})
+        try:
+            results = bulk_upsert_network_objects(request.data)
+        except BulkUpsertError as error:
+            return Response({"errors": error.errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            {
+                "created": sum(result["status"] == "created" for result in results),
+                "updated": sum(result["status"] == "updated" for result in results),
+                "results": results,
+            }
+        )
+
+    @action(detail=False, methods=["post"])
+    def assortment(self, request):
+        """
+        Массовое добавление и удаление продуктов у набора объектов сети или у всего поддерева поставщика.
+        """
+        serializer = AssortmentSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        added, removed = change_assortment(
+            network_object_ids=serializer.validated_data["network_objects"],
+            provider=serializer.validated_data.get("provider"),
+            add=serializer.validated_data["add"],
+            remove=serializer.validated_data["remove"],
+        )
+        return Response({"added": added, "removed": removed})
+
+    @action(detail=False, methods=["post"])
+    def debt(self, request):
+        """
+        Массовое начисление, погашение или обнуление долга одним UPDATE с записью в журнал операций.
+        Объекты отбираются фильтрами списка (?country=..., ?debt_over_limit=true, ...) и поддеревом provider.
+        С ?async=1 операция выполняется фоновой задачей порциями. Без фильтров и provider нужен явный
+        all=true, и такая операция выполняется только фоновой задачей: синхронный запрос держал бы
+        блокировки всей таблицы до конца транзакции.
+        """
+        if self._is_async():
+            return self._enqueue(Job.DEBT, {**dict(request.data.items()), "filters": self._filter_params()})
+        serializer = DebtOperationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        provider = serializer.validated_data.get("provider")
+        if provider is None and not self._has_list_filters():
+            if serializer.validated_data["all"]:
+                message = f"Операция над всеми объектами сети выполняется только с ?{ASYNC_PARAM}=1"
+                raise ValidationError({"all": message})
+            raise ValidationError({"all": WHOLE_TABLE_MESSAGE})
+        queryset = self.filter_queryset(NetworkObject.objects.all())
+        params = {key: request.query_params.getlist(key) for key in request.query_params}
+        if provider is not None:
+            queryset = queryset.filter(path__startswith=provider.path)
+            params["provider"] = provider.pk
+        with transaction.atomic():
+            invalidate_network_queryset(queryset)
+            operation = queryset.change_debt(
+                serializer.validated_data["operation"],
+                amount=serializer.validated_data["amount"],
+                user=request.user,
+                params=params,
+            )
+        return Response(DebtOperationSerializer(operation).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=["get"])
+    def analytics(self, request):
+        """
+        Задолженность с учетом фильтров списка: ?group=country|town|provider - сумма долга, число объектов
+        и объектов сверх лимита одним GROUP BY; ?group=subtree - поставщики по убыванию долга всего поддерева
+        из поддерживаемых сводных полей (без фильтров - только заводы). Ответ кешируется по ETag таблицы.
+        """
+        group = request.query_params.get("group", "subtree")
+        if group not in ANALYTICS_GROUPS:
+            raise ValidationError({"group": f"Допустимые группировки: {', '.join(ANALYTICS_GROUPS)}"})
+        return self.conditional(request, self._analytics, group)
+
+    def _analytics(self, request, group):
+        queryset = self.filter_queryset(self.get_queryset())
+        if group == "subtree":
+            if not set(request.query_params) & set(self.filterset_class.base_filters):
+                queryset = queryset.filter(level=0)
+            queryset = queryset.order_by("-subtree_debt", "id").values(
+                "id", "name", "level", "subtree_debt", "subtree_over_limit"
+            )
+            return self.get_paginated_response(self.paginate_queryset(queryset))
+        etag, _ = self.get_validators(request)
+        key = f"electronics:analytics:{etag}"
+        results = get_cache().get(key)
+        if results is None:
+            results = list(queryset.debt_summary(group))
+            if not is_reading_from_replica():
+                get_cache().set(key, results)
+        return Response({"group": group, "results": results})
+
+    def _has_list_filters(self):
+        """
+        Задан ли в строке запроса хотя бы один фильтр списка или поиск.
+        """
+        names = {*self.filterset_class.base_filters, SearchFilter.search_param}
+        return any(self.request.query_params.get(name) for name in names)
+
+    def _is_async(self):
+        return self.request.query_params.get(ASYNC_PARAM) == "1"
+
+    def _filter_params(self, *exclude):
+        return {
+            key: self.request.query_params.getlist(key)
+            for key in self.request.query_params
+            if key not in (ASYNC_PARAM, *exclude)
+        }
+
+    def _enqueue(self, kind, params):
+        serializer = JobSerializer(data={"kind": kind, "params": params})
+        serializer.is_valid(raise_exception=True)
+        job = enqueue_job(kind, serializer.validated_data["params"], user=self.request.user)
+        response = Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+        response["Location"] = reverse("network:job-detail", args=[job.pk])
+        return response
+
+    def _get_depth(self):
+        depth = self.request.query_params.get("depth")
+        if depth is None:
+            return None
+        if not depth.isdigit():
+            raise ValidationError({"depth": "Глубина должна быть неотрицательным целым числом"})
+        return int(depth)
+
+    def _get_node(self):
+        """
+        Объект, от которого строятся descendants и ancestors. В отличие от get_object() фильтры списка
+        к нему не применяются: они отбирают объекты результата, а не сам объект.
+        """
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        network_object = get_object_or_404(self.get_queryset(), **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        self.check_object_permissions(self.request, network_object)
+        return network_object
+
+    def _list_response(self, queryset):
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
+
+class JobViewSet(mixins.CreateModelMixin, ReadOnlyModelViewSet):
+    """
+    Фоновые задачи: постановка (POST), статус и прогресс (GET), файл выгрузки (download).
+    """
+
+    serializer_class = JobSerializer
+    queryset = Job.objects.all()
+    pagination_class = KeysetPagination
+    permission_classes = (IsActiveAndIsStaff,)
+
+    def perform_create(self, serializer):
+        serializer.instance = enqueue_job(
+            serializer.validated_data["kind"], serializer.validated_data["params"], user=self.request.user
+        )
+
+    @action(detail=True, methods=["get"])
+    def download(self, request, pk=None):
+        """
+        Файл, созданный выполненной задачей выгрузки.
+        """
+        job = self.get_object()
+        if job.kind != Job.EXPORT or job.status != Job.SUCCEEDED:
+            raise NotFound("Файл выгрузки еще не готов")
+        path = Path(settings.JOB_FILES_DIR) / job.result["file"]
+        if not path.exists():
+            raise NotFound("Файл выгрузки удален")
+        return FileResponse(
+            open(path, "rb"),
+            as_attachment=True,
+            filename=f"networkobjects.{job.params['output']}",
+            content_type=job.result["content_type"],
+        )
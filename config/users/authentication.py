@@ -0,0 +1,130 @@
+import threading
+from time import monotonic
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from users.models import User
+
+# Флаги пользователя, которые нужны проверкам доступа; они же записываются в токен
+USER_FLAGS = ("is_active", "is_staff", "is_superuser")
+USER_FLAGS_CACHE_PREFIX = "users:flags"
+# Время жизни записей кеша процесса: изменения из других процессов видны не позже чем через столько секунд
+LOCAL_FLAGS_TTL = 5
+LOCAL_FLAGS_MAX_ENTRIES = 10000
+
+_local_flags = {}
+_local_lock = threading.Lock()
+
+
+def get_flags_cache():
+    """
+    Общий для всех процессов кеш флагов (USER_FLAGS_CACHE_ALIAS) или None, если он не задан.
+    Кеш в памяти процесса не допускается: отзыв прав в одном процессе не дошел бы до остальных.
+    """
+    alias = settings.USER_FLAGS_CACHE_ALIAS
+    if not alias:
+        return None
+    flags_cache = caches[alias]
+    if isinstance(flags_cache, LocMemCache):
+        raise ImproperlyConfigured(
+            f"USER_FLAGS_CACHE_ALIAS: кеш {alias!r} хранится в памяти процесса, нужен общий кеш (Redis, Memcached)"
+        )
+    return flags_cache
+
+
+def flags_cache_key(pk):
+    return f"{USER_FLAGS_CACHE_PREFIX}:{pk}"
+
+
+def user_flags(user):
+    return {flag: getattr(user, flag) for flag in USER_FLAGS}
+
+
+def remember_locally(pk, flags):
+    with _local_lock:
+        if len(_local_flags) >= LOCAL_FLAGS_MAX_ENTRIES:
+            _local_flags.clear()
+        _local_flags[pk] = (monotonic() + LOCAL_FLAGS_TTL, flags)
+
+
+def clear_local_flags():
+    with _local_lock:
+        _local_flags.clear()
+
+
+def get_cached_flags(pk):
+    """
+    Флаги из кеша процесса, затем из общего кеша; None, если флаги не записаны.
+    """
+    entry = _local_flags.get(pk)
+    if entry is not None and entry[0] > monotonic():
+        return entry[1]
+    flags_cache = get_flags_cache()
+    flags = flags_cache.get(flags_cache_key(pk)) if flags_cache is not None else None
+    if flags is not None:
+        remember_locally(pk, flags)
+    return flags
+
+
+def store_flags(pk, flags):
+    """
+    Записывает флаги в общий кеш и кеш процесса. Срок хранения в общем кеше - время жизни access-токена:
+    токены, выданные до изменения флагов, к этому времени истекут, а новые access-токены получают
+    флаги из базы (UserRefreshToken).
+    """
+    flags_cache = get_flags_cache()
+    if flags_cache is not None:
+        flags_cache.set(flags_cache_key(pk), flags, api_settings.ACCESS_TOKEN_LIFETIME.total_seconds())
+    remember_locally(pk, flags)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication без запроса пользователя на каждый вызов API.
+
+    Флаги is_active, is_staff и is_superuser берутся из кеша (процесса, затем общего), а если их там
+    нет - из claims токена (UserTokenObtainPairSerializer). Сохранение и удаление пользователя
+    записывают новые флаги в кеш (users.signals), поэтому кеш всегда приоритетнее claims.
+    Без общего кеша (USER_FLAGS_CACHE_ALIAS) claims не используются: флаги читаются из базы и хранятся
+    только в кеше процесса LOCAL_FLAGS_TTL секунд.
+    request.user - экземпляр User с загруженными id и флагами; остальные поля загрузятся при обращении.
+    Токены без claims проверяются запросом к базе один раз, дальше флаги берутся из кеша.
+    Изменения через QuerySet.update() сигналов не вызывают и в кеш не попадают.
+    """
+
+    def get_user(self, validated_token):
+        user = self.get_cached_user(validated_token)
+        if user is None:
+            user = super().get_user(validated_token)
+            store_flags(user.pk, user_flags(user))
+        return user
+
+    def get_cached_user(self, validated_token):
+        """
+        Пользователь из кеша или claims токена без запроса к базе; None, если флаги неизвестны.
+        """
+        if api_settings.CHECK_REVOKE_TOKEN:
+            return None
+        try:
+            pk = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+        flags = get_cached_flags(pk)
+        if flags is None:
+            if get_flags_cache() is None or not all(flag in validated_token for flag in USER_FLAGS):
+                return None
+            flags = {flag: validated_token[flag] for flag in USER_FLAGS}
+        if not flags["is_active"]:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        # from_db ожидает значения в порядке полей модели
+        loaded = {api_settings.USER_ID_FIELD: pk, **flags}
+        field_names = [field.attname for field in User._meta.concrete_fields if field.attname in loaded]
+        return User.from_db(router.db_for_read(User), field_names, [loaded[name] for name in field_names])
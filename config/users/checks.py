@@ -0,0 +1,13 @@
+from django.core.checks import Error, Tags, register
+from django.core.exceptions import ImproperlyConfigured
+
+from users.authentication import get_flags_cache
+
+
+@register(Tags.caches)
+def check_user_flags_cache(app_configs, **kwargs):
+    try:
+        get_flags_cache()
+    except ImproperlyConfigured as exc:
+        return [Error(str(exc), id="users.E001")]
+    return []
@@ -29,6 +29,7 @@ class User(AbstractUser):
             'required': 'Фамилия обязательна для заполнения.',
         },
     )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name="Дата изменения")
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
 
@@ -45,5 +46,8 @@ class User(AbstractUser):
             raise ValidationError("Имя и фамилия обязательны для заполнения.")
 
     def save(self, *args, **kwargs):
+        # Частичные сохранения (например, last_login при входе) тоже обновляют updated_at
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "updated_at"}
         self.full_clean()
         super().save(*args, **kwargs)
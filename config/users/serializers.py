@@ -1,4 +1,9 @@
 from rest_framework.serializers import ModelSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from users.authentication import USER_FLAGS, user_flags
 from users.models import User
 
 
@@ -7,4 +12,40 @@ class UserSerializer(ModelSerializer):
 
     class Meta:
         model = User
-        fields = "__all__"
\ No newline at end of file
+        fields = "__all__"
+
+
+class UserRefreshToken(RefreshToken):
+    """
+    Refresh-токен, который записывает в каждый новый access-токен текущие флаги пользователя из базы, а
+    не скопированные при входе: обновленный токен не возвращает отозванные права, и запись флагов в
+    общем кеше достаточно хранить время жизни access-токена.
+    """
+
+    @property
+    def access_token(self):
+        access = super().access_token
+        user = User.objects.filter(**{api_settings.USER_ID_FIELD: self[api_settings.USER_ID_CLAIM]}).first()
+        flags = user_flags(user) if user is not None else dict.fromkeys(USER_FLAGS, False)
+        for flag, value in flags.items():
+            access[flag] = value
+        return access
+
+
+class UserTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Пара токенов с флагами доступа пользователя в claims (для CachedJWTAuthentication).
+    """
+
+    token_class = UserRefreshToken
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        for flag in USER_FLAGS:
+            token[flag] = getattr(user, flag)
+        return token
+
+
+class UserTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = UserRefreshToken
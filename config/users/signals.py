@@ -0,0 +1,28 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from config.versions import bump_model_version
+from users.authentication import USER_FLAGS, store_flags, user_flags
+from users.models import User
+
+
+@receiver(post_save, sender=User)
+def refresh_user_flags(sender, instance, **kwargs):
+    """
+    Новые флаги попадают в кеш после фиксации транзакции, чтобы откат не оставил в кеше чужие права.
+    """
+    pk, flags = instance.pk, user_flags(instance)
+    transaction.on_commit(lambda: store_flags(pk, flags))
+
+
+@receiver(post_delete, sender=User)
+def revoke_user_flags(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: store_flags(pk, dict.fromkeys(USER_FLAGS, False)))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def bump_user_version(sender, **kwargs):
+    bump_model_version(sender)
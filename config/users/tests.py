@@ -1,6 +1,17 @@
+import shutil
+import tempfile
+
 from rest_framework.test import APITestCase
 from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from .authentication import clear_local_flags, get_flags_cache
+from .checks import check_user_flags_cache
 from .models import User
 
 
@@ -55,3 +66,137 @@ class UserViewSetTest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn('first_name', response.data)
         self.assertIn('last_name', response.data)
+
+
+class CachedJWTAuthenticationTest(APITestCase):
+    """
+    Общий кеш флагов - файловый кеш во временном каталоге: его экземпляры в разных процессах (и
+    отдельные экземпляры в одном) видят одни и те же записи.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        directory = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, directory, ignore_errors=True)
+        cls.enterClassContext(
+            override_settings(
+                CACHES={
+                    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+                    "user_flags": {
+                        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                        "LOCATION": directory,
+                    },
+                },
+                USER_FLAGS_CACHE_ALIAS="user_flags",
+            )
+        )
+
+    def setUp(self):
+        self.clear_flags()
+        self.user = User(email="staff@example.com", first_name="Staff", last_name="User", is_staff=True)
+        self.user.set_password("testpassword")
+        self.user.save()
+        self.url = reverse("network:product-list")
+
+    @staticmethod
+    def clear_flags():
+        caches["user_flags"].clear()
+        clear_local_flags()
+
+    def obtain_token(self, token_type="access"):
+        response = self.client.post(
+            reverse("users:token_obtain_pair"), {"email": "staff@example.com", "password": "testpassword"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data[token_type]
+
+    def get(self, token):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, HTTP_AUTHORIZATION=f"Bearer {token}")
+        user_queries = [query for query in queries.captured_queries if "users_user" in query["sql"]]
+        return response, user_queries
+
+    def test_token_claims_skip_user_query(self):
+        token = self.obtain_token()
+        self.assertTrue(AccessToken(token)["is_staff"])
+        self.clear_flags()
+        response, user_queries = self.get(token)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(user_queries, [])
+
+    def test_token_without_claims_queries_once(self):
+        token = str(AccessToken.for_user(self.user))
+        self.clear_flags()
+        response, user_queries = self.get(token)
+        self.assertEqual((response.status_code, len(user_queries)), (status.HTTP_200_OK, 1))
+        response, user_queries = self.get(token)
+        self.assertEqual((response.status_code, len(user_queries)), (status.HTTP_200_OK, 0))
+
+    def test_saved_flags_override_claims(self):
+        token = self.obtain_token()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_staff = False
+            self.user.save()
+        response, user_queries = self.get(token)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(user_queries, [])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        response, _ = self.get(token)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_user_rejected(self):
+        token = self.obtain_token()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        response, _ = self.get(token)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_request_user_loads_other_fields_lazily(self):
+        token = self.obtain_token()
+        response = self.client.get(reverse("network:job-list"), HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        request_user = response.renderer_context["request"].user
+        self.assertEqual(request_user.pk, self.user.pk)
+        self.assertEqual(request_user.email, "staff@example.com")
+
+    def test_revoked_staff_seen_by_other_process(self):
+        token = self.obtain_token()
+        response, _ = self.get(token)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_staff = False
+            self.user.save()
+        # Другой процесс: свой экземпляр общего кеша и пустой кеш процесса
+        other = caches.create_connection("user_flags")
+        self.assertIsNot(other, caches["user_flags"])
+        caches["user_flags"] = other
+        clear_local_flags()
+        response, user_queries = self.get(token)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(user_queries, [])
+
+    def test_refresh_reads_current_flags(self):
+        refresh = self.obtain_token("refresh")
+        self.user.is_staff = False
+        self.user.save()
+        response = self.client.post(reverse("users:token_refresh"), {"refresh": refresh})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(AccessToken(response.data["access"])["is_staff"])
+
+    @override_settings(USER_FLAGS_CACHE_ALIAS="")
+    def test_claims_ignored_without_shared_cache(self):
+        token = self.obtain_token()
+        clear_local_flags()
+        response, user_queries = self.get(token)
+        self.assertEqual((response.status_code, len(user_queries)), (status.HTTP_200_OK, 1))
+        response, user_queries = self.get(token)
+        self.assertEqual((response.status_code, len(user_queries)), (status.HTTP_200_OK, 0))
+
+    @override_settings(USER_FLAGS_CACHE_ALIAS="default")
+    def test_local_memory_cache_rejected(self):
+        with self.assertRaises(ImproperlyConfigured):
+            get_flags_cache()
+        self.assertEqual([error.id for error in check_user_flags_cache(None)], ["users.E001"])
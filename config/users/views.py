@@ -1,9 +1,11 @@
 from rest_framework.viewsets import ModelViewSet
+
+from config.mixins import ConditionalGetMixin
 from users.models import User
 from users.serializers import UserSerializer
 
 
-class UserViewSet(ModelViewSet):
+class UserViewSet(ConditionalGetMixin, ModelViewSet):
     """Класс для настройки CRUD для модели User с помощью метода ViewSet"""
 
     serializer_class = UserSerializer